@@ -3,9 +3,30 @@
 import sys
 import atexit
 import os
+import io
+import csv
+import time
+import argparse
+import subprocess
 from subprocess import call
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 import getpass
 
+import keystore_writer
+
+# PyYAML is only needed for manifests written in YAML
+try:
+  import yaml
+except ImportError:
+  yaml = None
+
+# raw_input() was renamed to input() in Python 3
+try:
+  raw_input
+except NameError:
+  raw_input = input
+
 # Created by:
 # Jacky Cheng
 
@@ -26,6 +47,32 @@ t_p_dict = {"test" : "t", \
             "prod" : "p", \
             "" : ""}
 
+# Certificate authorities that keypairs can be created for
+certificate_authorities = ("entrust", "37", "38")
+
+# Columns of a CSV manifest (and keys of each entry of a YAML manifest) for the batch mode
+manifest_columns = ("ca", "environment", "common_name")
+
+# Columns headers of the report of the batch mode
+report_columns = ["Common Name", "Certificate Authority", "Environment", "Distinguished Name", "Keystore", "CSR", "Status", "Seconds", "Message"]
+success_status = "success"
+failed_status = "failed"
+skipped_status = "skipped"
+
+# The password is handed to keytool through this environment variable (with -storepass:env and -keypass:env) so that it
+# never shows up in the arguments of the keytool process
+password_variable = "AUTOMATION_STOREPASS"
+
+# Command that runs keytool (set through the arguments)
+keytool_command = "keytool"
+
+# Creates the keypairs and CSRs with keytool or in Python with keystore_writer.py (set through the arguments)
+engine = "keytool"
+# Type of the keystores (set through the arguments) and the extension of their files
+store_type = "jks"
+keystore_extension_dict = {"jks" : ".jks", \
+                           "pkcs12" : ".p12"}
+
 # Global variables
 certificate_authority = ""
 owner_line = ""
@@ -86,15 +133,33 @@ cn : string
   This string is the result of user input for the common name that will be used in the owner line
 """
 def setOwnerLine(ca):
-  if ca != "38" and test_or_prod == 't':
-    owner = common_dict[ca + "-test"]
-  elif ca != "38" and test_or_prod == 'p':
-    owner = common_dict[ca + "-prod"]
-  else:
-    owner = common_dict[ca]
+  owner = getOwnerLine(ca, test_or_prod)
   cn = setCommonName(ca)
   return owner, cn
 
+"""
+This function is used to look up the rest of the owner line (everything but the common name) for the certificate authority
+and environment.
+
+Parameters:
+---------------------
+ca : string
+  This string is the certificate authority that will be used
+environment : string
+  This string is the first letter of the environment ('t' for test or 'p' for production), which is not used for the 38 CA
+
+Returns:
+---------------------
+string
+  This string is the rest of the owner line from common_dict
+"""
+def getOwnerLine(ca, environment):
+  if ca != "38" and environment == 't':
+    return common_dict[ca + "-test"]
+  elif ca != "38" and environment == 'p':
+    return common_dict[ca + "-prod"]
+  return common_dict[ca]
+
 """
 This function is used to set the certificate authority that will affect the common name prompt and owner line prompt that will be used
 as part of the "-dname" option when running the keytool command.
@@ -212,11 +277,317 @@ def setPassword():
       print("\nPlease put in a password so that it can be secure!\n")
   return pw
 
+"""
+This function reads the entries of a batch manifest. A manifest is either a CSV file with the columns of manifest_columns
+(in any order) or, when its name ends with .yaml or .yml, a YAML list of entries with the same keys (optionally under an
+"entries" key).
+
+Parameters:
+---------------------
+path : string
+  This string is the path of the manifest
+
+Returns:
+---------------------
+list
+  This list holds a dictionary (with the keys of manifest_columns) for each entry in the order of the manifest
+"""
+def readManifest(path):
+  if path.lower().endswith((".yaml", ".yml")):
+    if yaml is None:
+      raise ValueError("PyYAML must be installed to read the YAML manifest " + path)
+    with io.open(path, 'r') as file:
+      entries = yaml.safe_load(file)
+    if isinstance(entries, dict):
+      entries = entries.get("entries")
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+      raise ValueError("The manifest " + path + " must be a list of entries")
+  else:
+    with io.open(path, 'r', newline='') as file:
+      reader = csv.DictReader(file)
+      missing = [column for column in manifest_columns if column not in (reader.fieldnames or [])]
+      if missing:
+        raise ValueError("The manifest " + path + " is missing the columns: " + ", ".join(missing))
+      entries = list(reader)
+  return [dict((column, str(entry.get(column) or "").strip()) for column in manifest_columns) for entry in entries]
+
+"""
+This function checks an entry of a batch manifest and fills in its environment ('t', 'p' or '' for the 38 CA) and
+distinguished name.
+
+Parameters:
+---------------------
+entry : dictionary
+  This dictionary is an entry of the manifest (see readManifest())
+
+Returns:
+---------------------
+string
+  This string is the reason the entry cannot be created or None if it can be created
+"""
+def validateEntry(entry):
+  ca = entry["ca"].lower()
+  if ca not in certificate_authorities:
+    return "the certificate authority must be one of " + ", ".join(certificate_authorities)
+  environment = entry["environment"].lower()
+  environment = t_p_dict.get(environment, environment)
+  if ca == "38":
+    environment = ""
+  elif environment not in ('t', 'p'):
+    return "the environment must be test or prod"
+  common_name = entry["common_name"]
+  # The common name is used as the alias and the names of the keystore and CSR
+  if common_name in ("", ".", "..") or os.path.basename(common_name) != common_name or (os.altsep and os.altsep in common_name):
+    return "the common name must be usable as a file name"
+  entry["ca"] = ca
+  entry["environment"] = environment
+  entry["distinguished_name"] = createDistinguishedName(getOwnerLine(ca, environment), common_name)
+  return None
+
+"""
+This function reads the password of the keystores and keypairs for the batch mode from an environment variable or from
+the first line of a file (such as one only readable by its owner), so that it does not have to be typed in.
+
+Parameters:
+---------------------
+args : argparse.Namespace
+  These are the arguments that were passed to the program
+
+Returns:
+---------------------
+pw : string
+  This string is the password
+"""
+def readPassword(args):
+  if args.storepass_env is not None:
+    pw = os.environ.get(args.storepass_env, "")
+  else:
+    with io.open(args.storepass_file, 'r') as file:
+      pw = file.readline().rstrip('\r\n')
+  if pw == "":
+    raise ValueError("The password cannot be empty")
+  return pw
+
+"""
+This function returns the environment that keytool is run with, which holds the password (see password_variable).
+"""
+def createKeytoolEnvironment(pw):
+  environment = dict(os.environ)
+  environment[password_variable] = pw
+  return environment
+
+"""
+This function runs keytool with the password in its environment (see password_variable).
+
+Parameters:
+---------------------
+arguments : list
+  This list holds the arguments of keytool
+pw : string
+  This string is the password of the keystore and keypair
+
+Returns:
+---------------------
+integer
+  This integer is the exit code of keytool
+string
+  This string is the output of keytool
+"""
+def runKeytool(arguments, pw):
+  environment = createKeytoolEnvironment(pw)
+  try:
+    process = subprocess.Popen([keytool_command] + arguments, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=environment)
+  except OSError as e:
+    return None, str(e)
+  output = process.communicate()[0]
+  return process.returncode, output.decode("utf-8", "replace").strip()
+
+"""
+This function creates the keypair (in <common name>.jks or <common name>.p12) and then the CSR (in <common name>.csr) of
+an entry of a batch manifest, the same as main() does for a single keypair. An entry whose keystore already exists is
+skipped rather than having its keystore changed.
+
+Parameters:
+---------------------
+entry : dictionary
+  This dictionary is an entry of the manifest that was checked with validateEntry()
+pw : string
+  This string is the password of the keystore and keypair
+directory : string
+  This string is the directory that the keystore and CSR are created in
+
+Returns:
+---------------------
+list
+  This list is the row of the entry in the report (see report_columns)
+"""
+def createKeyPair(entry, pw, directory):
+  start = time.time()
+  common_name = entry["common_name"]
+  keystore = os.path.join(directory, common_name + keystore_extension_dict[store_type])
+  csr = os.path.join(directory, common_name + ".csr")
+  row = [common_name, entry["ca"], test_prod_dict[entry["environment"]], entry["distinguished_name"], keystore, csr]
+
+  if os.path.exists(keystore):
+    status, message = skipped_status, "the keystore already exists"
+  elif engine == "python":
+    try:
+      keystore_writer.createKeyPairFiles(keystore, csr, common_name, entry["distinguished_name"], pw, store_type)
+      status, message = success_status, ""
+    except (ValueError, IOError, OSError) as e:
+      status, message = failed_status, "the keypair could not be created: " + str(e)
+  else:
+    exit_code, output = runKeytool(["-genkey", "-keyalg", "RSA", "-keysize", "2048", "-sigalg", "SHA256withRSA", "-validity", "3650", \
+                                    "-storepass:env", password_variable, "-keypass:env", password_variable, "-alias", common_name, \
+                                    "-keystore", keystore, "-storetype", store_type, "-dname", entry["distinguished_name"]], pw)
+    if exit_code == 0:
+      exit_code, output = runKeytool(["-certreq", "-sigalg", "SHA256withRSA", "-storepass:env", password_variable, "-keypass:env", password_variable, \
+                                      "-alias", common_name, "-file", csr, "-keystore", keystore, "-storetype", store_type], pw)
+      if exit_code == 0:
+        status, message = success_status, ""
+      else:
+        status, message = failed_status, "the CSR could not be created: " + output
+    else:
+      status, message = failed_status, "the keypair could not be created: " + output
+  return row + [status, "{:.2f}".format(time.time() - start), message]
+
+"""
+This function is run by each worker of the batch mode to create the keypair and CSR of an entry (see createKeyPair()).
+
+Parameters:
+---------------------
+job : tuple
+  This tuple holds the entry, the password and the directory
+
+Returns:
+---------------------
+list
+  This list is the row of the entry in the report (see report_columns)
+"""
+def createJob(job):
+  return createKeyPair(*job)
+
+"""
+This function is run by each worker process of the batch mode to copy over the settings of the arguments.
+"""
+def initializeWorker(engine_name, store_type_name, command):
+  global engine
+  global store_type
+  global keytool_command
+  engine = engine_name
+  store_type = store_type_name
+  keytool_command = command
+
+"""
+This function creates the keypairs and CSRs of every entry of a batch manifest with a pool of workers (each worker runs
+the two keytool commands of an entry one after the other, or creates them in Python) and writes a report of the result of
+every entry.
+
+Parameters:
+---------------------
+args : argparse.Namespace
+  These are the arguments that were passed to the program
+
+Returns:
+---------------------
+integer
+  This integer is the number of entries that failed
+"""
+def runBatch(args):
+  global keytool_command
+  keytool_command = args.keytool
+  try:
+    entries = readManifest(args.manifest)
+    pw = readPassword(args)
+  except (ValueError, IOError, OSError) as e:
+    sys.exit("\n" + str(e) + "\n")
+  directory = os.path.abspath(args.output_dir)
+  if not os.path.isdir(directory):
+    os.makedirs(directory)
+
+  rows = [None] * len(entries)
+  valid_entries = []
+  for position, entry in enumerate(entries):
+    reason = validateEntry(entry)
+    if reason is None:
+      valid_entries.append((position, entry))
+    else:
+      rows[position] = [entry["common_name"], entry["ca"], entry["environment"], "", "", "", failed_status, "0.00", "Entry " + str(position + 1) + ": " + reason]
+
+  # keytool does the work in its own processes, so threads are enough to run the entries side by side, but the keys that are
+  # created in Python need a process each
+  workers = max(1, min(args.jobs, len(valid_entries)))
+  if engine == "python":
+    pool = Pool(workers, initializeWorker, (engine, store_type, keytool_command))
+  else:
+    pool = ThreadPool(workers)
+  try:
+    for (position, entry), row in zip(valid_entries, pool.imap(createJob, [(entry, pw, directory) for position, entry in valid_entries])):
+      rows[position] = row
+      print(row[0] + ": " + row[report_columns.index("Status")] + ("" if row[-1] == "" else " (" + row[-1] + ")"))
+  finally:
+    pool.close()
+    pool.join()
+
+  if sys.version_info[0] < 3:
+    report = open(args.report, 'wb')
+  else:
+    report = open(args.report, 'w', newline='')
+  with report:
+    writer = csv.writer(report, lineterminator='\n')
+    writer.writerow(report_columns)
+    writer.writerows(rows)
+
+  statuses = [row[report_columns.index("Status")] for row in rows]
+  print("\nFinished! " + ", ".join(str(statuses.count(status)) + " " + status for status in (success_status, skipped_status, failed_status)) + \
+        " (see " + args.report + ")\n")
+  return statuses.count(failed_status)
+
+"""
+This function reads the arguments that were passed to the program. Without a manifest, the program prompts for a single
+keypair as before.
+"""
+def parseArguments(argv):
+  parser = argparse.ArgumentParser(description='Creates a keypair and a CSR for a certificate authority, either by prompting for them or for every entry of a manifest.')
+  parser.add_argument('--manifest', help='Creates the keypairs and CSRs of every entry (ca, environment, common_name) of the CSV or YAML manifest without prompting')
+  password = parser.add_mutually_exclusive_group()
+  password.add_argument('--storepass-env', metavar='VARIABLE', help='The environment variable that holds the password of the keystores and keypairs (with --manifest)')
+  password.add_argument('--storepass-file', metavar='FILE', help='The file whose first line is the password of the keystores and keypairs (with --manifest)')
+  parser.add_argument('-j', '--jobs', type=int, default=4, help='The number of entries that are created at the same time (default: 4)')
+  parser.add_argument('--output-dir', default='.', help='The directory that the keystores and CSRs are created in (default: the current directory)')
+  parser.add_argument('--report', default='automation_report.csv', help='The CSV report of the result of every entry (default: automation_report.csv)')
+  parser.add_argument('--keytool', default=keytool_command, help='The keytool command to run (default: keytool)')
+  parser.add_argument('--engine', choices=['keytool', 'python'], default=engine, \
+                      help='Creates the keypairs and CSRs with keytool or in Python without starting a JVM (default: keytool)')
+  parser.add_argument('--storetype', choices=['jks', 'pkcs12'], default=store_type, help='The type of the keystores (default: jks)')
+  args = parser.parse_args(argv)
+  if args.manifest is not None and args.storepass_env is None and args.storepass_file is None:
+    parser.error("--storepass-env or --storepass-file must be provided with --manifest")
+  if args.storepass_env is not None and args.storepass_env not in os.environ:
+    parser.error("the environment variable " + args.storepass_env + " is not set")
+  if args.jobs < 1:
+    parser.error("the number of jobs must be at least 1")
+  if args.engine == "python" and not keystore_writer.isAvailable():
+    parser.error("--engine python needs the cryptography package (pip install cryptography), or use --engine keytool")
+  return args
+
 # Running the main function to query the user for key input and then run the appropriate keytool commands to create the keypair and then to create the CSR based on the keypair
-def main():
+def main(argv=None):
   global certificate_authority
   global owner_line
   global common_name
+  global engine
+  global store_type
+  global keytool_command
+
+  args = parseArguments(sys.argv[1:] if argv is None else argv)
+  engine = args.engine
+  keytool_command = args.keytool
+  store_type = args.storetype
+  if args.manifest is not None:
+    if runBatch(args) > 0:
+      sys.exit(1)
+    return
 
   # Getting the appropriate information to run the keytool commands
   certificate_authority = setCertificateAuthority()
@@ -225,10 +596,24 @@ def main():
   full_line = createDistinguishedName(owner_line, common_name)
   password = setPassword()
 
+  keystore = common_name + keystore_extension_dict[store_type]
+  if engine == "python":
+    print("\nGenerating the key pair and the CSR\n")
+    try:
+      keystore_writer.createKeyPairFiles(keystore, common_name + ".csr", common_name, full_line, password, store_type)
+    except (ValueError, IOError, OSError) as e:
+      sys.exit("\nThe keypair could not be created: " + str(e) + "\n")
+    print("\nFinished!\n")
+    return
+
   print("\nGenerating the key pair\n")
-  call('keytool -genkey -keyalg RSA -keysize 2048 -sigalg SHA256withRSA -validity 3650 -storepass "' + password + '" -keypass "' + password + '" -alias "' + common_name + '" -keystore "' + common_name + '.jks" -dname "' + full_line + '"', shell=True)
+  # The password is handed to keytool through its environment rather than its arguments (or a shell)
+  environment = createKeytoolEnvironment(password)
+  call([keytool_command, "-genkey", "-keyalg", "RSA", "-keysize", "2048", "-sigalg", "SHA256withRSA", "-validity", "3650", "-storepass:env", password_variable, \
+        "-keypass:env", password_variable, "-alias", common_name, "-keystore", keystore, "-storetype", store_type, "-dname", full_line], env=environment)
   print("\nGenerating the CSR\n")
-  call("keytool -certreq -keyalg RSA -storepass '" + password + "' -alias '" + common_name + "' -file '" + common_name + ".csr' -keystore '" + os.path.abspath(common_name + ".jks") + "'", shell=True)
+  call([keytool_command, "-certreq", "-keyalg", "RSA", "-storepass:env", password_variable, "-keypass:env", password_variable, "-alias", common_name, \
+        "-file", common_name + ".csr", "-keystore", os.path.abspath(keystore), "-storetype", store_type], env=environment)
   print("\nFinished!\n")
 
 if __name__ == '__main__':
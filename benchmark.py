@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import io
+import csv
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+import datetime
+
+import generate_results
+
+try:
+  import resource
+except ImportError:
+  # The resource module is not available on Windows, so the peak memory is not reported there
+  resource = None
+
+"""
+The aim of this script is to measure the throughput of generate_results.py so that changes to the parser can be checked
+for regressions. It generates realistic "keytool -list -v" data dumps of the size and shape requested and then times the
+parsing of them from end to end (recursiveParsing(), which writes results.csv) and stage by stage:
+* read: reading the lines of the data dump
+* classify: looking up the prefix of every line in the dispatch table
+* extract: extracting the certificates out of the lines (which includes classifying them)
+* write: creating the rows of the certificates and writing them with the csv module
+
+For each stage the number of lines and entries per second is reported along with the peak memory (RSS) of the stage. On
+Linux the peak is reset before each stage so that it is the peak of that stage only. Elsewhere it is the peak of the
+process up to the end of the stage, so a stage repeats the peak of an earlier stage that used more memory. The output of generate_results.py (its console output and results.csv) is thrown away so that only the parsing is timed.
+"""
+
+# Used to create realistic metadata in the data dumps
+month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+signature_algorithms = ["SHA256withRSA", "SHA384withRSA", "SHA1withRSA", "SHA256withECDSA"]
+time_zones = ["UTC", "EST", "PDT", "GMT+05:30"]
+# Separates the entries of a data dump (as printed by keytool)
+entry_separator = ["", "", "*******************************************", "*******************************************", "", ""]
+
+"""
+This function creates the lines of a single certificate as keytool prints them. Since Java 8 keytool prints the signature
+algorithm unindented after the fingerprints, while older versions of keytool print it (and the version) indented under
+the fingerprints.
+"""
+def generateCertificateLines(generator, owner, issuer, indented=False):
+  start = datetime.datetime(generator.randint(2005, 2020), generator.randint(1, 12), generator.randint(1, 28), \
+                            generator.randint(0, 23), generator.randint(0, 59), generator.randint(0, 59))
+  end = start.replace(year=start.year + generator.randint(1, 10))
+  time_zone = generator.choice(time_zones)
+  fingerprint = lambda size: ':'.join("%02X" % generator.randint(0, 255) for byte in range(size))
+  return ["Owner: " + owner, \
+          "Issuer: " + issuer, \
+          "Serial number: %x" % generator.getrandbits(64), \
+          "Valid from: " + start.strftime("%a %b %d %H:%M:%S ") + time_zone + start.strftime(" %Y") + \
+          " until: " + end.strftime("%a %b %d %H:%M:%S ") + time_zone + end.strftime(" %Y"), \
+          "Certificate fingerprints:", \
+          "\t MD5:  " + fingerprint(16), \
+          "\t SHA1: " + fingerprint(20), \
+          "\t SHA256: " + fingerprint(32)] + \
+         (["\t Signature algorithm name: " + generator.choice(signature_algorithms), \
+           "\t Version: 3"] if indented else \
+          ["Signature algorithm name: " + generator.choice(signature_algorithms), \
+           "Subject Public Key Algorithm: 2048-bit RSA key", \
+           "Version: 3"]) + \
+         ["", \
+          "Extensions: ", \
+          "", \
+          "#1: ObjectId: 2.5.29.19 Criticality=true", \
+          "BasicConstraints:[", \
+          "  CA:false", \
+          "  PathLen: undefined", \
+          "]", \
+          ""]
+
+"""
+This function writes a synthetic "keytool -list -v" data dump.
+
+Parameters:
+---------------------
+path: string
+This is the path of the data dump to create.
+
+entries: integer
+This is the number of entries in the data dump.
+
+private_ratio: float
+This is the share of the entries (between 0 and 1) that are key pairs (PrivateKeyEntry with a certificate chain of 2)
+instead of trusted certificates (trustedCertEntry).
+
+crlf: boolean
+This boolean is True to write the data dump with DOS (CRLF) line endings instead of UNIX (LF) line endings.
+
+host_every: integer
+This is the number of entries under each "============ servername:" host header (0 for no host headers).
+
+indented_ratio: float
+This is the share of the entries (between 0 and 1) that are printed the way older versions of keytool print them (see
+generateCertificateLines()).
+
+seed: integer
+This is the seed of the random metadata, so that the same data dump is created every time.
+
+Returns:
+---------------------
+integer
+This is the number of lines in the data dump.
+"""
+def generateDump(path, entries, private_ratio=0.3, crlf=False, host_every=0, indented_ratio=0.5, seed=0):
+  generator = random.Random(seed)
+  line_ending = "\r\n" if crlf else "\n"
+  line_count = 0
+  with io.open(path, 'w', newline='') as file:
+    lines = ["Keystore type: JKS", "Keystore provider: SUN", "", "Your keystore contains " + str(entries) + " entries", ""]
+    for entry in range(entries):
+      if host_every and entry % host_every == 0:
+        lines.append("============ servername: host" + str(entry // host_every) + ".example.com")
+        lines.append("")
+      owner = "CN=host" + str(entry) + ".example.com, OU=Operations, O=\"Example, Inc.\", L=City, ST=State, C=US"
+      issuer = "CN=Example Issuing CA " + str(entry % 5) + ", O=\"Example, Inc.\", C=US"
+      lines.append("Alias name: alias" + str(entry))
+      lines.append("Creation date: " + generator.choice(month_names) + " " + str(generator.randint(1, 28)) + ", 2018")
+      indented = generator.random() < indented_ratio
+      if generator.random() < private_ratio:
+        lines.append("Entry type: PrivateKeyEntry")
+        lines.append("Certificate chain length: 2")
+        lines.append("Certificate[1]:")
+        lines.extend(generateCertificateLines(generator, owner, issuer, indented))
+        lines.append("Certificate[2]:")
+        lines.extend(generateCertificateLines(generator, issuer, "CN=Example Root CA, O=\"Example, Inc.\", C=US", indented))
+      else:
+        lines.append("Entry type: trustedCertEntry")
+        lines.append("")
+        lines.extend(generateCertificateLines(generator, owner, issuer, indented))
+      lines.extend(entry_separator)
+      # The lines are written every so often so that large data dumps do not have to be held in memory
+      if len(lines) > 10000:
+        file.write(line_ending.join(lines) + line_ending)
+        line_count += len(lines)
+        lines = []
+    file.write(line_ending.join(lines) + line_ending)
+    line_count += len(lines)
+  return line_count
+
+"""
+This function resets the peak memory (RSS) of the process so that the next call to getPeakRSS() returns the peak from
+now on. This is only possible on Linux (through /proc/self/clear_refs), so False is returned everywhere else.
+"""
+def resetPeakRSS():
+  try:
+    with open("/proc/self/clear_refs", 'w') as file:
+      file.write("5")
+  except (IOError, OSError):
+    return False
+  return True
+
+"""
+This function returns the peak memory (RSS) of the process in MB (since it was last reset on Linux) or None when it is
+not known.
+"""
+def getPeakRSS():
+  try:
+    with open("/proc/self/status", 'r') as file:
+      for line in file:
+        # VmHWM is the peak since the last reset, in kB
+        if line.startswith("VmHWM:"):
+          return int(line.split()[1]) / 1024.0
+  except (IOError, OSError, ValueError):
+    pass
+  if resource is None:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Linux reports the peak in KB while macOS reports it in bytes
+  if sys.platform == "darwin":
+    return peak / (1024.0 * 1024.0)
+  return peak / 1024.0
+
+"""
+This function runs a stage a number of times and returns the fastest time along with what the stage returned. The peak
+memory is reset first where possible (see resetPeakRSS()).
+"""
+def timeStage(stage, repeat):
+  resetPeakRSS()
+  best = None
+  result = None
+  for run in range(repeat):
+    start = time.time()
+    result = stage()
+    elapsed = time.time() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return best, result
+
+"""
+This function reads every line of the data dump (the read stage).
+"""
+def readStage(path):
+  with io.open(path, 'r', newline='') as file:
+    return list(generate_results.readLines(file))
+
+"""
+This function looks up the prefix of every line in the dispatch table (the classify stage).
+"""
+def classifyStage(lines):
+  classifier = generate_results.line_classifier_dict
+  matches = 0
+  for line in lines:
+    if line[:line.find(':') + 1] in classifier:
+      matches += 1
+  return matches
+
+"""
+This function extracts the certificates out of the lines (the extract stage).
+"""
+def extractStage(lines):
+  return list(generate_results.extractCertificates(lines))
+
+"""
+This function extracts the certificates out of the data dump with the mmap engine (the mmap stage), which covers what
+the read, classify and extract stages do with the lines engine.
+"""
+def mmapStage(path):
+  return list(generate_results.extractMappedCertificates(path))
+
+"""
+This function creates the rows of the certificates and writes them to nowhere (the write stage).
+"""
+def writeStage(certificates):
+  with open(os.devnull, 'w') as file:
+    generate_results.results_writer = csv.writer(file, lineterminator='\n')
+    generate_results.writeCertificates(certificates)
+  return len(certificates)
+
+"""
+This function runs recursiveParsing() on the data dump with results.csv created in a temporary directory (the end to end
+stage).
+"""
+def endToEndStage(path, directory, engine="lines"):
+  current_directory = os.getcwd()
+  os.chdir(directory)
+  generate_results.engine = engine
+  try:
+    generate_results.openResultsFile()
+    generate_results.recursiveParsing(path)
+    generate_results.results.close()
+    generate_results.results = None
+  finally:
+    generate_results.engine = "lines"
+    os.chdir(current_directory)
+
+"""
+This function times every stage on a data dump.
+
+Parameters:
+---------------------
+path: string
+This is the path of the data dump.
+
+repeat: integer
+This is the number of times each stage is run (the fastest time is kept).
+
+Returns:
+---------------------
+list
+This is the list of (stage, seconds, lines, entries, peak RSS in MB) for each stage.
+"""
+def runBenchmark(path, repeat):
+  # The static columns would otherwise be prompted for
+  generate_results.setStaticColumns({"location" : "Location", "product" : "Product", "product_component" : "Component", \
+                                     "received_on" : "1/1/2018", "received_from" : "Benchmark", "host_names" : True})
+  generate_results.cert_store = path
+  generate_results.current_file = path
+  directory = tempfile.mkdtemp()
+  measurements = []
+  try:
+    # The console output of generate_results.py is thrown away rather than timed
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+      elapsed, lines = timeStage(lambda: readStage(path), repeat)
+      measurements.append(("read", elapsed, len(lines), None, getPeakRSS()))
+      elapsed, matches = timeStage(lambda: classifyStage(lines), repeat)
+      measurements.append(("classify", elapsed, len(lines), None, getPeakRSS()))
+      elapsed, certificates = timeStage(lambda: extractStage(lines), repeat)
+      measurements.append(("extract", elapsed, len(lines), len(certificates), getPeakRSS()))
+      elapsed, written = timeStage(lambda: writeStage(certificates), repeat)
+      measurements.append(("write", elapsed, None, len(certificates), getPeakRSS()))
+      elapsed, result = timeStage(lambda: endToEndStage(path, directory), repeat)
+      measurements.append(("end to end", elapsed, len(lines), len(certificates), getPeakRSS()))
+      elapsed, mapped_certificates = timeStage(lambda: mmapStage(path), repeat)
+      measurements.append(("mmap", elapsed, len(lines), len(mapped_certificates), getPeakRSS()))
+      elapsed, result = timeStage(lambda: endToEndStage(path, directory, "mmap"), repeat)
+      measurements.append(("mmap e2e", elapsed, len(lines), len(certificates), getPeakRSS()))
+  finally:
+    shutil.rmtree(directory)
+  return measurements
+
+"""
+This function formats a rate for the report.
+"""
+def formatRate(count, elapsed):
+  if count is None:
+    return "-"
+  if elapsed <= 0:
+    return "inf"
+  return "{:,.0f}".format(count / elapsed)
+
+"""
+This function reads the arguments that were passed to the program.
+"""
+def parseArguments(argv):
+  parser = argparse.ArgumentParser(description='Measures the throughput of generate_results.py on synthetic "keytool -list -v" data dumps.')
+  parser.add_argument('--entries', type=int, default=10000, help='The number of entries in the data dump (default: 10000)')
+  parser.add_argument('--private-ratio', type=float, default=0.3, help='The share of the entries that are key pairs instead of trusted certificates (default: 0.3)')
+  parser.add_argument('--crlf', action='store_true', help='Writes the data dump with DOS (CRLF) line endings')
+  parser.add_argument('--host-every', type=int, default=0, metavar='N', help='Adds a "============ servername:" host header every N entries (default: no host headers)')
+  parser.add_argument('--indented-ratio', type=float, default=0.5, help='The share of the entries that are printed the way older versions of keytool print them, with the signature algorithm indented under the fingerprints (default: 0.5)')
+  parser.add_argument('--seed', type=int, default=0, help='The seed of the random metadata (default: 0)')
+  parser.add_argument('--repeat', type=int, default=3, help='The number of times each stage is run, keeping the fastest (default: 3)')
+  parser.add_argument('--dump', help='Times an existing data dump instead of generating one')
+  parser.add_argument('--keep', metavar='FILE', help='Keeps the generated data dump at the path given')
+  args = parser.parse_args(argv)
+  if args.entries < 0:
+    parser.error("the number of entries cannot be negative")
+  if args.private_ratio < 0 or args.private_ratio > 1:
+    parser.error("the share of key pairs must be between 0 and 1")
+  if args.indented_ratio < 0 or args.indented_ratio > 1:
+    parser.error("the share of entries in the older layout must be between 0 and 1")
+  if args.repeat < 1:
+    parser.error("the number of repeats must be at least 1")
+  return args
+
+def main(argv):
+  args = parseArguments(argv)
+  path = args.dump
+  temporary_path = None
+  if path is None:
+    path = args.keep
+    if path is None:
+      file_descriptor, temporary_path = tempfile.mkstemp(suffix=".txt")
+      os.close(file_descriptor)
+      path = temporary_path
+    start = time.time()
+    line_count = generateDump(path, args.entries, args.private_ratio, args.crlf, args.host_every, args.indented_ratio, args.seed)
+    print("Generated {:,} entries ({:,} lines, {:,} bytes) in {:.2f}s".format(args.entries, line_count, os.path.getsize(path), time.time() - start))
+  path = os.path.abspath(path)
+
+  try:
+    measurements = runBenchmark(path, args.repeat)
+  finally:
+    if temporary_path is not None:
+      os.remove(temporary_path)
+
+  # Without a peak for each stage, the column is the peak of the process up to the end of each stage
+  per_stage = resetPeakRSS()
+  print("{:<12}{:>10}{:>16}{:>16}{:>14}".format("Stage", "Seconds", "Lines/sec", "Entries/sec", "Peak RSS MB" if per_stage else "Max RSS MB"))
+  for stage, elapsed, lines, entries, peak in measurements:
+    print("{:<12}{:>10.3f}{:>16}{:>16}{:>14}".format(stage, elapsed, formatRate(lines, elapsed), formatRate(entries, elapsed), \
+                                                     "-" if peak is None else "{:.1f}".format(peak)))
+  if not per_stage:
+    print("Max RSS is the peak of the process up to the end of each stage")
+
+  # Every entry of a generated data dump gives a certificate, so fewer certificates means that the parser dropped some
+  if args.dump is None:
+    for stage, elapsed, lines, entries, peak in measurements:
+      if entries is not None and entries != args.entries:
+        print("Warning: the {} stage extracted {:,} of the {:,} entries".format(stage, entries, args.entries))
+
+if __name__ == '__main__':
+  # Starting the main function
+  # This try and except is meant to catch a Ctrl+C sudden stop without raising larger concerns
+  try:
+    # Takes input arguments beside the name of the script
+    main(sys.argv[1:])
+  except KeyboardInterrupt:
+    print('Suddenly exiting: Caused by Ctrl+C')
+    sys.exit(0) # Raising the SystemExit exception without classifying the exit as something caused by an error
@@ -0,0 +1,1120 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import re
+import base64
+import struct
+import hashlib
+import hmac
+import datetime
+
+# pycryptodomex decrypts the certificates of PKCS12 keystores. It is only needed for them: JKS and JCEKS keystores and
+# certificate files are read without it.
+try:
+  from Cryptodome.Cipher import AES, ARC2, ARC4, DES3
+except ImportError:
+  AES = None
+
+"""
+The aim of this file is to read the certificates out of keystores directly so that a keystore does not have to be
+listed with "keytool -list -v" (which starts a JVM for every keystore) before its metadata can be extracted.
+
+The following keystores are supported:
+* JKS and JCEKS (the certificates are not encrypted, so no password is needed unless the integrity is to be checked)
+* PKCS12 (the password is needed to decrypt the certificates, which may be encrypted with any of the algorithms that
+  keytool and OpenSSL use: PBES2 with AES or 3DES, or the PKCS12 PBE algorithms with RC2, 3DES or RC4, which are
+  decrypted with pycryptodomex)
+
+Loose certificate files are also supported, whether they hold a single certificate or a bundle of them:
+* PEM (.pem, .crt, .cer, CA bundles), including PKCS7 blocks
+* DER (.der, .cer) with a single certificate or a PKCS7 bundle (.p7b)
+
+Only the public parts of the keystores are read. Private and secret keys are never decrypted (the secret keys of JCEKS
+keystores are entries without a certificate).
+"""
+
+"""
+This exception is raised whenever a keystore or certificate cannot be read.
+"""
+class KeystoreError(Exception):
+  pass
+
+# Entry types as keytool prints them
+private_key_type = "PrivateKeyEntry"
+trusted_cert_type = "trustedCertEntry"
+secret_key_type = "SecretKeyEntry"
+
+# Magic numbers at the start of JKS and JCEKS keystores
+jks_magic = b"\xfe\xed\xfe\xed"
+jceks_magic = b"\xce\xce\xce\xce"
+# Start of a PKCS7 bundle in DER (the signed data OID)
+pkcs7_der_start = b"\x06\x09\x2a\x86\x48\x86\xf7\x0d\x01\x07\x02"
+# Used by keytool when computing the integrity check of JKS and JCEKS keystores
+jks_whitener = b"Mighty Aphrodite"
+
+# Any of these in a file marks it as a PEM file. A PEM file may start with a private key that is followed by its certificate.
+pem_markers = (b"-----BEGIN CERTIFICATE-----", b"-----BEGIN X509 CERTIFICATE-----", b"-----BEGIN TRUSTED CERTIFICATE-----", \
+               b"-----BEGIN PKCS7-----", b"PRIVATE KEY-----")
+# Matches every block of a PEM file (its label and its base64 encoded content)
+pem_block_pattern = re.compile(b"-----BEGIN ([A-Z0-9 ]+)-----(.*?)-----END \\1-----", re.DOTALL)
+# Labels of the PEM blocks that hold a certificate
+pem_certificate_labels = (b"CERTIFICATE", b"X509 CERTIFICATE", b"TRUSTED CERTIFICATE")
+pem_pkcs7_label = b"PKCS7"
+
+# ASN.1 tags
+integer_tag = 0x02
+bit_string_tag = 0x03
+octet_string_tag = 0x04
+null_tag = 0x05
+oid_tag = 0x06
+utf8_string_tag = 0x0c
+printable_string_tag = 0x13
+t61_string_tag = 0x14
+ia5_string_tag = 0x16
+utc_time_tag = 0x17
+generalized_time_tag = 0x18
+universal_string_tag = 0x1c
+bmp_string_tag = 0x1e
+sequence_tag = 0x30
+set_tag = 0x31
+
+# Object identifiers of the PKCS7 content types and PKCS12 bag types and attributes
+data_oid = "1.2.840.113549.1.7.1"
+signed_data_oid = "1.2.840.113549.1.7.2"
+encrypted_data_oid = "1.2.840.113549.1.7.6"
+key_bag_oid = "1.2.840.113549.1.12.10.1.1"
+shrouded_key_bag_oid = "1.2.840.113549.1.12.10.1.2"
+cert_bag_oid = "1.2.840.113549.1.12.10.1.3"
+safe_contents_bag_oid = "1.2.840.113549.1.12.10.1.6"
+x509_certificate_oid = "1.2.840.113549.1.9.22.1"
+friendly_name_oid = "1.2.840.113549.1.9.20"
+local_key_id_oid = "1.2.840.113549.1.9.21"
+# Attribute that keytool adds to the trusted certificates of a PKCS12 keystore
+java_trusted_oid = "2.16.840.1.113894.746875.1.1"
+pbes2_oid = "1.2.840.113549.1.5.13"
+pbkdf2_oid = "1.2.840.113549.1.5.12"
+
+# Java serialization (the secret keys of JCEKS keystores are serialized Java objects, which are skipped over)
+java_stream_start = b"\xac\xed\x00\x05"
+java_null_tag = 0x70
+java_reference_tag = 0x71
+java_class_description_tag = 0x72
+java_object_tag = 0x73
+java_string_tag = 0x74
+java_array_tag = 0x75
+java_block_data_tag = 0x77
+java_end_block_data_tag = 0x78
+java_long_block_data_tag = 0x7a
+java_long_string_tag = 0x7c
+java_enum_tag = 0x7e
+java_first_handle = 0x7e0000
+# Flags of a class description: the class writes more than its fields, or writes itself (in block data)
+java_write_method_flag = 0x01
+java_externalizable_flag = 0x04
+java_block_data_flag = 0x08
+# Maps the type codes of the primitive fields to their size
+java_primitive_size_dict = {"B" : 1, "C" : 2, "D" : 8, "F" : 4, "I" : 4, "J" : 8, "S" : 2, "Z" : 1}
+
+# Maps the signature algorithms to the names that keytool prints
+signature_algorithm_dict = {"1.2.840.113549.1.1.2" : "MD2withRSA", \
+                            "1.2.840.113549.1.1.4" : "MD5withRSA", \
+                            "1.2.840.113549.1.1.5" : "SHA1withRSA", \
+                            "1.2.840.113549.1.1.10" : "RSASSA-PSS", \
+                            "1.2.840.113549.1.1.11" : "SHA256withRSA", \
+                            "1.2.840.113549.1.1.12" : "SHA384withRSA", \
+                            "1.2.840.113549.1.1.13" : "SHA512withRSA", \
+                            "1.2.840.113549.1.1.14" : "SHA224withRSA", \
+                            "1.2.840.10045.4.1" : "SHA1withECDSA", \
+                            "1.2.840.10045.4.3.1" : "SHA224withECDSA", \
+                            "1.2.840.10045.4.3.2" : "SHA256withECDSA", \
+                            "1.2.840.10045.4.3.3" : "SHA384withECDSA", \
+                            "1.2.840.10045.4.3.4" : "SHA512withECDSA", \
+                            "1.2.840.10040.4.3" : "SHA1withDSA", \
+                            "2.16.840.1.101.3.4.3.1" : "SHA224withDSA", \
+                            "2.16.840.1.101.3.4.3.2" : "SHA256withDSA", \
+                            "1.3.101.112" : "Ed25519", \
+                            "1.3.101.113" : "Ed448"}
+
+# Maps the attributes of a distinguished name to the keywords that keytool prints
+name_attribute_dict = {"2.5.4.3" : "CN", \
+                       "2.5.4.4" : "SURNAME", \
+                       "2.5.4.5" : "SERIALNUMBER", \
+                       "2.5.4.6" : "C", \
+                       "2.5.4.7" : "L", \
+                       "2.5.4.8" : "ST", \
+                       "2.5.4.9" : "STREET", \
+                       "2.5.4.10" : "O", \
+                       "2.5.4.11" : "OU", \
+                       "2.5.4.12" : "T", \
+                       "2.5.4.42" : "GIVENNAME", \
+                       "2.5.4.43" : "INITIALS", \
+                       "2.5.4.44" : "GENERATION", \
+                       "2.5.4.46" : "DNQUALIFIER", \
+                       "1.2.840.113549.1.9.1" : "EMAILADDRESS", \
+                       "0.9.2342.19200300.100.1.1" : "UID", \
+                       "0.9.2342.19200300.100.1.25" : "DC"}
+
+# Maps the hash algorithms (used by the MAC and PBKDF2) to their hashlib names
+hash_algorithm_dict = {"1.3.14.3.2.26" : "sha1", \
+                       "2.16.840.1.101.3.4.2.1" : "sha256", \
+                       "2.16.840.1.101.3.4.2.2" : "sha384", \
+                       "2.16.840.1.101.3.4.2.3" : "sha512", \
+                       "2.16.840.1.101.3.4.2.4" : "sha224", \
+                       "1.2.840.113549.2.7" : "sha1", \
+                       "1.2.840.113549.2.8" : "sha224", \
+                       "1.2.840.113549.2.9" : "sha256", \
+                       "1.2.840.113549.2.10" : "sha384", \
+                       "1.2.840.113549.2.11" : "sha512"}
+
+# Maps the PKCS12 PBE algorithms to their cipher, key length and effective key bits (for RC2)
+pkcs12_pbe_dict = {"1.2.840.113549.1.12.1.1" : ("rc4", 16, 0), \
+                   "1.2.840.113549.1.12.1.2" : ("rc4", 5, 0), \
+                   "1.2.840.113549.1.12.1.3" : ("3des", 24, 0), \
+                   "1.2.840.113549.1.12.1.4" : ("3des", 16, 0), \
+                   "1.2.840.113549.1.12.1.5" : ("rc2", 16, 128), \
+                   "1.2.840.113549.1.12.1.6" : ("rc2", 5, 40)}
+
+# Maps the PBES2 encryption schemes to their cipher and key length
+pbes2_cipher_dict = {"2.16.840.1.101.3.4.1.2" : ("aes", 16), \
+                     "2.16.840.1.101.3.4.1.22" : ("aes", 24), \
+                     "2.16.840.1.101.3.4.1.42" : ("aes", 32), \
+                     "1.2.840.113549.3.7" : ("3des", 24)}
+
+"""
+This class holds the metadata of an X.509 certificate in the same form that keytool prints it in.
+"""
+class X509Certificate(object):
+  __slots__ = ("der", "subject", "common_name", "issuer", "serial_number", "not_before", "not_after", "signature_algorithm")
+
+  """
+  Returns the SHA-256 fingerprint of the certificate in the same format as keytool (upper case hex separated by colons).
+  """
+  def getFingerprint(self):
+    digest = hashlib.sha256(self.der).hexdigest().upper()
+    return ':'.join(digest[i:i + 2] for i in range(0, len(digest), 2))
+
+"""
+This class holds a single entry of a keystore: its alias, its entry type (as keytool prints it), its certificate (the
+first certificate of the certificate chain for a private key, None for a secret key) and the other certificates of its
+certificate chain.
+"""
+class KeystoreEntry(object):
+  __slots__ = ("alias", "entry_type", "certificate", "chain")
+
+  def __init__(self, alias, entry_type, certificate, chain=()):
+    self.alias = alias
+    self.entry_type = entry_type
+    self.certificate = certificate
+    self.chain = list(chain)
+
+"""
+This function reads a single DER (or BER) encoded element.
+
+Parameters:
+---------------------
+data: bytes
+This is the encoded data.
+
+offset: integer
+This is the position of the element within the data.
+
+Returns:
+---------------------
+tag: integer
+This is the tag of the element.
+
+content: bytes
+This is the content of the element.
+
+next_offset: integer
+This is the position right after the element.
+"""
+def readElement(data, offset=0):
+  if offset + 2 > len(data):
+    raise KeystoreError("The data ends in the middle of an element")
+  tag = bytearray(data[offset:offset + 1])[0]
+  length = bytearray(data[offset + 1:offset + 2])[0]
+  offset += 2
+  if length == 0x80:
+    # BER indefinite length: the content goes on until the end-of-contents marker
+    start = offset
+    while data[offset:offset + 2] != b"\x00\x00":
+      offset = readElement(data, offset)[2]
+    return tag, data[start:offset], offset + 2
+  if length & 0x80:
+    length_bytes = length & 0x7f
+    length = 0
+    for byte in bytearray(data[offset:offset + length_bytes]):
+      length = (length << 8) | byte
+    offset += length_bytes
+  if offset + length > len(data):
+    raise KeystoreError("The data ends in the middle of an element")
+  return tag, data[offset:offset + length], offset + length
+
+"""
+This function reads all of the elements within the content of a constructed element (such as a SEQUENCE or SET).
+"""
+def readChildren(content):
+  children = []
+  offset = 0
+  while offset < len(content):
+    tag, child, offset = readElement(content, offset)
+    children.append((tag, child))
+  return children
+
+"""
+This function reads the content of an OCTET STRING, joining the pieces of a BER constructed OCTET STRING.
+"""
+def readOctetString(tag, content):
+  if tag & 0x20:
+    return b"".join(readOctetString(child_tag, child) for child_tag, child in readChildren(content))
+  return content
+
+"""
+This function converts the content of an OBJECT IDENTIFIER into its dotted form.
+"""
+def decodeOID(content):
+  values = []
+  value = 0
+  for byte in bytearray(content):
+    value = (value << 7) | (byte & 0x7f)
+    if not byte & 0x80:
+      values.append(value)
+      value = 0
+  if not values:
+    return ""
+  first = min(values[0] // 40, 2)
+  return '.'.join(str(number) for number in [first, values[0] - first * 40] + values[1:])
+
+"""
+This function converts the content of an INTEGER into an integer.
+"""
+def decodeInteger(content):
+  value = 0
+  for byte in bytearray(content):
+    value = (value << 8) | byte
+  if content and bytearray(content)[0] & 0x80:
+    value -= 1 << (8 * len(content))
+  return value
+
+"""
+This function converts the content of a string into text.
+"""
+def decodeString(tag, content):
+  if tag == bmp_string_tag:
+    return content.decode("utf-16-be", "replace")
+  if tag == universal_string_tag:
+    return content.decode("utf-32-be", "replace")
+  if tag == t61_string_tag:
+    return content.decode("latin-1")
+  return content.decode("utf-8", "replace")
+
+"""
+This function converts a UTCTime or GeneralizedTime into a datetime in UTC.
+"""
+def decodeTime(tag, content):
+  text = content.decode("ascii", "replace").rstrip("Z")
+  try:
+    if tag == utc_time_tag:
+      parsed_time = datetime.datetime.strptime(text[:12], "%y%m%d%H%M%S")
+      # Two digit years from 50 to 99 are 1950 to 1999 (RFC 5280)
+      if parsed_time.year >= 2050:
+        parsed_time = parsed_time.replace(year=parsed_time.year - 100)
+    else:
+      parsed_time = datetime.datetime.strptime(text[:14], "%Y%m%d%H%M%S")
+  except ValueError:
+    raise KeystoreError("The certificate has an invalid date: " + text)
+  return parsed_time.replace(tzinfo=datetime.timezone.utc)
+
+"""
+This function formats a value of a distinguished name the same way keytool does, which puts quotes around any value
+with special characters in it.
+"""
+def formatNameValue(value):
+  if value == "" or value[0] == ' ' or value[-1] == ' ' or any(character in value for character in ',+=\n<>#;"\\'):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+  return value
+
+"""
+This function formats the content of a distinguished name (a SEQUENCE of SETs of attributes) the same way keytool prints
+it on the "Owner:" and "Issuer:" lines (the most specific attribute first).
+"""
+def formatName(content):
+  relative_names = []
+  for set_tag_value, relative_name in readChildren(content):
+    attributes = []
+    for sequence_tag_value, attribute in readChildren(relative_name):
+      (oid_tag_value, oid), (value_tag, value) = readChildren(attribute)[:2]
+      oid = decodeOID(oid)
+      if oid in name_attribute_dict:
+        attributes.append(name_attribute_dict[oid] + '=' + formatNameValue(decodeString(value_tag, value)))
+      else:
+        attributes.append("OID." + oid + '=' + formatNameValue(decodeString(value_tag, value)))
+    relative_names.append(" + ".join(attributes))
+  relative_names.reverse()
+  return ", ".join(relative_names)
+
+"""
+This function returns the most specific common name (the one keytool prints first) of a distinguished name or None if
+the distinguished name does not have a common name.
+"""
+def findCommonName(content):
+  common_name = None
+  for set_tag_value, relative_name in readChildren(content):
+    for sequence_tag_value, attribute in readChildren(relative_name):
+      (oid_tag_value, oid), (value_tag, value) = readChildren(attribute)[:2]
+      if decodeOID(oid) == "2.5.4.3":
+        common_name = decodeString(value_tag, value)
+  return common_name
+
+"""
+This function reads the metadata out of a DER encoded X.509 certificate.
+
+Parameters:
+---------------------
+der: bytes
+This is the DER encoded certificate.
+
+Returns:
+---------------------
+certificate: X509Certificate
+This is the metadata of the certificate.
+"""
+def parseCertificate(der):
+  try:
+    tag, content, next_offset = readElement(der)
+    tbs_tag, tbs = readChildren(content)[0]
+    fields = readChildren(tbs)
+    # The version is optional and tagged with [0]
+    if fields[0][0] == 0xa0:
+      fields = fields[1:]
+    certificate = X509Certificate()
+    certificate.der = bytes(der[:next_offset])
+    certificate.serial_number = formatSerialNumber(decodeInteger(fields[0][1]))
+    signature_oid = decodeOID(readChildren(fields[1][1])[0][1])
+    certificate.signature_algorithm = signature_algorithm_dict.get(signature_oid, signature_oid)
+    certificate.issuer = formatName(fields[2][1])
+    (not_before_tag, not_before), (not_after_tag, not_after) = readChildren(fields[3][1])[:2]
+    certificate.not_before = decodeTime(not_before_tag, not_before)
+    certificate.not_after = decodeTime(not_after_tag, not_after)
+    certificate.subject = formatName(fields[4][1])
+    certificate.common_name = findCommonName(fields[4][1])
+  except (IndexError, ValueError, KeystoreError) as e:
+    raise KeystoreError("The certificate could not be read: " + str(e))
+  return certificate
+
+"""
+This function formats a serial number the same way keytool does (lower case hex without leading zeros).
+"""
+def formatSerialNumber(serial_number):
+  if serial_number < 0:
+    return '-' + format(-serial_number, 'x')
+  return format(serial_number, 'x')
+
+"""
+This function determines the type of a keystore or certificate file from its first bytes.
+
+Parameters:
+---------------------
+start: bytes
+This is the start of the file (the first few KB are enough).
+
+Returns:
+---------------------
+string
+This string is "jks" for a JKS or JCEKS keystore, "pkcs12" for a PKCS12 keystore, "der" for a DER encoded certificate or
+PKCS7 bundle, "pem" for a PEM file and None for any other file.
+"""
+def detectFileType(start):
+  if start[:4] == jks_magic or start[:4] == jceks_magic:
+    return "jks"
+  if start[:1] == b"\x30":
+    # A PKCS12 keystore is a SEQUENCE (of any length form) that starts with the INTEGER 3, a certificate is a SEQUENCE
+    # that starts with another SEQUENCE and a PKCS7 bundle is a SEQUENCE that starts with the signed data OID
+    offset = skipHeader(start, 0)
+    if start[offset:offset + 3] == b"\x02\x01\x03":
+      return "pkcs12"
+    if start[offset:offset + 1] == b"\x30":
+      inner_offset = skipHeader(start, offset)
+      if start[inner_offset:inner_offset + 1] == b"\x02" or start[inner_offset:inner_offset + 4] == b"\xa0\x03\x02\x01":
+        return "der"
+    if start[offset:offset + len(pkcs7_der_start)] == pkcs7_der_start:
+      return "der"
+  for marker in pem_markers:
+    if marker in start:
+      return "pem"
+  return None
+
+"""
+This function determines the type of a keystore or certificate file from its first bytes in more detail than
+detectFileType(): "jks" and "jceks" are told apart, as are PKCS7 bundles ("pkcs7", in PEM or DER) and certificates
+("der" or "pem").
+"""
+def detectContainerType(start):
+  file_type = detectFileType(start)
+  if file_type == "jks" and start[:4] == jceks_magic:
+    return "jceks"
+  if file_type == "der" and start[skipHeader(start, 0):].startswith(pkcs7_der_start):
+    return "pkcs7"
+  if file_type == "pem" and b"-----BEGIN PKCS7-----" in start:
+    return "pkcs7"
+  return file_type
+
+"""
+This function returns the position of the content of the element at the offset given without checking its length.
+"""
+def skipHeader(data, offset):
+  length = bytearray(data[offset + 1:offset + 2] or b"\x00")[0]
+  if length & 0x80 and length != 0x80:
+    return offset + 2 + (length & 0x7f)
+  return offset + 2
+
+"""
+This function reads the entries of the keystore or certificate file at the path given, whatever its type. The
+certificates of a certificate file are trusted certificate entries named after their common name (or the file when they
+do not have one), except for the first certificate of a PEM file with a private key in it, which is a private key entry.
+
+Parameters:
+---------------------
+path: string
+This is the path of the keystore or certificate file.
+
+password: string
+This is the password of the keystore (see readKeystore()). It is not used for certificate files.
+
+Returns:
+---------------------
+list
+This is the list of KeystoreEntry in the order they are in the file.
+"""
+def readEntries(path, password=None):
+  with open(path, 'rb') as file:
+    data = file.read()
+  file_type = detectFileType(data[:4096])
+  if file_type == "jks":
+    return readJKS(data, password)
+  if file_type == "pkcs12":
+    return readPKCS12(data, password)
+
+  has_private_key = False
+  if file_type == "der":
+    certificates = readDER(data)
+  else:
+    certificates, has_private_key = readPEM(data)
+  name = os.path.splitext(os.path.basename(path))[0]
+  entries = []
+  for certificate in certificates:
+    entry_type = trusted_cert_type
+    if has_private_key and not entries:
+      entry_type = private_key_type
+    entries.append(KeystoreEntry(certificate.common_name or name, entry_type, certificate))
+  return entries
+
+"""
+This function reads the certificates of a DER file, which holds either a single certificate or a PKCS7 bundle.
+"""
+def readDER(data):
+  try:
+    tag, content = readElement(data)[:2]
+    children = readChildren(content)
+    if children and children[0][0] == oid_tag:
+      return readPKCS7(content)
+  except (IndexError, ValueError) as e:
+    raise KeystoreError("The certificate file could not be read: " + str(e))
+  return [parseCertificate(data)]
+
+"""
+This function reads the certificates of a PKCS7 bundle (the content of its ContentInfo).
+"""
+def readPKCS7(content):
+  children = readChildren(content)
+  if decodeOID(children[0][1]) != signed_data_oid:
+    raise KeystoreError("The PKCS7 bundle does not hold signed data")
+  certificates = []
+  for tag, signed_data in readChildren(readElement(children[1][1])[1]):
+    # The certificates are tagged with [0] after the version, the digest algorithms and the content
+    if tag == 0xa0:
+      offset = 0
+      while offset < len(signed_data):
+        start = offset
+        offset = readElement(signed_data, offset)[2]
+        certificates.append(parseCertificate(signed_data[start:offset]))
+  return certificates
+
+"""
+This function reads every certificate of a PEM file in one pass. Certificates and PKCS7 bundles are decoded and private
+keys are only noted, so that the certificate that goes with the key can be marked as a key pair.
+
+Returns:
+---------------------
+certificates: list
+This is the list of X509Certificate in the order they are in the file.
+
+has_private_key: boolean
+This boolean is True if the file also holds a private key.
+"""
+def readPEM(data):
+  certificates = []
+  has_private_key = False
+  for match in pem_block_pattern.finditer(data):
+    label = match.group(1)
+    if label.endswith(b"PRIVATE KEY"):
+      has_private_key = True
+      continue
+    if label not in pem_certificate_labels and label != pem_pkcs7_label:
+      continue
+    try:
+      der = base64.b64decode(b"".join(match.group(2).split()))
+    except (TypeError, ValueError):
+      raise KeystoreError("The PEM file has a block that is not valid base64")
+    if label == pem_pkcs7_label:
+      certificates.extend(readDER(der))
+    else:
+      certificates.append(parseCertificate(der))
+  return certificates, has_private_key
+
+"""
+This function reads the keystore at the path given, whatever its type.
+
+Parameters:
+---------------------
+path: string
+This is the path of the keystore.
+
+password: string
+This is the password of the keystore. It is needed for PKCS12 keystores (where the empty password is tried when no
+password is given) and is used to check the integrity of JKS and JCEKS keystores when given.
+
+Returns:
+---------------------
+list
+This is the list of KeystoreEntry in the order they are in the keystore.
+"""
+def readKeystore(path, password=None):
+  with open(path, 'rb') as file:
+    data = file.read()
+  if detectFileType(data[:16]) == "jks":
+    return readJKS(data, password)
+  return readPKCS12(data, password)
+
+"""
+This function reads the entries of a JKS or JCEKS keystore.
+"""
+def readJKS(data, password=None):
+  entries = []
+  try:
+    magic, version, count = struct.unpack(">4sII", data[:12])
+    if version != 1 and version != 2:
+      raise KeystoreError("Unsupported keystore version: " + str(version))
+    offset = 12
+    for entry_number in range(count):
+      tag, = struct.unpack(">I", data[offset:offset + 4])
+      alias, offset = readJavaString(data, offset + 4)
+      # Skipping the creation date
+      offset += 8
+      if tag == 1:
+        key_length, = struct.unpack(">I", data[offset:offset + 4])
+        offset += 4 + key_length
+        chain_length, = struct.unpack(">I", data[offset:offset + 4])
+        offset += 4
+        chain = []
+        for chain_number in range(chain_length):
+          certificate, offset = readJKSCertificate(data, offset, version)
+          chain.append(certificate)
+        if chain:
+          entries.append(KeystoreEntry(alias, private_key_type, chain[0], chain[1:]))
+      elif tag == 2:
+        certificate, offset = readJKSCertificate(data, offset, version)
+        entries.append(KeystoreEntry(alias, trusted_cert_type, certificate))
+      elif tag == 3:
+        # Secret keys (JCEKS) are stored as serialized Java objects and have no certificate
+        offset = skipJavaObject(data, offset)
+        entries.append(KeystoreEntry(alias, secret_key_type, None))
+      else:
+        raise KeystoreError("Unsupported keystore entry: " + alias)
+  except (struct.error, IndexError):
+    raise KeystoreError("The keystore ends in the middle of an entry")
+
+  if password is not None:
+    digest = hashlib.sha1(password.encode("utf-16-be") + jks_whitener + data[:offset]).digest()
+    if digest != data[offset:offset + 20]:
+      raise KeystoreError("Keystore was tampered with, or password was incorrect")
+  return entries
+
+"""
+This function reads a string that was written by Java's DataOutputStream.writeUTF().
+"""
+def readJavaString(data, offset):
+  length, = struct.unpack(">H", data[offset:offset + 2])
+  # Java's modified UTF-8 writes the null character as two bytes
+  return data[offset + 2:offset + 2 + length].replace(b"\xc0\x80", b"\x00").decode("utf-8", "replace"), offset + 2 + length
+
+"""
+This function skips over an object that was written by Java's ObjectOutputStream, such as a secret key of a JCEKS
+keystore.
+
+Parameters:
+---------------------
+data: bytes
+This is the keystore.
+
+offset: integer
+This is the position of the start of the stream.
+
+Returns:
+---------------------
+integer
+This is the position of the end of the stream.
+"""
+def skipJavaObject(data, offset):
+  if data[offset:offset + 4] != java_stream_start:
+    raise KeystoreError("The secret key is not a serialized Java object")
+  return skipJavaContent(data, offset + 4, [])[1]
+
+"""
+This function skips over an element of a Java serialization stream (see skipJavaObject()), keeping the handles that the
+later elements can refer back to.
+
+Parameters:
+---------------------
+data: bytes
+This is the keystore.
+
+offset: integer
+This is the position of the element.
+
+handles: list
+This is the list of the elements that were given a handle so far.
+
+Returns:
+---------------------
+value
+This is the class description (as [name, flags, field type codes, superclass description]) or the string of the
+element, and None for the other elements.
+
+integer
+This is the position of the end of the element.
+"""
+def skipJavaContent(data, offset, handles):
+  tag = data[offset]
+  offset += 1
+  if tag == java_null_tag:
+    return None, offset
+  if tag == java_reference_tag:
+    handle, = struct.unpack(">I", data[offset:offset + 4])
+    return handles[handle - java_first_handle], offset + 4
+  if tag == java_string_tag or tag == java_long_string_tag:
+    if tag == java_string_tag:
+      length, = struct.unpack(">H", data[offset:offset + 2])
+      offset += 2
+    else:
+      length, = struct.unpack(">Q", data[offset:offset + 8])
+      offset += 8
+    value = data[offset:offset + length].decode("utf-8", "replace")
+    handles.append(value)
+    return value, offset + length
+  if tag == java_class_description_tag:
+    name, offset = readJavaString(data, offset)
+    # Skipping the serial version UID
+    description = [name, data[offset + 8], [], None]
+    handles.append(description)
+    count, = struct.unpack(">H", data[offset + 9:offset + 11])
+    offset += 11
+    for field_number in range(count):
+      type_code = chr(data[offset])
+      offset = readJavaString(data, offset + 1)[1]
+      if type_code not in java_primitive_size_dict:
+        # The name of the class of the field
+        offset = skipJavaContent(data, offset, handles)[1]
+      description[2].append(type_code)
+    offset = skipJavaBlock(data, offset, handles)
+    description[3], offset = skipJavaContent(data, offset, handles)
+    return description, offset
+  if tag == java_object_tag:
+    description, offset = skipJavaContent(data, offset, handles)
+    handles.append(None)
+    # The fields of the superclasses come first
+    hierarchy = []
+    while description is not None:
+      hierarchy.insert(0, description)
+      description = description[3]
+    for name, flags, type_codes, superclass in hierarchy:
+      if flags & java_externalizable_flag:
+        if not flags & java_block_data_flag:
+          raise KeystoreError("Unsupported serialized Java object: " + name)
+        offset = skipJavaBlock(data, offset, handles)
+        continue
+      for type_code in type_codes:
+        if type_code in java_primitive_size_dict:
+          offset += java_primitive_size_dict[type_code]
+        else:
+          offset = skipJavaContent(data, offset, handles)[1]
+      if flags & java_write_method_flag:
+        offset = skipJavaBlock(data, offset, handles)
+    return None, offset
+  if tag == java_array_tag:
+    description, offset = skipJavaContent(data, offset, handles)
+    handles.append(None)
+    length, = struct.unpack(">I", data[offset:offset + 4])
+    offset += 4
+    # The name of the class of an array is "[" followed by the type code of its elements
+    element_size = java_primitive_size_dict.get(description[0][1:2])
+    if element_size is not None:
+      return None, offset + length * element_size
+    for element_number in range(length):
+      offset = skipJavaContent(data, offset, handles)[1]
+    return None, offset
+  if tag == java_enum_tag:
+    offset = skipJavaContent(data, offset, handles)[1]
+    handles.append(None)
+    return None, skipJavaContent(data, offset, handles)[1]
+  raise KeystoreError("Unsupported serialized Java object")
+
+"""
+This function skips over the data that a class writes after its fields (or instead of them), up to the end of the block.
+"""
+def skipJavaBlock(data, offset, handles):
+  while data[offset] != java_end_block_data_tag:
+    if data[offset] == java_block_data_tag:
+      offset += 2 + data[offset + 1]
+    elif data[offset] == java_long_block_data_tag:
+      offset += 5 + struct.unpack(">I", data[offset + 1:offset + 5])[0]
+    else:
+      offset = skipJavaContent(data, offset, handles)[1]
+  return offset + 1
+
+"""
+This function reads a certificate out of a JKS or JCEKS keystore.
+"""
+def readJKSCertificate(data, offset, version):
+  if version == 2:
+    certificate_type, offset = readJavaString(data, offset)
+    if certificate_type != "X.509":
+      raise KeystoreError("Unsupported certificate type: " + certificate_type)
+  length, = struct.unpack(">I", data[offset:offset + 4])
+  offset += 4
+  return parseCertificate(data[offset:offset + length]), offset + length
+
+"""
+This function reads the entries of a PKCS12 keystore.
+"""
+def readPKCS12(data, password=None):
+  try:
+    tag, content, next_offset = readElement(data)
+    pfx = readChildren(content)
+    if tag != sequence_tag or decodeInteger(pfx[0][1]) != 3:
+      raise KeystoreError("The file is not a PKCS12 keystore")
+    content_type, auth_safe = readContentInfo(pfx[1][1])
+    if content_type != data_oid:
+      raise KeystoreError("Only password integrity is supported for PKCS12 keystores")
+
+    # The empty password can be encoded either with or without the two null bytes at the end
+    passwords = [password] if password else ["", None]
+    if len(pfx) > 2:
+      password = None
+      for candidate in passwords:
+        if checkMAC(pfx[2][1], auth_safe, candidate):
+          password = candidate
+          break
+      else:
+        raise KeystoreError("Keystore was tampered with, or password was incorrect")
+    else:
+      password = passwords[0]
+
+    bags = []
+    for content_info_tag, content_info in readChildren(readElement(auth_safe)[1]):
+      content_type, content = readContentInfo(content_info)
+      if content_type == data_oid:
+        readSafeContents(content, bags)
+      elif content_type == encrypted_data_oid:
+        readSafeContents(decryptEncryptedData(content, password), bags)
+  except (IndexError, ValueError, struct.error) as e:
+    raise KeystoreError("The PKCS12 keystore could not be read: " + str(e))
+  return createPKCS12Entries(bags)
+
+"""
+This function reads a ContentInfo and returns its content type and its content (the OCTET STRING for data).
+"""
+def readContentInfo(content):
+  children = readChildren(content)
+  content_type = decodeOID(children[0][1])
+  tag, inner = readElement(children[1][1])[:2]
+  if content_type == data_oid:
+    return content_type, readOctetString(tag, inner)
+  return content_type, inner
+
+"""
+This function checks the MAC of a PKCS12 keystore with the password given.
+"""
+def checkMAC(mac_data, auth_safe, password):
+  children = readChildren(mac_data)
+  digest_info = readChildren(children[0][1])
+  hash_name = hash_algorithm_dict.get(decodeOID(readChildren(digest_info[0][1])[0][1]))
+  if hash_name is None:
+    raise KeystoreError("Unsupported MAC algorithm")
+  salt = children[1][1]
+  iterations = 1
+  if len(children) > 2:
+    iterations = decodeInteger(children[2][1])
+  key = derivePKCS12Key(hash_name, encodeBMPPassword(password), salt, 3, iterations, hashlib.new(hash_name).digest_size)
+  return hmac.compare_digest(hmac.new(key, auth_safe, hash_name).digest(), bytes(digest_info[1][1]))
+
+"""
+This function reads the bags of a SafeContents into the list of bags as (bag type, bag value, friendly name, local key id).
+"""
+def readSafeContents(content, bags):
+  for sequence_tag_value, safe_bag in readChildren(readElement(content)[1]):
+    children = readChildren(safe_bag)
+    bag_type = decodeOID(children[0][1])
+    bag_value = readElement(children[1][1])[1]
+    friendly_name = None
+    local_key_id = None
+    trusted = False
+    if len(children) > 2:
+      for attribute_tag, attribute in readChildren(children[2][1]):
+        attribute_type, values = readChildren(attribute)
+        attribute_type = decodeOID(attribute_type[1])
+        value_tag, value = readChildren(values[1])[0]
+        if attribute_type == friendly_name_oid:
+          friendly_name = decodeString(value_tag, value)
+        elif attribute_type == local_key_id_oid:
+          local_key_id = bytes(value)
+        elif attribute_type == java_trusted_oid:
+          trusted = True
+    if bag_type == safe_contents_bag_oid:
+      readSafeContents(children[1][1], bags)
+    else:
+      bags.append((bag_type, bag_value, friendly_name, local_key_id, trusted))
+
+"""
+This function finds the rest of the certificate chain of the first certificate of a private key entry of a PKCS12
+keystore, which keytool builds by following the issuer of each certificate to the certificate of the keystore that it
+names as its owner, up to a self-signed certificate.
+
+Parameters:
+---------------------
+certificate: X509Certificate
+This is the first certificate of the chain.
+
+certificates: list
+This is the list of the certificates of the keystore (in the form built by createPKCS12Entries()).
+
+Returns:
+---------------------
+list
+This is the list of the other certificates of the chain, in order.
+"""
+def findPKCS12Chain(certificate, certificates):
+  chain = []
+  used = set([id(certificate)])
+  while certificate.issuer != certificate.subject:
+    certificate = next((candidate for candidate, name, key_id, trusted in certificates \
+                        if candidate.subject == certificate.issuer and id(candidate) not in used), None)
+    if certificate is None:
+      break
+    used.add(id(certificate))
+    chain.append(certificate)
+  return chain
+
+"""
+This function matches up the keys and certificates of a PKCS12 keystore into entries the same way keytool does. A
+certificate with the same local key id as a key is the first certificate of the private key entry (whose chain is found
+with findPKCS12Chain()). Any other certificate
+that is marked as trusted by keytool is a trusted certificate entry. The other certificates (which keytool also gives a
+friendly name) are part of the certificate chains, unless there are no keys at all, in which case they are all trusted
+certificate entries.
+"""
+def createPKCS12Entries(bags):
+  keys = []
+  certificates = []
+  for bag_type, bag_value, friendly_name, local_key_id, trusted in bags:
+    if bag_type == key_bag_oid or bag_type == shrouded_key_bag_oid:
+      keys.append((friendly_name, local_key_id))
+    elif bag_type == cert_bag_oid:
+      cert_bag = readChildren(bag_value)
+      if decodeOID(cert_bag[0][1]) == x509_certificate_oid:
+        tag, der = readElement(cert_bag[1][1])[:2]
+        certificates.append((parseCertificate(readOctetString(tag, der)), friendly_name, local_key_id, trusted))
+
+  entries = []
+  used_certificates = set()
+  for key_number, (friendly_name, local_key_id) in enumerate(keys):
+    for certificate_number, (certificate, certificate_name, certificate_key_id, trusted) in enumerate(certificates):
+      if local_key_id is not None and certificate_key_id == local_key_id:
+        used_certificates.add(certificate_number)
+        alias = friendly_name or certificate_name or str(key_number + 1)
+        entries.append(KeystoreEntry(alias.lower(), private_key_type, certificate, findPKCS12Chain(certificate, certificates)))
+        break
+  for certificate_number, (certificate, certificate_name, certificate_key_id, trusted) in enumerate(certificates):
+    if certificate_number in used_certificates:
+      continue
+    if trusted or not keys:
+      alias = certificate_name or str(certificate_number + 1)
+      entries.append(KeystoreEntry(alias.lower(), trusted_cert_type, certificate))
+  return entries
+
+"""
+This function encodes a password as a null terminated BMPString for the PKCS12 key derivation. None is encoded as
+no password at all, which is how some versions of OpenSSL encode the empty password.
+"""
+def encodeBMPPassword(password):
+  if password is None:
+    return b""
+  return password.encode("utf-16-be") + b"\x00\x00"
+
+"""
+This function derives a key or IV with the PKCS12 key derivation function (RFC 7292 Appendix B).
+
+Parameters:
+---------------------
+hash_name: string
+This is the hashlib name of the hash algorithm.
+
+password: bytes
+This is the password encoded with encodeBMPPassword().
+
+salt: bytes
+This is the salt.
+
+purpose: integer
+This is 1 for a key, 2 for an IV and 3 for a MAC key.
+
+iterations: integer
+This is the number of iterations.
+
+length: integer
+This is the number of bytes to derive.
+
+Returns:
+---------------------
+bytes
+This is the derived key or IV.
+"""
+def derivePKCS12Key(hash_name, password, salt, purpose, iterations, length):
+  hash_size = hashlib.new(hash_name).digest_size
+  block_size = hashlib.new(hash_name).block_size
+  diversifier = bytearray([purpose] * block_size)
+  salt = bytearray(salt)
+  password = bytearray(password)
+  salt_block = bytearray((salt * block_size)[:block_size * ((len(salt) + block_size - 1) // block_size)]) if salt else bytearray()
+  password_block = bytearray((password * block_size)[:block_size * ((len(password) + block_size - 1) // block_size)]) if password else bytearray()
+  input_block = salt_block + password_block
+
+  result = b""
+  while len(result) < length:
+    digest = hashlib.new(hash_name, bytes(diversifier + input_block)).digest()
+    for iteration in range(iterations - 1):
+      digest = hashlib.new(hash_name, digest).digest()
+    result += digest
+    if len(result) < length:
+      addend = int.from_bytes(bytearray(digest * block_size)[:block_size], "big") + 1
+      modulus = 1 << (8 * block_size)
+      for start in range(0, len(input_block), block_size):
+        value = (int.from_bytes(input_block[start:start + block_size], "big") + addend) % modulus
+        input_block[start:start + block_size] = value.to_bytes(block_size, "big")
+  return result[:length]
+
+"""
+This function decrypts the content of an EncryptedData with the password of the keystore.
+"""
+def decryptEncryptedData(content, password):
+  encrypted_data = readChildren(content)
+  encrypted_content_info = readChildren(encrypted_data[1][1])
+  algorithm = readChildren(encrypted_content_info[1][1])
+  algorithm_oid = decodeOID(algorithm[0][1])
+  if len(encrypted_content_info) < 3:
+    return b""
+  tag, encrypted = encrypted_content_info[2]
+  encrypted = readOctetString(tag, encrypted)
+
+  if algorithm_oid in pkcs12_pbe_dict:
+    cipher, key_length, effective_bits = pkcs12_pbe_dict[algorithm_oid]
+    salt, iterations = readChildren(algorithm[1][1])
+    iterations = decodeInteger(iterations[1])
+    key = derivePKCS12Key("sha1", encodeBMPPassword(password), salt[1], 1, iterations, key_length)
+    if cipher == "rc4":
+      return decrypt(cipher, key, None, encrypted)
+    iv = derivePKCS12Key("sha1", encodeBMPPassword(password), salt[1], 2, iterations, 8)
+    if cipher == "3des" and key_length == 16:
+      key = key + key[:8]
+    return removePadding(decrypt(cipher, key, iv, encrypted, effective_bits), 8)
+
+  if algorithm_oid == pbes2_oid:
+    key_derivation, encryption_scheme = readChildren(algorithm[1][1])
+    key_derivation = readChildren(key_derivation[1])
+    encryption_scheme = readChildren(encryption_scheme[1])
+    if decodeOID(key_derivation[0][1]) != pbkdf2_oid:
+      raise KeystoreError("Unsupported key derivation function")
+    encryption_oid = decodeOID(encryption_scheme[0][1])
+    if encryption_oid not in pbes2_cipher_dict:
+      raise KeystoreError("Unsupported encryption algorithm: " + encryption_oid)
+    cipher, key_length = pbes2_cipher_dict[encryption_oid]
+    parameters = readChildren(key_derivation[1][1])
+    salt = parameters[0][1]
+    iterations = decodeInteger(parameters[1][1])
+    hash_name = "sha1"
+    for tag, parameter in parameters[2:]:
+      if tag == sequence_tag:
+        hash_name = hash_algorithm_dict.get(decodeOID(readChildren(parameter)[0][1]))
+        if hash_name is None:
+          raise KeystoreError("Unsupported PBKDF2 pseudorandom function")
+    key = hashlib.pbkdf2_hmac(hash_name, (password or "").encode("utf-8"), bytes(salt), iterations, key_length)
+    iv = bytes(encryption_scheme[1][1])
+    return removePadding(decrypt(cipher, key, iv, encrypted), 16 if cipher == "aes" else 8)
+
+  raise KeystoreError("Unsupported encryption algorithm: " + algorithm_oid)
+
+"""
+This function removes the PKCS7 padding after decryption. Padding that is not valid means that the password was wrong.
+"""
+def removePadding(data, block_size):
+  if not data:
+    return data
+  padding = bytearray(data[-1:])[0]
+  if padding < 1 or padding > block_size or data[-padding:] != bytes(bytearray([padding] * padding)):
+    raise KeystoreError("Keystore was tampered with, or password was incorrect")
+  return data[:-padding]
+
+"""
+This function decrypts data with one of the ciphers of PKCS12 keystores with pycryptodomex. The padding is not removed.
+
+Parameters:
+---------------------
+cipher: string
+This is "aes", "3des" or "rc2" (in CBC mode) or "rc4".
+
+key: bytes
+This is the key.
+
+iv: bytes
+This is the IV (None for RC4).
+
+data: bytes
+This is the encrypted data.
+
+effective_bits: integer
+This is the number of effective key bits of RC2.
+
+Returns:
+---------------------
+bytes
+This is the decrypted data.
+"""
+def decrypt(cipher, key, iv, data, effective_bits=0):
+  if AES is None:
+    raise KeystoreError("pycryptodomex is needed to decrypt the certificates of PKCS12 keystores (pip install pycryptodomex)")
+  key = bytes(key)
+  data = bytes(data)
+  try:
+    if cipher == "rc4":
+      return ARC4.new(key).decrypt(data)
+    if cipher == "aes":
+      decryptor = AES.new(key, AES.MODE_CBC, bytes(iv))
+    elif cipher == "3des":
+      decryptor = DES3.new(key, DES3.MODE_CBC, bytes(iv))
+    else:
+      decryptor = ARC2.new(key, ARC2.MODE_CBC, bytes(iv), effective_keylen=effective_bits)
+    return decryptor.decrypt(data)
+  except ValueError as e:
+    raise KeystoreError("The certificates could not be decrypted: " + str(e))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+import sys
+import csv
+
+"""
+The aim of this file is to link the certificates of each keystore together by their owner and issuer so that it can be
+told whether or not the certificates (key pairs in particular) chain up to a trusted root in the same keystore. This
+replaces comparing every owner with every issuer in a spreadsheet.
+
+Each keystore has an index from the owner (subject DN) of its certificates to the certificates with that owner. The
+issuer of a certificate is looked up in the index to find the next certificate of its chain. The chains are followed
+down from the roots of the keystore, so that when more than one certificate has the same owner (such as a CA that was
+renewed under the same name) the one that leads to a root is the one that is chosen. Every certificate is only looked at
+once, which keeps the resolution linear in the number of certificates.
+
+Every certificate is given one of the following statuses:
+* root: the certificate is self-signed (its owner and issuer are the same)
+* complete: the chain of the certificate ends with a root in the same keystore
+* incomplete: the chain of the certificate goes through other certificates of the keystore but never reaches a root
+* orphaned: the issuer of the certificate is not in the keystore at all
+"""
+
+root_status = "root"
+complete_status = "complete"
+incomplete_status = "incomplete"
+orphaned_status = "orphaned"
+
+# Columns headers of the chain report
+report_columns = ["File", "Alias/Common Name", "Fingerprint", "Owner", "Issuer", "Status", "Chain"]
+# Separates the aliases of the certificates of a chain in the chain report
+chain_separator = " -> "
+
+"""
+This class holds a single certificate of a keystore.
+"""
+class ChainEntry(object):
+  __slots__ = ("alias", "owner", "issuer", "fingerprint")
+
+  def __init__(self, alias, owner, issuer, fingerprint):
+    self.alias = alias
+    self.owner = owner
+    self.issuer = issuer
+    self.fingerprint = fingerprint
+
+"""
+This class holds the certificates of every keystore, with an index from owner to certificates for each keystore.
+"""
+class ChainIndex(object):
+  def __init__(self):
+    # Maps each keystore to the list of its certificates (in the order they were found)
+    self.entries = {}
+    # Maps each keystore to a dictionary from owner to the positions of the certificates with that owner
+    self.owners = {}
+    # Keystores in the order they were found
+    self.stores = []
+
+  """
+  Adds a certificate of a keystore to the index.
+  """
+  def addCertificate(self, store, alias, owner, issuer, fingerprint):
+    if store not in self.entries:
+      self.entries[store] = []
+      self.owners[store] = {}
+      self.stores.append(store)
+    entries = self.entries[store]
+    self.owners[store].setdefault(owner, []).append(len(entries))
+    entries.append(ChainEntry(alias, owner, issuer, fingerprint))
+
+  """
+  Removes the certificates of a keystore (such as before the keystore is added again once it changed). The keystore
+  keeps its place among the keystores.
+  """
+  def clearStore(self, store):
+    if store in self.entries:
+      self.entries[store] = []
+      self.owners[store] = {}
+
+  """
+  Finds the issuer of every certificate of a keystore. When more than one certificate has the owner that issued a
+  certificate (such as a CA that was renewed under the same name), the one whose chain ends with a root is chosen. The
+  chains are followed down from the roots through an index from issuer to the certificates that it issued, so every
+  certificate is only looked at once. A certificate whose chain cannot reach a root keeps the first certificate with the
+  owner that issued it.
+
+  Returns:
+  ---------------------
+  issuers: list
+  This is the position of the issuer of each certificate (the certificate itself for a root and None when the issuer is
+  not in the keystore).
+
+  reaches_root: list
+  This is whether or not the chain of each certificate ends with a root.
+  """
+  def resolveStore(self, store):
+    entries = self.entries[store]
+    owners = self.owners[store]
+    issuers = [None] * len(entries)
+    reaches_root = [False] * len(entries)
+    # Maps each issuer to the positions of the certificates that it issued (the roots are left out)
+    issued = {}
+    reached = []
+    for position, entry in enumerate(entries):
+      if entry.owner == entry.issuer:
+        issuers[position] = position
+        reaches_root[position] = True
+        reached.append(position)
+      else:
+        issued.setdefault(entry.issuer, []).append(position)
+
+    # The certificates issued by the owner of a certificate that reaches a root reach it as well. The certificates of each
+    # owner are only handed out once, to the first certificate with that owner that is reached (the shortest chain).
+    for position in reached:
+      for certificate in issued.pop(entries[position].owner, ()):
+        issuers[certificate] = position
+        reaches_root[certificate] = True
+        reached.append(certificate)
+
+    for position, entry in enumerate(entries):
+      if issuers[position] is None:
+        issuers[position] = next((candidate for candidate in owners.get(entry.issuer, ()) if candidate != position), None)
+    return issuers, reaches_root
+
+  """
+  Returns the status and chain (the aliases of the certificates from the certificate up to the last certificate found in
+  the keystore) of every certificate, keystore by keystore.
+
+  Returns:
+  ---------------------
+  row: list
+  This generator yields the row of the chain report of each certificate (see report_columns).
+  """
+  def resolve(self):
+    for store in self.stores:
+      entries = self.entries[store]
+      issuers, reaches_root = self.resolveStore(store)
+      for position, entry in enumerate(entries):
+        if issuers[position] == position:
+          status = root_status
+        elif reaches_root[position]:
+          status = complete_status
+        elif issuers[position] is None:
+          status = orphaned_status
+        else:
+          status = incomplete_status
+
+        chain = [entry.alias]
+        seen = set([position])
+        next_position = issuers[position]
+        while next_position is not None and next_position not in seen:
+          seen.add(next_position)
+          chain.append(entries[next_position].alias)
+          next_position = issuers[next_position]
+        yield [store, entry.alias, entry.fingerprint, entry.owner, entry.issuer, status, chain_separator.join(chain)]
+
+  """
+  Writes the chain report (see report_columns) to the path given.
+  """
+  def writeReport(self, path):
+    # The csv module needs the file in binary mode on Python 2 and without newline translation on Python 3
+    if sys.version_info[0] < 3:
+      file = open(path, 'wb')
+    else:
+      file = open(path, 'w', newline='')
+    with file:
+      writer = csv.writer(file, lineterminator='\n')
+      writer.writerow(report_columns)
+      writer.writerows(self.resolve())
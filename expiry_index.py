@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import csv
+import bisect
+import argparse
+import datetime
+
+"""
+The aim of this script is to answer questions about the expiration of the certificates in results.csv (as created by
+generate_results.py) without opening the results in a spreadsheet. This replaces the "90 Days", "Years Compare" and
+"Validity Period" macros for alerting purposes.
+
+The rows are kept in two sorted indexes so that every question is answered with a binary search:
+* By expiration date: "expiring within N days" and "already expired"
+* By validity period (expiration year - creation year, the same as the macros): "validity of at least X years"
+"""
+
+# Columns of results.csv that the indexes are built on
+expiration_column = "Expiration"
+creation_column = "Creation"
+
+"""
+This function converts a date from results.csv (format: M/D/YYYY or ISO-8601 when generate_results.py was run with
+--date-format iso) into a date object.
+
+Parameters:
+---------------------
+date: string
+This is the date from results.csv.
+
+Returns:
+---------------------
+datetime.date
+This is the date or None if the date could not be read.
+"""
+def parseDate(date):
+  # ISO-8601 dates start with YYYY-MM-DD (the date is taken as it was printed, without converting the time zone)
+  date_split = date[:10].split('-')
+  if len(date_split) != 3:
+    date_split = date.split('/')
+    if len(date_split) != 3:
+      return None
+    date_split = [date_split[2], date_split[0], date_split[1]]
+  try:
+    return datetime.date(int(date_split[0]), int(date_split[1]), int(date_split[2]))
+  except ValueError:
+    return None
+
+"""
+This class holds the rows of results.csv sorted by expiration date and by validity period.
+"""
+class ExpiryIndex(object):
+  def __init__(self):
+    # The keys are kept apart from the rows so that bisect can search them directly
+    self.expirations = []
+    self.expiration_rows = []
+    self.validity_periods = []
+    self.validity_period_rows = []
+    # Rows whose expiration date could not be read
+    self.skipped_rows = []
+
+  """
+  Adds a single row to the indexes. Use addRows() when adding many rows at once as it only sorts once.
+  """
+  def addRow(self, row):
+    expiration = parseDate(row.get(expiration_column, ""))
+    if expiration is None:
+      self.skipped_rows.append(row)
+      return
+    position = bisect.bisect_right(self.expirations, expiration.toordinal())
+    self.expirations.insert(position, expiration.toordinal())
+    self.expiration_rows.insert(position, row)
+
+    creation = parseDate(row.get(creation_column, ""))
+    if creation is not None:
+      position = bisect.bisect_right(self.validity_periods, expiration.year - creation.year)
+      self.validity_periods.insert(position, expiration.year - creation.year)
+      self.validity_period_rows.insert(position, row)
+
+  """
+  Adds many rows to the indexes. The rows keep their original order among rows with the same key.
+  """
+  def addRows(self, rows):
+    expirations = list(zip(self.expirations, self.expiration_rows))
+    validity_periods = list(zip(self.validity_periods, self.validity_period_rows))
+    for row in rows:
+      expiration = parseDate(row.get(expiration_column, ""))
+      if expiration is None:
+        self.skipped_rows.append(row)
+        continue
+      expirations.append((expiration.toordinal(), row))
+      creation = parseDate(row.get(creation_column, ""))
+      if creation is not None:
+        validity_periods.append((expiration.year - creation.year, row))
+
+    # Sorting only on the key keeps the sort stable and never compares the rows themselves
+    expirations.sort(key=lambda item: item[0])
+    validity_periods.sort(key=lambda item: item[0])
+    self.expirations = [item[0] for item in expirations]
+    self.expiration_rows = [item[1] for item in expirations]
+    self.validity_periods = [item[0] for item in validity_periods]
+    self.validity_period_rows = [item[1] for item in validity_periods]
+
+  """
+  Returns the rows that expire between today and N days from today (inclusive), ordered by expiration date.
+  """
+  def expiringWithin(self, days, today):
+    start = bisect.bisect_left(self.expirations, today.toordinal())
+    end = bisect.bisect_right(self.expirations, today.toordinal() + days)
+    return self.expiration_rows[start:end]
+
+  """
+  Returns the rows that expired before today, ordered by expiration date.
+  """
+  def expired(self, today):
+    return self.expiration_rows[:bisect.bisect_left(self.expirations, today.toordinal())]
+
+  """
+  Returns the rows with a validity period of at least the number of years given, ordered by validity period.
+  """
+  def validityAtLeast(self, years):
+    return self.validity_period_rows[bisect.bisect_left(self.validity_periods, years):]
+
+"""
+This function reads results.csv into an index.
+
+Parameters:
+---------------------
+path: string
+This is the path of results.csv.
+
+Returns:
+---------------------
+index: ExpiryIndex
+This is the index of all of the rows.
+
+columns: list
+This is the list of columns headers of results.csv.
+"""
+def loadResults(path):
+  index = ExpiryIndex()
+  # The csv module needs the file in binary mode on Python 2 and without newline translation on Python 3
+  if sys.version_info[0] < 3:
+    file = open(path, 'rb')
+  else:
+    file = open(path, 'r', newline='')
+  with file:
+    reader = csv.DictReader(file)
+    index.addRows(reader)
+    columns = reader.fieldnames
+  return index, columns
+
+"""
+This function reads the arguments that were passed to the program.
+"""
+def parseArguments(argv):
+  parser = argparse.ArgumentParser(description='Finds the certificates in results.csv by their expiration date or validity period.')
+  parser.add_argument('results', nargs='?', default='results.csv', help='The results file created by generate_results.py (default: results.csv)')
+  query = parser.add_mutually_exclusive_group(required=True)
+  query.add_argument('--expiring', type=int, metavar='DAYS', help='Lists the certificates that expire within the number of days')
+  query.add_argument('--expired', action='store_true', help='Lists the certificates that have already expired')
+  query.add_argument('--validity-at-least', type=int, metavar='YEARS', help='Lists the certificates with a validity period of at least the number of years')
+  parser.add_argument('--today', help='The date (format: M/D/YYYY) to use instead of today')
+  args = parser.parse_args(argv)
+  if args.today is not None and parseDate(args.today) is None:
+    parser.error("please provide a valid date (format: M/D/YYYY) for --today")
+  if args.expiring is not None and args.expiring < 0:
+    parser.error("the number of days cannot be negative")
+  return args
+
+def main(argv):
+  args = parseArguments(argv)
+  if not os.path.isfile(args.results):
+    sys.exit("\nThe results file " + args.results + " does not exist\n")
+
+  today = datetime.date.today()
+  if args.today is not None:
+    today = parseDate(args.today)
+
+  index, columns = loadResults(args.results)
+  if args.expiring is not None:
+    rows = index.expiringWithin(args.expiring, today)
+  elif args.expired:
+    rows = index.expired(today)
+  else:
+    rows = index.validityAtLeast(args.validity_at_least)
+
+  # The matching rows are written in the same format as results.csv so they can be used the same way
+  writer = csv.DictWriter(sys.stdout, columns, lineterminator='\n')
+  writer.writeheader()
+  writer.writerows(rows)
+
+if __name__ == '__main__':
+  # Starting the main function
+  # This try and except is meant to catch a Ctrl+C sudden stop without raising larger concerns
+  try:
+    # Takes input arguments beside the name of the script
+    main(sys.argv[1:])
+  except KeyboardInterrupt:
+    print('Suddenly exiting: Caused by Ctrl+C')
+    sys.exit(0) # Raising the SystemExit exception without classifying the exit as something caused by an error
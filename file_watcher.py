@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# os.scandir() was added in Python 3.5 (the scandir package provides it for older versions)
+try:
+  from os import scandir
+except ImportError:
+  from scandir import scandir
+
+"""
+The aim of this file is to tell which files changed in the directories that generate_results.py parses, so that a
+long-running process only has to parse those files again instead of every file of the directories.
+
+On Linux the changes come from the kernel through inotify (used directly through ctypes, so nothing has to be
+installed). A watch is added to every directory of the tree and to every directory that is created in it later on, so
+the process sleeps until something changes. Everywhere else (and on network filesystems, where inotify does not see the
+changes that are made by other machines) the directories are polled instead: the size, modification time and inode of
+every file are compared with the previous poll, which only takes a stat() of each file and never reads the files.
+
+Both watchers hand back the files that were created or changed and the files and directories that were removed. A file
+is only handed back once it is done being written: with inotify once it is closed after being written or moved into
+the tree, and with polling once it is the same for two polls in a row.
+"""
+
+# Number of seconds between the polls or, with inotify, the number of seconds without changes that are waited for
+# before the changes are handed back (so a file that is written in many steps is only handed back once)
+default_interval = 2.0
+
+# inotify events (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+watch_mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+# Header of each event (wd, mask, cookie, len), which is followed by the name of the file (padded with null bytes)
+event_header = struct.Struct("iIII")
+# Enough to read many events at once (a single event is at most the header and a 256 byte name)
+event_buffer_size = 64 * 1024
+
+"""
+This class polls the directories for changes. It is used wherever inotify is not available.
+"""
+class PollingWatcher(object):
+  method = "polling"
+
+  """
+  Parameters:
+  ---------------------
+  roots: list
+  This is the list of the absolute paths of the directories (and files) to watch.
+
+  interval: float
+  This is the number of seconds between the polls.
+
+  skip: function
+  This function is given the absolute path of each directory under the roots and returns whether or not it should be
+  left out (None to watch every directory).
+  """
+  def __init__(self, roots, interval=default_interval, skip=None):
+    self.roots = roots
+    self.interval = interval
+    self.skip = skip
+    # The files as they were at the last poll and as they were when they were last handed back
+    self.previous = self.takeSnapshot()
+    self.reported = dict(self.previous)
+
+  """
+  Returns the size, modification time and inode of every file under the roots.
+  """
+  def takeSnapshot(self):
+    snapshot = {}
+    for root in self.roots:
+      if not os.path.isdir(root):
+        try:
+          status = os.stat(root)
+          snapshot[root] = (status.st_size, status.st_mtime, status.st_ino)
+        except OSError:
+          pass
+        continue
+
+      visited_directories = set()
+      stack = [root]
+      while stack:
+        directory = stack.pop()
+        try:
+          status = os.stat(directory)
+          if (status.st_dev, status.st_ino) in visited_directories:
+            continue
+          visited_directories.add((status.st_dev, status.st_ino))
+          entries = list(scandir(directory))
+        except OSError:
+          # The directory was removed while it was being walked
+          continue
+        for entry in entries:
+          try:
+            if entry.is_dir():
+              if self.skip is None or not self.skip(entry.path):
+                stack.append(entry.path)
+            elif entry.is_file():
+              status = entry.stat()
+              snapshot[entry.path] = (status.st_size, status.st_mtime, status.st_ino)
+          except OSError:
+            pass
+    return snapshot
+
+  """
+  Waits until at least one file was created, changed or removed.
+
+  Returns:
+  ---------------------
+  changed: set
+  This is the set of the files that were created or changed.
+
+  removed: set
+  This is the set of the files that were removed.
+
+  rescan: boolean
+  This is always False (see InotifyWatcher.waitForChanges()).
+  """
+  def waitForChanges(self):
+    while True:
+      time.sleep(self.interval)
+      snapshot = self.takeSnapshot()
+      # A file is only handed back once it is the same as at the previous poll so that it is done being written
+      changed = set(file for file, signature in snapshot.items() \
+                    if signature == self.previous.get(file) and signature != self.reported.get(file))
+      removed = set(file for file in self.reported if file not in snapshot)
+      self.previous = snapshot
+      for file in changed:
+        self.reported[file] = snapshot[file]
+      for file in removed:
+        del self.reported[file]
+      if changed or removed:
+        return changed, removed, False
+
+  def close(self):
+    pass
+
+"""
+This function loads the C library and makes sure that it has inotify.
+"""
+def loadInotify():
+  if not sys.platform.startswith("linux"):
+    raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+  libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+  if not hasattr(libc, "inotify_init1"):
+    raise OSError(errno.ENOSYS, "the C library does not have inotify")
+  libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+  return libc
+
+"""
+This class is told of the changes by the kernel through inotify.
+"""
+class InotifyWatcher(object):
+  method = "inotify"
+
+  """
+  The parameters are the same as the ones of PollingWatcher. An OSError is raised when inotify is not available or when
+  the limit on the number of watches (fs.inotify.max_user_watches) is reached.
+  """
+  def __init__(self, roots, interval=default_interval, skip=None):
+    self.libc = loadInotify()
+    self.interval = interval
+    self.skip = skip
+    self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+    if self.fd < 0:
+      raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+    # Maps each watch to its directory and the watches of the directories whose whole tree is watched
+    self.watches = {}
+    self.trees = set()
+    # Files that were given instead of a directory (only their directory is watched)
+    self.files = set()
+    try:
+      for root in roots:
+        if os.path.isdir(root):
+          self.addTree(root, True)
+        else:
+          self.files.add(root)
+          self.addDirectory(os.path.dirname(root), False, True)
+    except OSError:
+      self.close()
+      raise
+
+  """
+  Adds a watch to a directory. Returns whether or not the watch was added (a directory that was removed in the meantime
+  or that cannot be read is left out).
+  """
+  def addDirectory(self, directory, tree, strict=False):
+    wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), watch_mask)
+    if wd < 0:
+      error = ctypes.get_errno()
+      if strict or error == errno.ENOSPC:
+        raise OSError(error, os.strerror(error) + ": " + directory)
+      return False
+    self.watches[wd] = directory
+    if tree:
+      self.trees.add(wd)
+    return True
+
+  """
+  Adds a watch to a directory and every directory under it. Returns the files that are in them, which matters for a
+  directory that was created or moved into the tree as its files could be there before its watch.
+  """
+  def addTree(self, root, strict=False):
+    files = []
+    visited_directories = set()
+    stack = [root]
+    while stack:
+      directory = stack.pop()
+      try:
+        status = os.stat(directory)
+      except OSError:
+        continue
+      if (status.st_dev, status.st_ino) in visited_directories:
+        continue
+      visited_directories.add((status.st_dev, status.st_ino))
+      if not self.addDirectory(directory, True, strict and directory == root):
+        continue
+      try:
+        entries = list(scandir(directory))
+      except OSError:
+        continue
+      for entry in entries:
+        try:
+          if entry.is_dir():
+            if self.skip is None or not self.skip(entry.path):
+              stack.append(entry.path)
+          elif entry.is_file():
+            files.append(entry.path)
+        except OSError:
+          pass
+    return files
+
+  """
+  Reads the events that are waiting, waiting up to timeout seconds for one (None to wait until there is one). Returns
+  the list of the (wd, mask, name) of each event, which is empty when no event came in time.
+  """
+  def readEvents(self, timeout):
+    try:
+      ready = select.select([self.fd], [], [], timeout)[0]
+    except InterruptedError:
+      return []
+    if not ready:
+      return []
+    data = os.read(self.fd, event_buffer_size)
+    events = []
+    position = 0
+    while position + event_header.size <= len(data):
+      wd, mask, cookie, length = event_header.unpack_from(data, position)
+      position += event_header.size
+      name = os.fsdecode(data[position:position + length].rstrip(b'\0'))
+      position += length
+      events.append((wd, mask, name))
+    return events
+
+  """
+  Waits until at least one file was created, changed or removed and then until no changes came for interval seconds.
+
+  Returns:
+  ---------------------
+  changed: set
+  This is the set of the files that were created or changed.
+
+  removed: set
+  This is the set of the files and directories that were removed (or moved out of the tree).
+
+  rescan: boolean
+  This is whether or not the kernel dropped events (when too many came at once), in which case any file could have
+  changed and the whole tree has to be looked at again.
+  """
+  def waitForChanges(self):
+    changed = set()
+    removed = set()
+    rescan = False
+    timeout = None
+    while True:
+      events = self.readEvents(timeout)
+      if not events and timeout is not None:
+        return changed, removed, rescan
+      for wd, mask, name in events:
+        if mask & IN_Q_OVERFLOW:
+          rescan = True
+          timeout = self.interval
+          continue
+        directory = self.watches.get(wd)
+        if directory is None:
+          continue
+        if mask & IN_IGNORED:
+          # The directory was removed (the kernel removed its watch)
+          del self.watches[wd]
+          self.trees.discard(wd)
+          continue
+        if not name:
+          continue
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+          if wd not in self.trees:
+            continue
+          if mask & (IN_CREATE | IN_MOVED_TO):
+            if self.skip is None or not self.skip(path):
+              for file in self.addTree(path):
+                changed.add(file)
+                removed.discard(file)
+          elif mask & (IN_DELETE | IN_MOVED_FROM):
+            removed.add(path)
+            # The files under the directory are gone as well
+            prefix = os.path.join(path, '')
+            changed = set(file for file in changed if not file.startswith(prefix))
+          timeout = self.interval
+        elif wd in self.trees or path in self.files:
+          if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            changed.add(path)
+            removed.discard(path)
+            timeout = self.interval
+          elif mask & (IN_DELETE | IN_MOVED_FROM):
+            removed.add(path)
+            changed.discard(path)
+            timeout = self.interval
+
+  def close(self):
+    if self.fd >= 0:
+      os.close(self.fd)
+      self.fd = -1
+
+"""
+This function creates the watcher of the roots given: an InotifyWatcher where inotify is available and a PollingWatcher
+otherwise (or when polling is requested).
+
+Parameters:
+---------------------
+roots: list
+This is the list of the absolute paths of the directories (and files) to watch.
+
+interval: float
+This is the number of seconds between the polls or, with inotify, the number of seconds without changes that are
+waited for before the changes are handed back.
+
+skip: function
+This function is given the absolute path of each directory under the roots and returns whether or not it should be
+left out (None to watch every directory).
+
+polling: boolean
+This is whether or not the directories are polled even where inotify is available.
+
+Returns:
+---------------------
+InotifyWatcher or PollingWatcher
+This is the watcher (see waitForChanges()).
+"""
+def createWatcher(roots, interval=default_interval, skip=None, polling=False):
+  if not polling:
+    try:
+      return InotifyWatcher(roots, interval, skip)
+    except (OSError, AttributeError):
+      pass
+  return PollingWatcher(roots, interval, skip)
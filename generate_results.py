@@ -3,6 +3,45 @@
 import sys
 import atexit
 import os
+import io
+import time
+import csv
+import re
+import json
+import logging
+import hashlib
+import locale
+import mmap
+import fnmatch
+import calendar
+import datetime
+import argparse
+import cProfile
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import certificate_reader
+import inventory
+import chain_index
+import tls_scanner
+import file_watcher
+
+# os.scandir() was added in Python 3.5 (the scandir package provides it for older versions)
+try:
+  from os import scandir
+except ImportError:
+  from scandir import scandir
+
+try:
+  import configparser
+except ImportError:
+  import ConfigParser as configparser
+
+# raw_input() was renamed to input() in Python 3
+try:
+  raw_input
+except NameError:
+  raw_input = input
 
 # Created by:
 # Jacky Cheng
@@ -38,6 +77,10 @@ Results format has the follow columns (in order):
 """
 # Global variables
 cert_store = ''
+# The absolute path of the file that is currently being written (recorded in the inventory with each certificate)
+current_file = ''
+# The File Type column of the file that is currently being written (set by startFile(), see getFileType())
+current_file_type = ''
 location = ''
 product = ''
 product_component = ''
@@ -45,43 +88,409 @@ received_on = ''
 received_from = ''
 host_name_available = False
 
+# Names of the static columns as they are written in a config file or a per-directory manifest
+static_column_names = ("location", "product", "product_component", "received_on", "received_from", "host_names")
+# Section of the config file or manifest that holds the static columns
+static_columns_section = "static_columns"
+# A manifest with this name applies to the files of the directory it is in (and every directory under it)
+manifest_file_name = "results_manifest.ini"
+
+# Options for walking through directories (set through the arguments)
+include_patterns = []
+exclude_patterns = []
+max_depth = None
+sniff_files = True
+
+# Number of bytes at the start of a file that are checked to determine whether or not it is a data dump
+sniff_size = 4096
+# Any of these in the first bytes of a file marks it as a "keytool -list -v" data dump
+keytool_markers = (b"Keystore type:", b"Your keystore contains", b"Alias name:", b"============ servername:")
+# Types of files (keystores and certificate files) that are read with certificate_reader instead of as data dumps
+decoded_file_types = ("jks", "pkcs12", "der", "pem")
+# File Type column of each type of keystore or certificate file (see certificate_reader.detectContainerType()). A data
+# dump is taken as the listing of a JKS keystore.
+file_type_dict = {"jks" : ".jks", "jceks" : ".jceks", "pkcs12" : ".p12", "pkcs7" : ".p7b", "der" : ".der", "pem" : ".pem"}
+default_file_type = ".jks"
+# File Type column of the certificates that TLS endpoints present (see scanFiles())
+endpoint_file_type = "TLS"
+
+# Engine that extracts the certificates out of data dumps (set through the arguments):
+# * lines: reads the data dump one line at a time (see readLines() and extractCertificates())
+# * mmap: memory-maps the data dump and only looks at the lines that hold metadata (see extractMappedCertificates())
+engine = "lines"
+# Data dumps larger than this (in bytes) are split into chunks of about this size at their entries so that they can be
+# parsed by more than one worker process when there are jobs (set through the arguments)
+chunk_size = 16 * 1024 * 1024
+
+# Password of the JKS/JCEKS/PKCS12 keystores (set through the arguments). PKCS12 keystores are tried with the empty
+# password when there is none and the integrity of JKS/JCEKS keystores is only checked when there is one.
+store_password = None
+
+# Command that runs keytool in the collector mode (set through the arguments)
+keytool_command = "keytool"
+# The password of each keystore is handed to keytool through this environment variable (with -storepass:env) in the
+# collector mode so that it never shows up in the arguments of the keytool process
+password_variable = "GENERATE_RESULTS_STOREPASS"
+# Columns of the list of keystores of the collector mode (the second one is optional)
+collect_columns = ("keystore", "storepass_env")
+# Start of the error messages of keytool
+keytool_error_prefix = "keytool error"
+
 hostname_splice_start = 2
 alias_splice_start = 12
 certType_splice_start = 12
 owner_splice_start = 7
 issuer_splice_start = 8
 serialNumber_splice_start = 15
-keyStrength_splice_start = 28
 
+# Prefixes that keytool prints before each piece of metadata
 hostname_comp_string = "============ servername:"
-alias_comp_string = "Alias"
+alias_comp_string = "Alias name:"
 certType_comp_string = "Entry type:"
-owner_comp_string = "Owner"
+owner_comp_string = "Owner:"
 issuer_comp_string = "Issuer:"
-serialNumber_comp_string = "Serial"
-startDate_comp_string = "start"
-expirationDate_comp_string = "expiration"
-keyStrength_comp_string = "Signature"
+serialNumber_comp_string = "Serial number:"
+validity_comp_string = "Valid from:"
+keyStrength_comp_string = "Signature algorithm name:"
+# keytool prints the fingerprints indented under "Certificate fingerprints:" (as older versions of keytool also do with the
+# signature algorithm), so the lines are classified once their indentation is stripped
+fingerprint_comp_string = "SHA256:"
+line_indent = " \t"
+keyStrength_splice_start = len(keyStrength_comp_string) + 1
+fingerprint_splice_start = len(fingerprint_comp_string) + 1
+validity_split_string = "until:"
 public_key_type = "trustedCertEntry"
 private_key_type = "PrivateKeyEntry"
 
-# Variable to be used for grabbing one certificate at a time
-is_full_metadata = False
+# Maps the month abbreviations that keytool prints to the number of the month
+month_dict = {"Jan" : 1, "Feb" : 2, "Mar" : 3, "Apr" : 4, "May" : 5, "Jun" : 6, \
+              "Jul" : 7, "Aug" : 8, "Sep" : 9, "Oct" : 10, "Nov" : 11, "Dec" : 12}
+
+# Maps the time zone abbreviations that keytool prints to their offset from UTC in hours (keytool prints "GMT+hh:mm"
+# for time zones without an abbreviation). Dates in any other time zone are treated as UTC for the epoch columns.
+time_zone_dict = {"UTC" : 0, "GMT" : 0, "Z" : 0, \
+                  "EST" : -5, "EDT" : -4, "CST" : -6, "CDT" : -5, "MST" : -7, "MDT" : -6, "PST" : -8, "PDT" : -7, \
+                  "AKST" : -9, "AKDT" : -8, "HST" : -10, "AST" : -4, "ADT" : -3, "NST" : -3.5, "NDT" : -2.5, \
+                  "WET" : 0, "WEST" : 1, "BST" : 1, "CET" : 1, "CEST" : 2, "EET" : 2, "EEST" : 3, "MSK" : 3, \
+                  "JST" : 9, "KST" : 9, "HKT" : 8, "SGT" : 8, "AEST" : 10, "AEDT" : 11, "NZST" : 12, "NZDT" : 13}
+
+# Maps each time zone that was found to its tzinfo (see getTimeZone())
+time_zone_cache = {}
+
+# Format of the dates in the results file (set through the arguments):
+# * excel: M/DD/YYYY, which Excel recognizes as a date
+# * iso: ISO-8601 (YYYY-MM-DDTHH:MM:SS with the offset from UTC when the time zone is known)
+date_format = "excel"
+# Whether or not the creation and expiration dates are also written as seconds since the epoch (set through the arguments)
+epoch_columns = False
+epoch_column_names = ["Creation Epoch", "Expiration Epoch"]
+
+# Maps the entry type to the "Use" column (any other entry type is not written to the results file)
+use_dict = {public_key_type : "Trusted Cert", \
+            private_key_type : "Key Pair"}
+
+# Columns headers of the results file
+results_columns = ["Archived", "Location", "Product", "Product Component", "Host Name/IP", "Expiration", "Connection", "Use", \
+                   "Alias/Common Name", "Issuer", "Creation", "File Name", "Key Pair Location", "File Type", "Key Strength", \
+                   "Owner/Subject/RootCA Title", "Serial Number", "Owner", "Comments", "Received On", "Received From", "Inherited"]
+
+# Number of rows that are written to the results file at a time
+write_batch_size = 1000
+
+# The cache of the certificates extracted from each file (used with --cache) is kept next to results.csv by default
+cache_file_name = "results_cache.json"
+# This must be changed whenever a change to the parsing would extract different certificates from the same file
+cache_version = 7
+# Size of the blocks that files are read in when they are hashed
+hash_block_size = 1024 * 1024
+
+"""
+This class holds the metadata of a single certificate while it is extracted from a data dump. A certificate is what
+the parser hands back once all of its metadata has been found and what the rows of the results file are created from.
+__slots__ keeps each certificate small and the number of missing metadata is kept up to date as the metadata is found
+so that checking for completeness does not have to look at every piece of metadata.
+"""
+class Certificate(object):
+  __slots__ = ("host_name", "alias", "cert_type", "owner", "issuer", "serial_number", "start_date", "expiration_date", "key_strength", "fingerprint", "chain", "missing")
+
+  # Every piece of metadata that must be found for the certificate to be complete (the host name and the SHA-256
+  # fingerprint, which older versions of keytool do not print, are optional)
+  required_fields = ("alias", "cert_type", "owner", "issuer", "serial_number", "start_date", "expiration_date", "key_strength")
+  # Every piece of metadata in the order used by toList() and fromList()
+  fields = ("host_name",) + required_fields + ("fingerprint", "chain")
+
+  def __init__(self, host_name=''):
+    self.host_name = host_name
+    self.clear()
+
+  """
+  Clears all of the metadata except for the host name, which applies to every certificate that follows it.
+  """
+  def clear(self):
+    self.alias = ''
+    self.cert_type = ''
+    self.owner = ''
+    self.issuer = ''
+    self.serial_number = ''
+    self.start_date = None
+    self.expiration_date = None
+    self.key_strength = ''
+    self.fingerprint = ''
+    # The owner, issuer and SHA-256 fingerprint of each of the other certificates of the chain of the entry, in order
+    self.chain = []
+    self.missing = len(Certificate.required_fields)
+
+  """
+  Sets a piece of metadata that is required for the certificate to be complete. Only the first value that is found is
+  kept so that the other certificates in a certificate chain do not overwrite the metadata of the first certificate.
+  """
+  def setField(self, name, value):
+    if value and not getattr(self, name):
+      setattr(self, name, value)
+      self.missing -= 1
+
+  """
+  Returns whether or not all of the required metadata has been found.
+  """
+  def isComplete(self):
+    return self.missing == 0
+
+  """
+  Returns the identity of the certificate: its issuer and serial number, which are the same wherever the certificate is
+  found (unlike its alias). The SHA-256 fingerprint also identifies the certificate when it is available.
+  """
+  def getIdentity(self):
+    return (self.issuer, self.serial_number)
+
+  """
+  Returns the metadata as a list (in the order of Certificate.fields) so that it can be stored in the cache. The dates
+  are stored in the ISO-8601 format.
+  """
+  def toList(self):
+    values = [getattr(self, name) for name in Certificate.fields]
+    values[Certificate.fields.index("start_date")] = self.start_date.isoformat()
+    values[Certificate.fields.index("expiration_date")] = self.expiration_date.isoformat()
+    return values
+
+  """
+  Creates a certificate out of a list that was created by toList().
+  """
+  @staticmethod
+  def fromList(values):
+    certificate = Certificate(values[0])
+    for name, value in zip(Certificate.required_fields, values[1:]):
+      if name == "start_date" or name == "expiration_date":
+        value = datetime.datetime.fromisoformat(value)
+      certificate.setField(name, value)
+    certificate.fingerprint = values[Certificate.fields.index("fingerprint")]
+    certificate.chain = values[Certificate.fields.index("chain")]
+    return certificate
+
+"""
+This class holds the counters and timings of a single file for the run report. The file is parsed in one process (a
+worker process when there are jobs) and written in the main process, so the counters are filled in by both.
+"""
+class FileStatistics(object):
+  __slots__ = ("file", "file_type", "bytes", "lines", "aliases", "entries", "rows", "parse_seconds", "write_seconds", "cached", "error")
+
+  def __init__(self, file):
+    self.file = file
+    self.file_type = None
+    self.bytes = 0
+    self.lines = 0
+    # Number of entries that were started (by their alias) and number of entries that had all of their metadata
+    self.aliases = 0
+    self.entries = 0
+    self.rows = 0
+    self.parse_seconds = 0.0
+    self.write_seconds = 0.0
+    self.cached = False
+    self.error = None
+
+  """
+  Adds the counters and timings of a chunk of the file (see parseChunk()) to the ones of the file.
+  """
+  def addChunk(self, other):
+    self.lines += other.lines
+    self.aliases += other.aliases
+    self.entries += other.entries
+    self.parse_seconds += other.parse_seconds
+
+  """
+  Returns the counters and timings as a dictionary for the run report.
+  """
+  def toDict(self):
+    return {"file" : self.file, "file_type" : self.file_type, "bytes" : self.bytes, "lines" : self.lines, \
+            "entries" : self.entries, "dropped" : max(self.aliases - self.entries, 0), "rows" : self.rows, \
+            "parse_seconds" : round(self.parse_seconds, 6), "write_seconds" : round(self.write_seconds, 6), \
+            "cached" : self.cached, "error" : self.error}
 
 """
 Results file
-Note that this will always create/overwrite on a file named "results.csv"
+Note that this will always create/overwrite on a file named "results.csv". The file is only opened once the
+program starts parsing so that importing this file (which happens in every worker process on some platforms)
+does not overwrite the results.
+"""
+results = None
+results_writer = None
+# Connection to the SQLite inventory that the rows are written to instead of the results file (set through the arguments)
+inventory_connection = None
+# Index of the owners and issuers of the certificates of each file, used to create the chain report (set through the arguments)
+chains = None
+# Rows of each file while the watch mode keeps the results file up to date, as the whole results file is written again
+# whenever a file changes (see writeWatchedResults()). None when the rows are written straight into the results file.
+watch_rows = None
+# The rows of each file of watch_rows in the CSV format of the results file, so that only the rows of the files that
+# changed are formatted again
+watch_text = {}
+# Whether or not the counters and timings of each file are collected for the run report (set through the arguments)
+collect_statistics = False
+# The counters and timings of the file that is currently being parsed or written (None when they are not collected)
+current_statistics = None
+# The error that the file that is currently being read ran into (see readDecodedCertificates()), which keeps the file out
+# of the cache so that it is read again on the next run
+current_error = None
+# The counters and timings of every file that was written, in order
+file_statistics = []
+
+# Messages about the run (skipped files, the summary and, with --verbose, every certificate that is extracted) are
+# logged rather than printed so that they can be silenced with --quiet. Prompts for input are still printed.
+logger = logging.getLogger("generate_results")
+log_format = "%(levelname)s: %(message)s"
+# Whether or not every certificate is logged as it is extracted (set through the arguments). This is checked before
+# the message is created as it happens for every certificate.
+log_certificates = False
+# The progress of the run that is shown while the files are parsed (None when there is no progress to report)
+progress = None
+# Minimum number of seconds between two updates of the progress
+progress_interval = 0.25
+
+"""
+This class keeps track of the progress of the run (files done, entries extracted and bytes of the files that are done)
+and shows it on a single line of the terminal. The line is updated at most once every progress_interval seconds, so
+it can be updated for every certificate without slowing down the parsing. The estimated time left is based on the
+number of bytes parsed per second.
+"""
+class ProgressReporter(object):
+  def __init__(self, files, stream=None, display=True):
+    self.stream = stream if stream is not None else sys.stderr
+    # The progress is only shown on a terminal so that redirected output does not fill up with progress lines
+    self.display = display and hasattr(self.stream, "isatty") and self.stream.isatty()
+    self.files = len(files)
+    self.total_bytes = 0
+    for file in files:
+      try:
+        self.total_bytes += os.path.getsize(file)
+      except OSError:
+        pass
+    self.files_done = 0
+    self.entries = 0
+    self.bytes_done = 0
+    self.start = time.time()
+    self.last_update = 0.0
+    self.width = 0
+
+  """
+  Adds entries that were extracted. The position is a function that returns how many bytes of the current file have
+  been read, which is only called when the progress is shown.
+  """
+  def addEntries(self, count, position=None):
+    self.entries += count
+    self.update(position)
+
+  """
+  Marks a file (and all of its bytes) as done.
+  """
+  def finishFile(self, file_bytes):
+    self.files_done += 1
+    self.bytes_done += file_bytes
+    self.update()
+
+  """
+  Shows the progress if it was not shown within the last progress_interval seconds (or right away with force).
+  """
+  def update(self, position=None, force=False):
+    if not self.display:
+      return
+    now = time.time()
+    if not force and now - self.last_update < progress_interval:
+      return
+    self.last_update = now
+    elapsed = max(now - self.start, 1e-9)
+    bytes_done = self.bytes_done + (position() if position is not None else 0)
+    eta = "?"
+    if bytes_done > 0 and self.total_bytes >= bytes_done:
+      seconds = int((self.total_bytes - bytes_done) * elapsed / bytes_done)
+      eta = "{}:{:02d}".format(seconds // 60, seconds % 60)
+    line = "{}/{} files, {:,} entries, {:,.0f} entries/s, ETA {}".format(self.files_done, self.files, self.entries, self.entries / elapsed, eta)
+    self.stream.write("\r" + line.ljust(self.width))
+    self.stream.flush()
+    self.width = len(line)
+
+  """
+  Removes the progress from the terminal (so that a message can be written on a clean line).
+  """
+  def clearLine(self):
+    if self.width:
+      self.stream.write("\r" + " " * self.width + "\r")
+      self.stream.flush()
+      self.width = 0
+
+  """
+  Returns the number of seconds since the progress was started.
+  """
+  def getElapsed(self):
+    return time.time() - self.start
+
+"""
+This class writes the log messages to the console after removing the progress line (it is shown again with the next
+update of the progress).
+"""
+class ConsoleHandler(logging.StreamHandler):
+  def emit(self, record):
+    if progress is not None:
+      progress.clearLine()
+    logging.StreamHandler.emit(self, record)
+
 """
-results = open("results.csv", 'w+')
-# Initial write to create the columns headers
-results.write("Archived,Location,Product,Product Component,Host Name/IP,Expiration,Connection,Use,Alias/Common Name,Issuer,Creation,File Name,Key Pair Location,File Type,Key Strength,Owner/Subject/RootCA Title,Serial Number,Owner,Comments,Received On,Received From,Inherited\n")
+This function sets up the logging of the program (once per process) at the level given.
+"""
+def configureLogging(level):
+  if not logger.handlers:
+    handler = ConsoleHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(log_format))
+    logger.addHandler(handler)
+    logger.propagate = False
+  logger.setLevel(level)
+
+"""
+This function opens the results file and writes the column headers. The rows are written with the csv module so that
+any value with a comma in it (such as the owner and issuer lines) is quoted instead of having its commas replaced.
+"""
+def openResultsFile():
+  global results
+  global results_writer
+  # The csv module needs the file in binary mode on Python 2 and without newline translation on Python 3
+  if sys.version_info[0] < 3:
+    results = open("results.csv", 'wb+')
+  else:
+    results = open("results.csv", 'w+', newline='')
+  results_writer = csv.writer(results, lineterminator='\n')
+  # Initial write to create the columns headers
+  if epoch_columns:
+    results_writer.writerow(results_columns + epoch_column_names)
+  else:
+    results_writer.writerow(results_columns)
 
 """
 Function used in the atexit exit handler
 """
 def closeAllOpenFiles():
   # Although Python always closes file when it ends and after a "with" statement, this is to ensure data corruption does not occur
-  results.close()
+  if results is not None:
+    results.close()
+  if inventory_connection is not None:
+    inventory_connection.close()
 
 """
 Registering the "closeAllOpenFiles" function as a function that will
@@ -111,9 +520,28 @@ def validateInputCorrectness(var):
   return var
 
 """
-This method defines the global variables set at the beginning of this file by polling the user for input.
+This function checks that the date is in the following format: M/D/YYYY
+"""
+def isValidDate(date):
+  date_test = date.split('/')
+  return len(date_test) == 3 and \
+         date_test[0].isdigit() and \
+         (len(date_test[0]) == 1 or len(date_test[0]) == 2) and \
+         date_test[1].isdigit() and \
+         (len(date_test[1]) == 1 or len(date_test[1]) == 2) and \
+         date_test[2].isdigit() and \
+         len(date_test[2]) == 4
+
+"""
+This method defines the global variables set at the beginning of this file by polling the user for input. Any global
+variable that was already provided (through the arguments, a config file or a manifest) is not asked for again.
+
+Parameters:
+---------------------
+ask_host_names: boolean
+This boolean is False when whether or not there are host names in the files was already provided.
 """
-def defineGlobalVariables():
+def defineGlobalVariables(ask_host_names=True):
   global location
   global product
   global product_component
@@ -146,23 +574,11 @@ def defineGlobalVariables():
 
   while received_on == "":
     received_on = raw_input("\nPlease input the day (format: M/D/YYYY) that the certificate(s) was/were provided:\n")
-    received_on_test = received_on.split('/')
     if received_on == "":
       print("\nPlease provide a date that the certificate(s) was/were received on!\n")
-    elif len(received_on_test) == 3:
-      if not received_on_test[0].isdigit() or \
-         (len(received_on_test[0]) != 1 and len(received_on_test[0]) != 2) or \
-         not received_on_test[1].isdigit() or \
-         (len(received_on_test[1]) != 1 and len(received_on_test[1]) != 2) or \
-         not received_on_test[2].isdigit() or \
-         len(received_on_test[2]) != 4:
-        received_on = ""
-        print("\nPlease provide a valid date!\n")
-    elif len(received_on_test) != 3:
+    elif not isValidDate(received_on):
       received_on = ""
       print("\nPlease provide a valid date!\n")
-    else:
-      received_on = validateInputCorrectness(received_on)
 
   while received_from == "":
     received_from = raw_input("\nPlease input the person/group who provided the certificate(s)\n")
@@ -171,7 +587,7 @@ def defineGlobalVariables():
     else:
       received_from = validateInputCorrectness(received_from)
 
-  while host_name_input != 'y' and host_name_input != 'n':
+  while ask_host_names and host_name_input != 'y' and host_name_input != 'n':
     host_name_input = raw_input("\nAre there host names in the files that we can use (Y/N)?\n").lower()
     if host_name_input == 'y':
       host_name_available = True
@@ -180,18 +596,157 @@ def defineGlobalVariables():
     else:
       print("\nPlease provide a valid response!\n")
 
+"""
+This function checks the static columns that were provided through the arguments, a config file or a manifest. The
+same validation as the user input is performed (including the M/D/YYYY format of the received on date).
+
+Parameters:
+---------------------
+columns: dict
+This dictionary maps the name of each static column (see static_column_names) to its value.
+
+source: string
+This is where the static columns came from, which is used in the error message.
+
+Returns:
+---------------------
+validated: dict
+This dictionary is the same as the columns parameter except that "host_names" is converted to a boolean.
+"""
+def validateStaticColumns(columns, source):
+  validated = {}
+  for name, value in columns.items():
+    if name not in static_column_names:
+      raise ValueError('Unknown static column "' + name + '" in ' + source)
+    if name == "host_names":
+      if not isinstance(value, bool):
+        if value.lower() != 'y' and value.lower() != 'n':
+          raise ValueError('Please provide a valid response (Y/N) for host_names in ' + source)
+        value = value.lower() == 'y'
+    elif value == "":
+      raise ValueError('Please provide a value for ' + name + ' in ' + source)
+    elif name == "received_on" and not isValidDate(value):
+      raise ValueError('Please provide a valid date (format: M/D/YYYY) for received_on in ' + source)
+    validated[name] = value
+  return validated
+
+"""
+This function reads the static columns out of the [static_columns] section of a config file or a manifest. Only the
+static columns that are in the file are returned.
+
+Parameters:
+---------------------
+path: string
+This is the path of the config file or manifest.
+
+Returns:
+---------------------
+dict
+This dictionary maps the name of each static column found in the file to its validated value.
+"""
+def readStaticColumns(path):
+  config = configparser.RawConfigParser()
+  if not config.read(path):
+    raise ValueError('Unable to read "' + path + '"')
+  if not config.has_section(static_columns_section):
+    raise ValueError('There is no [' + static_columns_section + '] section in "' + path + '"')
+  columns = {}
+  for name, value in config.items(static_columns_section):
+    columns[name] = value.strip()
+  return validateStaticColumns(columns, '"' + path + '"')
+
+"""
+This function returns the static columns that are currently set in the global variables.
+"""
+def getStaticColumns():
+  return {"location" : location, \
+          "product" : product, \
+          "product_component" : product_component, \
+          "received_on" : received_on, \
+          "received_from" : received_from, \
+          "host_names" : host_name_available}
+
+"""
+This function sets the global variables to the static columns that are provided. Any static column that is not
+provided is left as is.
+"""
+def setStaticColumns(columns):
+  global location
+  global product
+  global product_component
+  global received_on
+  global received_from
+  global host_name_available
+
+  location = columns.get("location", location)
+  product = columns.get("product", product)
+  product_component = columns.get("product_component", product_component)
+  received_on = columns.get("received_on", received_on)
+  received_from = columns.get("received_from", received_from)
+  host_name_available = columns.get("host_names", host_name_available)
+
+"""
+This function returns the static columns from the manifest of a directory. The manifests are cached so that each
+manifest is only read once.
+"""
+def readManifest(directory, manifests):
+  if directory not in manifests:
+    path = os.path.join(directory, manifest_file_name)
+    if os.path.isfile(path):
+      manifests[directory] = readStaticColumns(path)
+    else:
+      manifests[directory] = {}
+  return manifests[directory]
+
+"""
+This function applies the manifests from the directory that was given to the program down to the directory of the file,
+so the manifest closest to the file takes precedence.
+
+Parameters:
+---------------------
+file: string
+This is the path of the file that the static columns are for.
+
+root: string
+This is the absolute path of the directory that was given to the program (or the directory of the file that was given).
+
+columns: dict
+This dictionary holds the static columns that apply to every file.
+
+manifests: dict
+This dictionary caches the manifest of each directory.
+
+Returns:
+---------------------
+file_columns: dict
+This dictionary holds the static columns that apply to the file.
+"""
+def applyManifests(file, root, columns, manifests):
+  directories = []
+  directory = os.path.dirname(os.path.abspath(file))
+  while True:
+    directories.append(directory)
+    if len(directory) <= len(root) or directory == os.path.dirname(directory):
+      break
+    directory = os.path.dirname(directory)
+
+  file_columns = dict(columns)
+  for directory in reversed(directories):
+    file_columns.update(readManifest(directory, manifests))
+  return file_columns
+
 """
 This function is the basic extraction where it begins a string splice from the starting
-position provided in the parameter and returns the result
+position provided in the parameter and stores the result in the certificate. Only the first
+occurrence is kept so that the other certificates in a certificate chain do not overwrite the
+metadata of the first certificate.
 
 Parameters:
 ---------------------
-current_string : string
-  This string will provide a pass-by-reference type of return in the event that the comp_string
-  does not match to prevent any loss of value of the current string
-comp_string : string
-  This string will provide the sub-string that will be compared to the line to search for
-  the appropriate line containing the pertinent metadata
+certificate : Certificate
+  This is the certificate that is currently being extracted
+name : string
+  This is the name of the metadata that the result will be stored as
 line : string
   This string is a line that is read using the "with" statement and will go through the file
   that was inputted by the user
@@ -201,34 +756,20 @@ slice_start_pos : integer
 
 Returns:
 ---------------------
-result_string : string
-  This string is the result of the splicing of the line variable in the case that the
-  comparison sub-string exists within the line variable
-current_string: string
-  This is the string's original value before it might be changed. This means that the variable
-  that gets assigned the output of this function is the same as current_string
+None
 """
-def validateAndExtract(current_string, comp_string, line, slice_start_pos):
-  global is_full_metadata
-
-  if (not is_full_metadata) and (comp_string in line) and (current_string == ""):
-    result_string = line[slice_start_pos:]
-    # Parsing to only have the pertinent information from each line
-    return result_string
-  else:
-    return current_string
+def validateAndExtract(certificate, name, line, slice_start_pos):
+  # Parsing to only have the pertinent information from each line
+  certificate.setField(name, line[slice_start_pos:])
 
 """
-This function is used specifically to extract server names.
+This function is used specifically to extract server names. Unlike the other metadata, the server name
+is always replaced as it applies to every certificate that follows it.
 
 Parameters:
 ---------------------
-current_string : string
-  This string will provide a pass-by-reference type of return in the event that the comp_string
-  does not match to prevent any loss of value of the current string
-comp_string : string
-  This string will provide the sub-string that will be compared to the line to search for
-  the appropriate line containing the pertinent metadata
+certificate : Certificate
+  This is the certificate that is currently being extracted
 line : string
   This string is a line that is read using the "with" statement and will go through the file
   that was inputted by the user
@@ -238,550 +779,2275 @@ string_split_pos : integer
 
 Returns:
 ---------------------
-result_string : string
-  This string is the result of the split of the line variable in the case that the
-  comparison sub-string exists within the line variable
-current_string: string
-  This is the string's original value before it might be changed. This means that the variable
-  that gets assigned the output of this function is the same as current_string
+None
 """
-def validateAndExtractServerNames(current_string, comp_string, line, string_split_pos):
-  if comp_string in line:
-    print(line)
-    result_string = line.split(' ')[string_split_pos]
-    # Parsing to only have the pertinent information from each line
-    if result_string != current_string:
-      return result_string
-  else:
-    return current_string
+def validateAndExtractServerNames(certificate, line, string_split_pos):
+  if log_certificates and host_name_available:
+    logger.debug(line)
+  # Parsing to only have the pertinent information from each line
+  certificate.host_name = line.split(' ')[string_split_pos]
+
+"""
+This function converts a date printed by keytool (such as "Mon Jan 01 00:00:00 UTC 2018") into a datetime. The date
+is split on any amount of whitespace so that padded days do not shift the rest of the date.
+
+Parameters:
+---------------------
+date : string
+  This string will provide the date in the format that keytool prints it in
+
+Returns:
+---------------------
+datetime
+  This is the date (with its offset from UTC when the time zone is known) or None if the date could not be read
+"""
+def parseKeytoolDate(date):
+  date_split = date.split()
+  # The time zone is left out by some versions of keytool
+  if len(date_split) == 5:
+    date_split.insert(4, "")
+  if len(date_split) != 6 or date_split[1] not in month_dict:
+    return None
+  time_split = date_split[3].split(':')
+  try:
+    return datetime.datetime(int(date_split[5]), month_dict[date_split[1]], int(date_split[2]), \
+                             int(time_split[0]), int(time_split[1]), int(time_split[2]), 0, getTimeZone(date_split[4]))
+  except (ValueError, IndexError):
+    return None
 
 """
-This function is used convert extracted dates into the ideal date for manipulation in Excel.
+This function returns the time zone printed by keytool as a tzinfo (or None if the time zone is not known). The time zones
+are kept in time_zone_cache as there are only a few of them in a data dump.
+"""
+def getTimeZone(time_zone):
+  if time_zone not in time_zone_cache:
+    offset = parseTimeZone(time_zone)
+    time_zone_cache[time_zone] = None if offset is None else datetime.timezone(offset)
+  return time_zone_cache[time_zone]
+
+"""
+This function returns the offset from UTC of a time zone printed by keytool (either an abbreviation or "GMT+hh:mm") or
+None if the time zone is not known.
+"""
+def parseTimeZone(time_zone):
+  if time_zone in time_zone_dict:
+    return datetime.timedelta(hours=time_zone_dict[time_zone])
+  if (time_zone.startswith("GMT+") or time_zone.startswith("GMT-")) and len(time_zone) == 9 and time_zone[6] == ':':
+    try:
+      offset = datetime.timedelta(hours=int(time_zone[4:6]), minutes=int(time_zone[7:9]))
+    except ValueError:
+      return None
+    if time_zone[3] == '-':
+      return -offset
+    return offset
+  return None
+
+"""
+This function formats a date for the results file in the format that was chosen (see date_format).
 
 Parameters:
 ---------------------
-month : string
-  This string will provide the month abbreviated to three letters with the first letter being capitalized
-day : string
-  This string will provide the day as a number
-year : string
-  This string will provide the year as a number
+date : datetime
+  This is the date that was extracted from the data dump
 
 Returns:
 ---------------------
 string
-  This string is the result of the abbreviated month converted to a number resulting in the following format: M/DD/YYYY
-"""
-def convertAbbreviatedDates(month, day, year):
-  if month == "Jan":
-    return "1/" + day + '/' + year
-  elif month == "Feb":
-    return "2/" + day + '/' + year
-  elif month == "Mar":
-    return "3/" + day + '/' + year
-  elif month == "Apr":
-    return "4/" + day + '/' + year
-  elif month == "May":
-    return "5/" + day + '/' + year
-  elif month == "Jun":
-    return "6/" + day + '/' + year
-  elif month == "Jul":
-    return "7/" + day + '/' + year
-  elif month == "Aug":
-    return "8/" + day + '/' + year
-  elif month == "Sep":
-    return "9/" + day + '/' + year
-  elif month == "Oct":
-    return "10/" + day + '/' + year
-  elif month == "Nov":
-    return "11/" + day + '/' + year
-  elif month == "Dec":
-    return "12/" + day + '/' + year
-
-"""
-This function is used specifically to extract dates.
-
-Parameters:
----------------------
-current_string : string
-  This string will provide a pass-by-reference type of return in the event that the comp_string
-  does not match to prevent any loss of value of the current string
-comp_string : string
-  This string will provide the sub-string that will be compared to the line to search for
-  the appropriate line containing the pertinent metadata
+  This string is the date in the M/DD/YYYY format (the day as keytool printed it) or the ISO-8601 format
+"""
+def formatDate(date):
+  if date_format == "iso":
+    return date.isoformat()
+  return str(date.month) + '/' + "%02d" % date.day + '/' + str(date.year)
+
+"""
+This function returns the number of seconds since the epoch of a date. Dates in a time zone that is not known are
+treated as UTC.
+"""
+def getEpoch(date):
+  if date.tzinfo is not None:
+    return calendar.timegm(date.utctimetuple())
+  return calendar.timegm(date.timetuple())
+
+"""
+This function is used specifically to extract dates. The start date and expiration date are both read from the validity
+line, which looks like the following:
+Valid from: Mon Jan 01 00:00:00 UTC 2018 until: Thu Jan 01 00:00:00 UTC 2028
+
+Parameters:
+---------------------
+certificate : Certificate
+  This is the certificate that is currently being extracted
 line : string
   This string is a line that is read using the "with" statement and will go through the file
   that was inputted by the user
-start_or_expiration : string
-  This tells the function whether or not the date that is to be searched is a "start" or "expiration" date
-  which requires different positions to be obtained after the split to gather the correct data
 
 Returns:
 ---------------------
-result_string : string
-  This string is the result of the splitting of the line variable in the case that the
-  comparison sub-string exists within the line variable
-current_string: string
-  This is the string's original value before it might be changed. This means that the variable
-  that gets assigned the output of this function is the same as current_string
+None
 """
-def validateAndExtractDates(current_string, comp_string, line, start_or_expiration):
-  global is_full_metadata
-
-  if (not is_full_metadata) and (comp_string in line):
-    line_splitted = line.split(' ')
-    result_string = ''
-    if start_or_expiration == 'start':
-      result_string = convertAbbreviatedDates(line_splitted[3], line_splitted[4], line_splitted[7])
-    elif start_or_expiration == 'expiration':
-      result_string = convertAbbreviatedDates(line_splitted[10], line_splitted[11], line_splitted[14])
+def validateAndExtractDates(certificate, line):
+  if not certificate.start_date or not certificate.expiration_date:
     # Parsing to only have the pertinent information from each line
-    return result_string
-  else:
-    return current_string
+    line_splitted = line[len(validity_comp_string):].split(validity_split_string)
+    if len(line_splitted) == 2:
+      certificate.setField("start_date", parseKeytoolDate(line_splitted[0]))
+      certificate.setField("expiration_date", parseKeytoolDate(line_splitted[1]))
+
+"""
+Extracts the host name from a servername line. The host name is always extracted (so that the certificates do not depend
+on whether or not the files were marked as having host names) but it is only written when the files were marked as having
+host names.
+"""
+def checkForHostName(certificate, line):
+  validateAndExtractServerNames(certificate, line, hostname_splice_start)
+
+"""
+Extracts the alias from the line. Since every entry in a keystore listing starts with its alias, anything left over from
+an incomplete entry is discarded first.
+"""
+def checkForAlias(certificate, line):
+  certificate.clear()
+  validateAndExtract(certificate, "alias", line, alias_splice_start)
 
 """
-Performs a check on the line to see if the host name is on the line.
+Extracts the key type from the line.
 """
-def checkForHostName(hostName, line):
-  newHostName = validateAndExtractServerNames(hostName, hostname_comp_string, line, hostname_splice_start)
-  return newHostName
+def checkForCertType(certificate, line):
+  validateAndExtract(certificate, "cert_type", line, certType_splice_start)
 
 """
-Performs a check on the line to see if the alias is on the line. Afterwards, the necessary string reformatting is performed.
+Extracts the owner from the line.
 """
-def checkForAlias(alias, line):
-  newAlias = validateAndExtract(alias, alias_comp_string, line, alias_splice_start)
-  # Some aliases use an issuer/owner name (which is strange) so we must remove the commas
-  newAlias = newAlias.replace(',', '_')
-  return newAlias
+def checkForOwner(certificate, line):
+  validateAndExtract(certificate, "owner", line, owner_splice_start)
 
 """
-Performs a check on the line to see if the key type is on the line. Afterwards, the necessary string reformatting is performed.
+Extracts the issuer from the line.
 """
-def checkForCertType(certType, line):
-  newCertType = validateAndExtract(certType, certType_comp_string, line, certType_splice_start)
-  # Removes any newlines that might have been generated during the printing of the
-  # input text file or any DOS code that wasn't originally recognized
-  newCertType = newCertType.replace('\r', '')
-  newCertType = newCertType.replace('\n', '')
-  return newCertType
+def checkForIssuer(certificate, line):
+  validateAndExtract(certificate, "issuer", line, issuer_splice_start)
 
 """
-Performs a check on the line to see if the owner is on the line. Afterwards, the necessary string reformatting is performed.
+Extracts the serial number from the line.
 """
-def checkForOwner(owner, line):
-  newOwner = validateAndExtract(owner, owner_comp_string, line, owner_splice_start)
-  newOwner = newOwner.replace(',', '_')
-  # Removes any newlines that might have been generated during the printing of the
-  # input text file or any DOS code that wasn't originally recognized
-  newOwner = newOwner.replace('\r', '')
-  newOwner = newOwner.replace('\n', '')
-  return newOwner
+def checkForSerialNumber(certificate, line):
+  validateAndExtract(certificate, "serial_number", line, serialNumber_splice_start)
 
 """
-Performs a check on the line to see if the issuer is on the line. Afterwards, the necessary string reformatting is performed.
+Extracts both the start date and the expiration date from the validity line.
 """
-def checkForIssuer(issuer, line):
-  newIssuer = validateAndExtract(issuer, issuer_comp_string, line, issuer_splice_start)
-  newIssuer = newIssuer.replace(',', '_')
-  # Removes any newlines that might have been generated during the printing of the
-  # input text file or any DOS code that wasn't originally recognized
-  newIssuer = newIssuer.replace('\r', '')
-  newIssuer = newIssuer.replace('\n', '')
-  return newIssuer
+def checkForValidityDates(certificate, line):
+  validateAndExtractDates(certificate, line)
 
 """
-Performs a check on the line to see if the serial number is on the line.
+Extracts the key strength from the line. Afterwards, the necessary string reformatting is performed.
 """
-def checkForSerialNumber(serialNumber, line):
-  newSerialNumber = validateAndExtract(serialNumber, serialNumber_comp_string, line, serialNumber_splice_start)
-  return newSerialNumber
+def checkForKeyStrength(certificate, line):
+  if certificate.key_strength == "":
+    certificate.setField("key_strength", formatKeyStrength(line[keyStrength_splice_start:]))
 
 """
-Performs a check on the line to see if the start date is on the line. Afterwards, the necessary string reformatting is performed.
+Extracts the SHA-256 fingerprint from the line. Only the fingerprint of the first certificate of a certificate chain is
+kept.
 """
-def checkForStartDate(startDate, line):
-  newStartDate = validateAndExtractDates(startDate, "Valid", line, startDate_comp_string)
-  # Removes any newlines that might have been generated during the printing of the
-  # input text file or any DOS code that wasn't originally recognized
-  newStartDate = newStartDate.replace('\r', '')
-  return newStartDate
+def checkForFingerprint(certificate, line):
+  if certificate.fingerprint == "":
+    certificate.fingerprint = line[fingerprint_splice_start:].strip()
 
 """
-Performs a check on the line to see if the expiration date is on the line. Afterwards, the necessary string reformatting is performed.
+Formats the key strength out of the name of the signature algorithm (such as "SHA256withRSA") that keytool prints. This is
+also used for the keystores that are read directly so that both give the same key strength.
 """
-def checkForExpirationDate(expirationDate, line):
-  newExpirationDate = validateAndExtractDates(expirationDate, "Valid", line, expirationDate_comp_string)
-  # Removes any newlines that might have been generated during the printing of the
-  # input text file or any DOS code that wasn't originally recognized
-  newExpirationDate = newExpirationDate.replace('\r', '')
-  return newExpirationDate
+def formatKeyStrength(signature_algorithm):
+  return signature_algorithm.replace("with", " with ")
 
 """
-Performs a check on the line to see if the key strength is on the line. Afterwards, the necessary string reformatting is performed.
+Dispatch table used to classify a line by the prefix (everything up to and including the first colon) that keytool
+prints before the metadata. This allows every line to be classified with one lookup and the metadata to be found
+regardless of the order it appears in.
 """
-def checkForKeyStrength(keyStrength, line):
-  newKeyStrength = validateAndExtract(keyStrength, keyStrength_comp_string, line, keyStrength_splice_start)
-  newKeyStrength = newKeyStrength.replace("with", " with ")
-  return newKeyStrength
+line_classifier_dict = {hostname_comp_string : checkForHostName, \
+                        alias_comp_string : checkForAlias, \
+                        certType_comp_string : checkForCertType, \
+                        owner_comp_string : checkForOwner, \
+                        issuer_comp_string : checkForIssuer, \
+                        serialNumber_comp_string : checkForSerialNumber, \
+                        validity_comp_string : checkForValidityDates, \
+                        keyStrength_comp_string : checkForKeyStrength, \
+                        fingerprint_comp_string : checkForFingerprint}
 
 """
-Writes all the appropriate variables into the results file in the correct format for further data manipulation after the full results are generated.
-TODO: Add functionality to change file type by extension. If no extension exists, leave the value as blank. 
+Creates the row for the results file out of the certificate and the static columns in the correct format for further data manipulation after the full results are generated.
+None is returned for any entry type that is not a trusted certificate or a key pair.
+The File Type is the type of keystore or certificate file that the certificate was found in (see getFileType()).
 """
-def writeToFile(hostName, alias, certType, owner, issuer, serialNumber, startDate, expirationDate, keyStrength):
-  # Beyond just having a full set of metadata, we have to check that it wasn't set to full due to an error (repetition/redundancy is acceptable and can be removed easily in post-results)
-  # Import line to results.csv
+def createRow(certificate):
   """
   Archived,Location,Product,Product Component,Host Name/IP,Expiration,Connection,Use,Alias/Common Name,Issuer,Creation,File Name,Key Pair Location,File Type,Key Strength,Owner/Subject/RootCA Title,Serial Number,Owner,Comments,Received On,Received From,Inherited
   """
   # Determines if the entry was a client certificate or a server certificate
-  if certType == public_key_type:
-    if host_name_available:
-      results.write("," + \
-                    location + "," + \
-                    product + "," + \
-                    product_component + "," + \
-                    hostName + "," + \
-                    expirationDate + \
-                    ",,Trusted Cert," + \
-                    alias + "," + \
-                    issuer + "," + \
-                    startDate + "," + \
-                    os.path.basename(cert_store) + \
-                    ",,.jks," + \
-                    keyStrength + "," + \
-                    owner + "," + \
-                    serialNumber + \
-                    ",,," + \
-                    received_on + "," + \
-                    received_from + "," + \
-                    "YES\n")
-    else:
-      results.write("," + \
-                    location + "," + \
-                    product + "," + \
-                    product_component + ",," + \
-                    expirationDate + \
-                    ",,Trusted Cert," + \
-                    alias + "," + \
-                    issuer + "," + \
-                    startDate + "," + \
-                    os.path.basename(cert_store) + \
-                    ",,.jks," + \
-                    keyStrength + "," + \
-                    owner + "," + \
-                    serialNumber + \
-                    ",,," + \
-                    received_on + "," + \
-                    received_from + "," + \
-                    "YES\n")
-  elif certType == private_key_type:
-    if host_name_available:
-      results.write("," + \
-                    location + "," + \
-                    product + "," + \
-                    product_component + "," + \
-                    hostName + "," + \
-                    expirationDate + \
-                    ",,Key Pair," + \
-                    alias + "," + \
-                    issuer + "," + \
-                    startDate + "," + \
-                    os.path.basename(cert_store) + \
-                    ",,.jks," + \
-                    keyStrength + "," + \
-                    owner + "," + \
-                    serialNumber + \
-                    ",,," + \
-                    received_on + "," + \
-                    received_from + "," + \
-                    "YES\n")
-    else:
-      results.write("," + \
-                    location + "," + \
-                    product + "," + \
-                    product_component + ",," + \
-                    expirationDate + \
-                    ",,Key Pair," + \
-                    alias + "," + \
-                    issuer + "," + \
-                    startDate + "," + \
-                    os.path.basename(cert_store) + \
-                    ",,.jks," + \
-                    keyStrength + "," + \
-                    owner + "," + \
-                    serialNumber + \
-                    ",,," + \
-                    received_on + "," + \
-                    received_from + "," + \
-                    "YES\n")
-
-"""
-This function checks if all appropriate variables have been assigned. If the appropriate variables have been assigned, the variables are printed out in the following format:
+  use = use_dict.get(certificate.cert_type)
+  if use is None:
+    return None
+  if host_name_available:
+    host_name = certificate.host_name
+  else:
+    host_name = ""
+  row = ["", location, product, product_component, host_name, formatDate(certificate.expiration_date), "", use, \
+         certificate.alias, certificate.issuer, formatDate(certificate.start_date), os.path.basename(cert_store), "", current_file_type, certificate.key_strength, \
+         certificate.owner, certificate.serial_number, "", "", received_on, received_from, "YES"]
+  if epoch_columns:
+    row.append(getEpoch(certificate.start_date))
+    row.append(getEpoch(certificate.expiration_date))
+  if inventory_connection is not None:
+    # The inventory also records the fingerprint and the file of each certificate (see inventory.upsertRows())
+    row.append(certificate.fingerprint)
+    row.append(current_file)
+  return row
+
+"""
+Writes a batch of rows into the results file or, when there is an inventory, merges them into the inventory in a single
+transaction.
+"""
+def writeRows(rows):
+  if current_statistics is not None:
+    start = time.time()
+  if inventory_connection is not None:
+    inventory.upsertRows(inventory_connection, rows)
+  elif watch_rows is not None:
+    watch_rows[current_file].extend(rows)
+  else:
+    # Beyond just having a full set of metadata, we have to check that it wasn't set to full due to an error (repetition/redundancy is acceptable and can be removed easily in post-results)
+    # Import lines to results.csv
+    results_writer.writerows(rows)
+  if current_statistics is not None:
+    current_statistics.write_seconds += time.time() - start
+    current_statistics.rows += len(rows)
+
+"""
+This function checks if all appropriate variables have been assigned. If the appropriate variables have been assigned and --verbose was given, the variables are logged in the following format:
 alias, key type, host name, issuer, owner, serial number, start date, expiration date, key strength
 
 This function also returns whether or not the check was successful.
 """
-def checkForCompleteness(hostName, alias, certType, owner, issuer, serialNumber, startDate, expirationDate, keyStrength):
+def checkForCompleteness(certificate):
   # Provides an output to see the results of the extraction and to validate that the list of metadata is full
-  if (alias != "") and (certType != "") and (serialNumber != "") and (issuer != "") and \
-     (owner != "") and (expirationDate != "") and (startDate != "") and \
-     (keyStrength != ""):
-    if host_name_available:
-      print("\nExtraction Result:\n\n{}, {}, {}, {}, {}, {}, {}, {}, {}".format(alias, certType, hostName, issuer, owner, serialNumber, startDate, expirationDate, keyStrength))
-    else:
-      print("\nExtraction Result:\n\n{}, {}, "", {}, {}, {}, {}, {}, {}".format(alias, certType, issuer, owner, serialNumber, startDate, expirationDate, keyStrength))
+  if certificate.isComplete():
+    if log_certificates:
+      logger.debug("Extraction Result: {}, {}, {}, {}, {}, {}, {}, {}, {}".format(certificate.alias, certificate.cert_type, certificate.host_name if host_name_available else "", certificate.issuer, certificate.owner, certificate.serial_number, formatDate(certificate.start_date), formatDate(certificate.expiration_date), certificate.key_strength))
     return True
   else:
     return False
 
 """
-This function parses through each line of the text file that this script takes as user input
-and then prints out all the pertinent metadata (including hard-coded values stored as global
-variables) in the appropriate columns headers format to results.csv
-
-*** Please note that any file that has been formatted by DOS must be converted to UNIX ***
+This function classifies the line by the prefix keytool printed before the metadata (once the indentation that some
+versions of keytool print before it is stripped) and then extracts the metadata from the line into the current
+certificate.
 
 Parameters:
 ---------------------
 line: string
-This is the file that runs under the assumption that the file is a regular file and then runs the parsing function to
-extract all pertinent metadata.
+This is the line (without the line ending) that is currently being interpreted.
+
+certificate: Certificate
+This is the certificate that is currently being extracted.
 
-alias: string
-This is the alias that is currently set when trying to interpret the line.
+Returns:
+---------------------
+boolean
+This boolean is True if the line held metadata and False otherwise.
+"""
+def processLine(line, certificate):
+  line = line.lstrip(line_indent)
+  check = line_classifier_dict.get(line[:line.find(':') + 1])
+  if check is None:
+    return False
+  check(certificate, line)
+  return True
 
-cert_type: string
-This is the certificate type (keypair or trusted cert) that is currently set when trying to interpret the line.
+# Prefixes of the lines that hold the metadata of the other certificates of the chain of an entry (see addChainLine())
+chain_prefixes = (owner_comp_string, issuer_comp_string, fingerprint_comp_string)
+# Prefixes of the lines that start the next entry
+entry_prefixes = (hostname_comp_string, alias_comp_string)
 
-owner: string
-This is the owner line that is currently set when trying to interpret the line.
+"""
+This function adds the metadata of a line that follows the certificate of an entry to the other certificates of the
+chain of the entry. keytool prints each certificate of the chain with its owner first, so each Owner line starts the next
+certificate of the chain and the Issuer and SHA256 lines that follow it are its issuer and fingerprint.
 
-issuer: string
-This is the issuer line that is currently set when trying to interpret the line.
+Parameters:
+---------------------
+certificate: Certificate
+This is the certificate of the entry, which is complete.
 
-serial_number: string
-This is the serial number that is currently set when trying to interpret the line.
+prefix: string
+This is the prefix of the line (one of chain_prefixes).
 
-start_date: string
-This is the shorthand start date that is currently set when trying to interpret the line.
+line: string
+This is the line without its indentation.
+"""
+def addChainLine(certificate, prefix, line):
+  if prefix == owner_comp_string:
+    certificate.chain.append([line[owner_splice_start:], '', ''])
+  elif certificate.chain:
+    chain_certificate = certificate.chain[-1]
+    if prefix == issuer_comp_string and not chain_certificate[1]:
+      chain_certificate[1] = line[issuer_splice_start:]
+    elif prefix == fingerprint_comp_string and not chain_certificate[2]:
+      chain_certificate[2] = line[fingerprint_splice_start:].strip()
 
-expiration_date: string
-This is the shorthand expiration date that is currently set when trying to interpret the line.
+"""
+This function reads the text file one line at a time so that only a single line (plus the read buffer) is held in memory
+regardless of the size of the data dump. The line endings are removed here for both UNIX and DOS formatted files so that
+the extraction functions never see a trailing carriage return or newline.
 
-key_strength: string
-This is the signature algorithm that is currently set when trying to interpret the line.
+Parameters:
+---------------------
+file: file object
+This is the text file that has been opened with newline='' so that the original line endings are preserved.
 
 Returns:
 ---------------------
-newAlias: string
-This is the new alias determined by the line if it exists on the line and the input parameter was empty.
-
-newCertType: string
-This is the certificate type (keypair or trusted ert) determined by the line if it exists on the line and the input
-parameter was empty.
-
-newOwner: string
-This is the owner line determined by the line if it exists on the line and the input parameter was empty.
+line: string
+This generator yields each line of the file without the line ending.
+"""
+def readLines(file):
+  for line in file:
+    yield line.rstrip('\r\n')
 
-newIssuer: string
-This is the issuer line determined by the line if it exists on the line and the input parameter was empty.
+"""
+This function goes through the lines of a data dump and extracts the pertinent metadata one certificate at a time.
+Once a certificate has all of its metadata, the rest of its entry is only read for the other certificates of its chain
+(see addChainLine()) and the certificate is handed back to the caller when the next entry (or host name) starts.
 
-newSerialNumber: string
-This is the serial number determined by the line if it exists on the line and the input parameter was empty.
+Parameters:
+---------------------
+lines: iterable
+This is any iterable of lines (without line endings) from a "keytool -list -v" data dump.
 
-newStartDate: string
-This is the shorthand start date determined by the line if it exists on the line and the input parameter was empty.
+host_name: string
+This is the host name that the first lines are under (see splitDump()).
 
-newExpirationDate: string
-This is the shorthand expiration date determined by the line if it exists on the line and the input parameter was empty.
+Returns:
+---------------------
+certificate: Certificate
+This generator yields each complete certificate in the order they were found.
+"""
+def extractCertificates(lines, host_name=''):
+  certificate = Certificate(host_name)
+  # The certificate that is complete, whose chain is read up to the start of the next entry
+  complete = None
+
+  for line in lines:
+    if complete is not None:
+      stripped = line.lstrip(line_indent)
+      prefix = stripped[:stripped.find(':') + 1]
+      if prefix not in entry_prefixes:
+        if prefix in chain_prefixes:
+          addChainLine(complete, prefix, stripped)
+        continue
+      yield complete
+      complete = None
+
+    # The completeness only needs to be checked when the line changed the metadata
+    if processLine(line, certificate) and checkForCompleteness(certificate):
+      complete = certificate
+
+      # Starting a new certificate (under the same host name) so the next certificate can be extracted
+      certificate = Certificate(certificate.host_name)
+
+  if complete is not None:
+    yield complete
 
-newKeyStrength: string
-This is the signature algorithm determined by the line if it exists on the line and the input parameter was empty.
 """
-def processLine(line, alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength):
-  newAlias = alias
-  newCertType = cert_type
-  newOwner = owner
-  newIssuer = issuer
-  newSerialNumber = serial_number
-  newStartDate = start_date
-  newExpirationDate = expiration_date
-  newKeyStrength = key_strength
-  # Nested if statement control flow to prevent multiple calls to the validateAndExtract
-  # or validateAndExtractDates functions which will take up space on the assembly instructions set
-  if alias == "":
-    newAlias = checkForAlias(alias, line)
-  else:
-    if cert_type == "":
-      newCertType = checkForCertType(cert_type, line)
-    else:
-      if owner == "":
-        newOwner = checkForOwner(owner, line)
-      else:
-        if issuer == "":
-          newIssuer = checkForIssuer(issuer, line)
-        else:
-          if serial_number == "":
-            newSerialNumber = checkForSerialNumber(serial_number, line)
-          else:
-            if start_date == "":
-              newStartDate = checkForStartDate(start_date, line)
-            if expiration_date == "":
-              newExpirationDate = checkForExpirationDate(expiration_date, line)
-            else:
-              if key_strength == "":
-                newKeyStrength = checkForKeyStrength(key_strength, line)
-  return newAlias, newCertType, newOwner, newIssuer, newSerialNumber, newStartDate, newExpirationDate, newKeyStrength
+Patterns used by the mmap engine. A line starts at the start of the data dump or after any line ending (\n, \r\n or \r,
+the same as readLines()) and holds metadata when it starts with one of the prefixes of line_classifier_dict (after any
+indentation, which is not part of the group of the prefix). Since every
+prefix ends with its only colon, a line that starts with a prefix is classified the same way as by processLine(). The
+group that matched the prefix gives the position of its function in line_checks.
+"""
+line_checks = [line_classifier_dict[prefix] for prefix in sorted(line_classifier_dict)]
+line_start_pattern = br"(?:(?<=[\r\n])|\A)"
+indent_pattern = b"[" + re.escape(line_indent.encode("ascii")) + b"]*"
+metadata_line_pattern = re.compile(line_start_pattern + indent_pattern + b"(?:" + b"|".join(b"(" + re.escape(prefix.encode("ascii")) + b")" for prefix in sorted(line_classifier_dict)) + \
+                                   b")[^\r\n]*")
+# Once a certificate is complete, nothing but a host name or the alias of the next entry can change the certificates that
+# follow (an alias clears everything else), so the rest of the entry is only looked at for the lines of the other
+# certificates of its chain with this pattern
+entry_line_pattern = re.compile(line_start_pattern + indent_pattern + b"(?:" + b"|".join(b"(" + re.escape(prefix.encode("ascii")) + b")" if prefix in entry_prefixes + chain_prefixes else b"((?!))" \
+                                                                        for prefix in sorted(line_classifier_dict)) + b")[^\r\n]*")
+line_prefixes = sorted(line_classifier_dict)
+alias_line_pattern = re.compile(line_start_pattern + indent_pattern + re.escape(alias_comp_string.encode("ascii")))
+line_ending_pattern = re.compile(b"\r\n?|\n")
+# A carriage return that is not followed by a newline ends a line on its own, which the patterns below do not allow for
+lone_carriage_return_pattern = re.compile(b"\r(?!\n)")
+alias_prefix = alias_comp_string.encode("ascii")
+hostname_marker = hostname_comp_string.encode("ascii")
+# The rest of a line (up to its line ending)
+line_content_pattern = re.compile(b"[^\r\n]*")
+
+# The next alias (group 1) or servername (group 2) line, after the line ending of the line before it
+next_entry_pattern = re.compile(b"\n" + indent_pattern + b"(?:(" + re.escape(alias_prefix) + b")|(" + re.escape(hostname_comp_string.encode("ascii")) + b"))")
+# The next line of another certificate of the chain of an entry (see addChainLine()), after the line ending of the line
+# before it
+next_chain_line_pattern = re.compile(b"\n" + indent_pattern + b"((?:" + b"|".join(re.escape(prefix.encode("ascii")) for prefix in chain_prefixes) + b")[^\r\n]*)")
+first_entry_pattern = re.compile(indent_pattern + b"(?:(" + re.escape(alias_prefix) + b")|(" + re.escape(hostname_comp_string.encode("ascii")) + b"))")
 
 """
-This function parses through each line of the text file that this script takes as user input
-and then prints out all the pertinent metadata (including hard-coded values stored as global
-variables) in the appropriate columns headers format to results.csv
+An entry laid out the way keytool prints it: the alias line, the entry type, owner, issuer, serial number and validity
+lines of the first certificate, its SHA-256 fingerprint line (when there is one) and its signature algorithm line, in
+that order, with any number of lines that do not hold metadata in between. Since the lines in between cannot hold
+metadata, each line that is matched is the first line of its kind in the entry and the signature algorithm line is the
+one that completes the certificate, so the certificate is the same as the one extractCertificates() finds.
+"""
+# A line that does not start with the first character of any prefix is skipped without checking every prefix. The other
+# lines (including empty ones) are checked against every prefix. The two alternatives never match the same line, so a
+# failed match backtracks over each line once instead of trying both alternatives for every line that was skipped.
+layout_first_characters = re.escape("".join(sorted(set(prefix[0] for prefix in line_classifier_dict))).encode("ascii"))
+layout_other_line_pattern = b"[^\n" + re.escape(line_indent.encode("ascii")) + layout_first_characters + b"]"
+layout_skip_pattern = b"(?:" + layout_other_line_pattern + b"[^\n]*\n|(?!" + layout_other_line_pattern + b")(?!" + indent_pattern + b"(?:" + \
+                      b"|".join(re.escape(prefix.encode("ascii")) for prefix in sorted(line_classifier_dict)) + b"))[^\n]*\n)*"
+layout_line_pattern = lambda prefix: indent_pattern + b"(" + re.escape(prefix.encode("ascii")) + b"[^\r\n]*)"
+entry_layout_pattern = re.compile(b"\r?\n".join([layout_line_pattern(alias_comp_string), layout_skip_pattern + layout_line_pattern(certType_comp_string), \
+                                                 layout_skip_pattern + layout_line_pattern(owner_comp_string), layout_skip_pattern + layout_line_pattern(issuer_comp_string), \
+                                                 layout_skip_pattern + layout_line_pattern(serialNumber_comp_string), layout_skip_pattern + layout_line_pattern(validity_comp_string), \
+                                                 layout_skip_pattern + b"(?:" + layout_line_pattern(fingerprint_comp_string) + b"\r?\n" + layout_skip_pattern + b")?" + \
+                                                 layout_line_pattern(keyStrength_comp_string)]))
 
-*** Please note that any file that has been formatted by DOS must be converted to UNIX ***
+"""
+This function creates the certificate of an entry that matched entry_layout_pattern. Each line is the first of its kind
+in the entry, so the metadata is set straight from the lines instead of going through the check functions one line at a
+time, which gives the same certificate as the check functions would.
 
 Parameters:
 ---------------------
-f: string
-This is the file that runs under the assumption that the file is a regular file and then runs the parsing function to
-extract all pertinent metadata.
+host_name: string
+This is the host name that the entry is under.
+
+match: re.Match
+This is the match of entry_layout_pattern.
+
+encoding: string
+This is the encoding of the data dump.
 
 Returns:
 ---------------------
-None
+Certificate
+This is the certificate, which might not be complete (when a line has no metadata in it).
 """
-def parse(f):
-  global results
-  global location
-  global product
+def createLayoutCertificate(host_name, match, encoding):
+  alias, cert_type, owner, issuer, serial_number, validity, fingerprint, key_strength = match.groups()
+  certificate = Certificate(host_name)
+  certificate.alias = alias.decode(encoding)[alias_splice_start:]
+  certificate.cert_type = cert_type.decode(encoding)[certType_splice_start:]
+  certificate.owner = owner.decode(encoding)[owner_splice_start:]
+  certificate.issuer = issuer.decode(encoding)[issuer_splice_start:]
+  certificate.serial_number = serial_number.decode(encoding)[serialNumber_splice_start:]
+  dates = validity.decode(encoding)[len(validity_comp_string):].split(validity_split_string)
+  if len(dates) == 2:
+    certificate.start_date = parseKeytoolDate(dates[0])
+    certificate.expiration_date = parseKeytoolDate(dates[1])
+  certificate.key_strength = formatKeyStrength(key_strength.decode(encoding)[keyStrength_splice_start:])
+  if fingerprint is not None:
+    certificate.fingerprint = fingerprint.decode(encoding)[fingerprint_splice_start:].strip()
+  certificate.missing = sum(1 for name in Certificate.required_fields if not getattr(certificate, name))
+  return certificate
 
-  # Initializing the variables for results
-  if host_name_available:
-    host_name=''
-
-  alias = ''
-  serial_number = ''
-  issuer = ''
-  owner = ''
-  expiration_date = ''
-  start_date = ''
-  key_strength = ''
-  cert_type = ''
-
-  # Variable to be used for grabbing one certificate at a time
-  global is_full_metadata
-
-  # Opening the file
-  with open(f, 'r') as file:
-    # For whatever reason, readlines() will not work because additional
-    # new-line characters were added into the text file. This (file.read().splitlines()) removes that issue.
-    lines = file.read().splitlines()
-    line_numbers = iter(range(0, len(lines)))
-    for line_number in line_numbers:
-      line = lines[line_number]
-
-      # Ensures only the starts (before any certificate metadata) of the servernames are recognized
-      # to be used as the host name/IP
-      if host_name_available:
-        host_name = checkForHostName(host_name, line)
-
-      # This entire set of logic could have been placed in a separate function for modularity
-      # ** Take note to do this in future revisions **
-      if not is_full_metadata:
-        alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength = processLine(line, alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength)
-
-        if host_name_available:
-          is_full_metadata = checkForCompleteness(host_name, alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength)
-        else:
-          is_full_metadata = checkForCompleteness('', alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength)
-      else:
-        if host_name_available:
-          writeToFile(host_name, alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength)
-        else:
-          writeToFile('', alias, cert_type, owner, issuer, serial_number, start_date, expiration_date, key_strength)
-
-        # Cleaning up data after import so a new certificate can be extracted
-        is_full_metadata = False
-        alias = ""
-        issuer = ""
-        owner = ""
-        serial_number = ""
-        expiration_date = ""
-        start_date = ""
-        key_strength = ""
-        cert_type = ""
-
-    # Although the ending of the with statement will close the file it interacts with,
-    # to ensure data doesn't get lost or corrupted, we will close prior to the end of the with statement
-    file.close()
+"""
+This function finds the next alias or servername line from the position given (the start of the data dump or the end of
+a line).
+
+Returns:
+---------------------
+tuple
+This is the position of the start of the line and whether or not it is an alias line, or None when there is none left.
+"""
+def findEntryLine(buffer, start):
+  if start == 0:
+    match = first_entry_pattern.match(buffer)
+    if match is not None:
+      return 0, match.lastindex == 1
+  match = next_entry_pattern.search(buffer, start)
+  if match is None:
+    return None
+  return match.start() + 1, match.lastindex == 1
 
 """
-This function parses a single file. This function assumes that the file passed in will be a regular file.
+This function returns the line that starts at the position given (without the line ending) along with the position of
+the end of the line.
+"""
+def readLine(buffer, encoding, start):
+  end = buffer.find(b"\n", start)
+  if end == -1:
+    end = len(buffer)
+  if buffer[end - 1:end] == b"\r" and end > start:
+    end -= 1
+  return buffer[start:end].decode(encoding), end
+
+"""
+This function extracts the certificates out of part of a data dump one line that holds metadata at a time, in the same
+way as extractCertificates(). The lines that hold metadata are found with a precompiled regular expression, so the other
+lines are never decoded.
 
 Parameters:
 ---------------------
-file: string
-This is the file that runs under the assumption that the file is a regular file and then runs the parsing function to
-extract all pertinent metadata.
+buffer: bytes or mmap
+This is the data dump.
+
+encoding: string
+This is the encoding of the data dump.
+
+state: list
+This list holds the certificate that is being extracted, which is replaced as the certificates are found.
+
+start: integer
+This is the position to start at (the start of a line).
+
+end: integer
+This is the position to stop at (the start of a line or the end of the data dump).
+
+position: list
+This list holds the position in the data dump that the extraction has reached.
 
 Returns:
 ---------------------
-None
+certificate: Certificate
+This generator yields each complete certificate in the order they were found.
 """
-def parseFile(file):
-  parse(os.path.abspath(file))
+def extractLineCertificates(buffer, encoding, state, start, end, position):
+  pattern = metadata_line_pattern
+  # The certificate that is complete, whose chain is read up to the start of the next entry
+  complete = None
+  match = pattern.search(buffer, start, end)
+  while match is not None:
+    line_end = match.end()
+    prefix = line_prefixes[match.lastindex - 1]
+    if complete is not None and prefix in chain_prefixes:
+      addChainLine(complete, prefix, buffer[match.start(match.lastindex):line_end].decode(encoding))
+    else:
+      if complete is not None:
+        position[0] = match.start(match.lastindex)
+        yield complete
+        complete = None
+      line_checks[match.lastindex - 1](state[0], buffer[match.start(match.lastindex):line_end].decode(encoding))
+      if checkForCompleteness(state[0]):
+        complete = state[0]
+
+        # Starting a new certificate (under the same host name) and skipping to the next entry
+        state[0] = Certificate(state[0].host_name)
+        pattern = entry_line_pattern
+      elif pattern is entry_line_pattern and state[0].alias:
+        pattern = metadata_line_pattern
+    match = pattern.search(buffer, line_end, end)
+  if complete is not None:
+    position[0] = end
+    yield complete
 
 """
-This is the replacement to runSingleArgumentParsing() whereby this function recursively digs through the filesystem until it reaches
-a directory that has only files in it and only parses files. This removes the restriction of only searching 1-level deep into a
-filesystem.
+This function extracts the certificates out of a data dump that is in memory (or memory-mapped) without going through
+every line in Python. Each entry that is laid out the way keytool prints it (see entry_layout_pattern) is matched as a
+whole with a single precompiled regular expression and only the lines that hold its metadata are decoded. After the line
+that completes a certificate, only the Owner, Issuer and SHA256 lines of the other certificates of its chain are decoded
+up to the next alias or servername line. An entry that is laid out differently is extracted line by line with
+extractLineCertificates() instead, as is a data dump with lines that end with a carriage return alone. Either way, the
+certificates are identical to the ones from extractCertificates().
 
 Parameters:
 ---------------------
-f: string
-This is the file that will be checked as either a regular file or a directory and will be treated accordingly
-to recursively parse through all available files.
+buffer: bytes or mmap
+This is the data dump.
+
+encoding: string
+This is the encoding of the data dump, which must keep ASCII as it is (see isMappable()).
+
+position: list
+This list holds the position in the data dump that the extraction has reached (updated as the certificates are found).
+
+host_name: string
+This is the host name that the first lines are under (see splitDump()).
 
 Returns:
 ---------------------
-None
+certificate: Certificate
+This generator yields each complete certificate in the order they were found.
 """
-def recursiveParsing(f):
-  global cert_store
-  if os.path.isdir(f):
-    base_path = os.path.abspath(f)
-    directory_list = os.listdir(base_path)
-    for file in directory_list:
-      if os.path.isdir(base_path + '/' + file):
-        recursiveParsing(base_path + '/' + file)
-      elif os.path.isfile(base_path + '/' + file):
-        parseFile(base_path + '/' + file)
-  elif os.path.isfile(os.path.abspath(f)):
-    parseFile(f)
-
-def main(argv):
-  global cert_store
+def extractBufferCertificates(buffer, encoding, position=None, host_name=''):
+  if position is None:
+    position = [0]
+  state = [Certificate(host_name)]
+  if lone_carriage_return_pattern.search(buffer) is not None:
+    for certificate in extractLineCertificates(buffer, encoding, state, 0, len(buffer), position):
+      yield certificate
+    return
+
+  # The lines before the first alias can only change the host name, as does every line between the line that completes a
+  # certificate and the next alias
+  entry_line = findEntryLine(buffer, 0)
+  while entry_line is not None:
+    start, is_alias = entry_line
+    if not is_alias:
+      line, line_end = readLine(buffer, encoding, start)
+      checkForHostName(state[0], line.lstrip(line_indent))
+      entry_line = findEntryLine(buffer, line_end)
+      continue
+
+    match = entry_layout_pattern.match(buffer, start)
+    if match is not None:
+      certificate = createLayoutCertificate(state[0].host_name, match, encoding)
+      if checkForCompleteness(certificate):
+        entry_line = findEntryLine(buffer, match.end())
+        chain_end = len(buffer) if entry_line is None else entry_line[0]
+        for chain_match in next_chain_line_pattern.finditer(buffer, match.end(), chain_end):
+          line = chain_match.group(1).decode(encoding)
+          addChainLine(certificate, line[:line.find(':') + 1], line)
+        position[0] = chain_end
+        yield certificate
+
+        state[0] = Certificate(certificate.host_name)
+        continue
+
+    # The entry is extracted line by line up to the next alias
+    next_entry = next_entry_pattern.search(buffer, start)
+    while next_entry is not None and next_entry.lastindex != 1:
+      next_entry = next_entry_pattern.search(buffer, next_entry.end())
+    end = len(buffer) if next_entry is None else next_entry.start() + 1
+    for certificate in extractLineCertificates(buffer, encoding, state, start, end, position):
+      yield certificate
+    entry_line = None if next_entry is None else (end, True)
 
-  defineGlobalVariables()
+"""
+This function returns whether or not the mmap engine can read a data dump in the encoding given. The encoding must keep
+ASCII (the prefixes and line endings) as it is, which is not the case for UTF-16 for example.
+"""
+def isMappable(encoding):
+  try:
+    return (alias_comp_string + "\r\n").encode(encoding) == (alias_comp_string + "\r\n").encode("ascii")
+  except LookupError:
+    return False
+
+"""
+This function extracts the certificates out of a data dump with the mmap engine. The data dump is memory-mapped, so it is
+never read into memory as a whole or line by line. The certificates are identical to the ones from extractCertificates().
+
+Parameters:
+---------------------
+f: string
+This is the path of the data dump.
+
+Returns:
+---------------------
+certificate: Certificate
+This generator yields each complete certificate in the order they were found.
+"""
+def extractMappedCertificates(f):
+  with open(f, 'rb') as file:
+    # An empty file cannot be memory-mapped
+    if os.fstat(file.fileno()).st_size == 0:
+      return
+    buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      countBufferLines(buffer)
+      position = [0]
+      for certificate in extractBufferCertificates(buffer, locale.getpreferredencoding(False), position):
+        if progress is not None:
+          progress.addEntries(1, lambda: position[0])
+        yield certificate
+    finally:
+      buffer.close()
+
+"""
+This function counts the lines and the entries (by their alias) of a data dump that is in memory (or memory-mapped) for
+the run report, in the same way as countLines().
+"""
+def countBufferLines(buffer):
+  if current_statistics is not None:
+    current_statistics.lines += sum(1 for line_ending in line_ending_pattern.finditer(buffer))
+    if buffer[-1:] not in (b"\r", b"\n", b""):
+      current_statistics.lines += 1
+    current_statistics.aliases += sum(1 for alias in alias_line_pattern.finditer(buffer))
+
+"""
+This function splits a data dump that is larger than chunk_size into chunks of about chunk_size bytes so that they can be
+parsed in different worker processes. Each chunk starts with an alias line, which clears everything that came before it
+except for the host name, so the certificates of the chunks are the same as the ones of the whole data dump as long as
+each chunk starts under the host name of the last servername line before it.
+
+Parameters:
+---------------------
+f: string
+This is the path of the data dump.
+
+Returns:
+---------------------
+list
+This is the list of chunks (the position of the start and end of the chunk and the host name it starts under) or None
+when the file is not split (when it is not large enough, not a data dump or not in an encoding that keeps ASCII as it
+is).
+"""
+def splitDump(f):
+  encoding = locale.getpreferredencoding(False)
+  try:
+    if os.path.getsize(f) <= chunk_size or sniffFileType(f) in decoded_file_types or not isMappable(encoding):
+      return None
+  except OSError:
+    return None
+
+  with open(f, 'rb') as file:
+    buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      boundaries = [0]
+      position = buffer.find(b"\n" + alias_prefix, chunk_size)
+      while position != -1:
+        boundaries.append(position + 1)
+        position = buffer.find(b"\n" + alias_prefix, position + 1 + chunk_size)
+      boundaries.append(len(buffer))
+      chunks = [(start, end, findHostName(buffer, encoding, start)) for start, end in zip(boundaries, boundaries[1:])]
+    finally:
+      buffer.close()
+  if len(chunks) < 2:
+    return None
+  return chunks
+
+"""
+This function returns whether or not only indentation comes between the start of its line and the position given.
+"""
+def isLineStart(buffer, position):
+  while position > 0 and buffer[position - 1:position] in (b" ", b"\t"):
+    position -= 1
+  return position == 0 or buffer[position - 1:position] in (b"\r", b"\n")
+
+"""
+This function returns the host name of the last servername line before the position given (or an empty host name when
+there is none), which is the host name that a chunk starting at the position is under.
+"""
+def findHostName(buffer, encoding, end):
+  position = buffer.rfind(hostname_marker, 0, end)
+  # The servername must be at the start of a line (after any indentation)
+  while position > 0 and not isLineStart(buffer, position):
+    position = buffer.rfind(hostname_marker, 0, position)
+  if position == -1:
+    return ''
+  line = line_content_pattern.match(buffer, position).group().decode(encoding)
+  return line.split(' ')[hostname_splice_start]
+
+"""
+This function extracts the certificates out of a data dump with the engine that was chosen. The lines engine is used when
+the data dump cannot be memory-mapped in its encoding.
+"""
+def extractFileCertificates(f):
+  if engine == "mmap" and isMappable(locale.getpreferredencoding(False)):
+    for certificate in extractMappedCertificates(f):
+      yield certificate
+    return
+  # Opening the file with newline='' so the line endings are handled by readLines()
+  with io.open(f, 'r', newline='') as file:
+    for certificate in extractCertificates(countLines(readLines(file))):
+      if progress is not None:
+        progress.addEntries(1, file.buffer.tell)
+      yield certificate
+
+"""
+This function parses through each line of the text file that this script takes as user input
+and then prints out all the pertinent metadata (including hard-coded values stored as global
+variables) in the appropriate columns headers format to results.csv
+
+The file is streamed line by line, so both UNIX and DOS formatted files are accepted and the
+memory used does not grow with the size of the file.
+
+Parameters:
+---------------------
+f: string
+This is the file that runs under the assumption that the file is a regular file and then runs the parsing function to
+extract all pertinent metadata.
+
+Returns:
+---------------------
+None
+"""
+def parse(f):
+  if recordFileType(f) in decoded_file_types:
+    writeCertificates(readDecodedCertificates(f))
+    return
+
+  rows = []
+  for certificate in extractFileCertificates(f):
+    if current_statistics is not None:
+      current_statistics.entries += 1
+    row = createRow(certificate)
+    if row is not None:
+      rows.append(row)
+      recordChain(certificate)
+      # The rows are written in batches rather than one at a time
+      if len(rows) == write_batch_size:
+        writeRows(rows)
+        rows = []
+  writeRows(rows)
+
+"""
+This function parses through each line of the text file in the same way as parse() but returns the certificates
+instead of writing them to results.csv so that they can be handed back from a worker process or stored in the cache.
+
+Parameters:
+---------------------
+f: string
+This is the file that runs under the assumption that the file is a regular file and then runs the parsing function to
+extract all pertinent metadata.
+
+Returns:
+---------------------
+list
+This is the list of certificates in the order they were found in the file.
+"""
+def readCertificates(f):
+  if recordFileType(f) in decoded_file_types:
+    return readDecodedCertificates(f)
+  certificates = list(extractFileCertificates(f))
+  if current_statistics is not None:
+    current_statistics.entries += len(certificates)
+  return certificates
+
+"""
+This function determines the type of a file (see sniffFileType()) and records it in the run report.
+"""
+def recordFileType(f):
+  file_type = sniffFileType(f)
+  if current_statistics is not None:
+    current_statistics.file_type = file_type or "keytool"
+  return file_type
+
+"""
+This function counts the lines and the entries (by their alias) that go through it for the run report. The lines are
+handed over untouched when the counters are not collected.
+"""
+def countLines(lines):
+  statistics = current_statistics
+  if statistics is None:
+    return lines
+  return countLinesInto(lines, statistics)
+
+def countLinesInto(lines, statistics):
+  for line in lines:
+    statistics.lines += 1
+    if line.lstrip(line_indent).startswith(alias_comp_string):
+      statistics.aliases += 1
+    yield line
+
+"""
+This function reads the certificates straight out of a JKS, JCEKS or PKCS12 keystore or a PEM or DER certificate file
+(see certificate_reader.py) so that it does not have to be turned into a "keytool -list -v" data dump first. The
+certificates have the same metadata as the ones extracted from a data dump of the same keystore, except that the dates
+are in UTC. The certificates of a certificate file are named after their common name. A file that cannot be read (such
+as a keystore with a different password) is skipped.
+
+Parameters:
+---------------------
+f: string
+This is the path of the keystore or certificate file.
+
+Returns:
+---------------------
+list
+This is the list of certificates in the order they are in the file.
+"""
+def readDecodedCertificates(f):
+  global current_error
+  try:
+    entries = certificate_reader.readEntries(f, store_password)
+  except (certificate_reader.KeystoreError, IOError, OSError) as e:
+    logger.warning("Skipping " + f + ": " + str(e))
+    current_error = str(e)
+    if current_statistics is not None:
+      current_statistics.error = str(e)
+    return []
+
+  certificates = []
+  for entry in entries:
+    if entry.certificate is None:
+      # A secret key has no certificate, so it is only counted as an alias (like the secret keys of a data dump)
+      logger.debug("Skipping the secret key " + entry.alias + " of " + f)
+      continue
+    certificate = createDecodedCertificate(entry)
+    if checkForCompleteness(certificate):
+      certificates.append(certificate)
+  if current_statistics is not None:
+    current_statistics.aliases += len(entries)
+    current_statistics.entries += len(certificates)
+  return certificates
+
+"""
+This function creates a certificate out of an entry that was read with certificate_reader.py.
+"""
+def createDecodedCertificate(entry, host_name=''):
+  certificate = Certificate(host_name)
+  certificate.setField("alias", entry.alias)
+  certificate.setField("cert_type", entry.entry_type)
+  certificate.setField("owner", entry.certificate.subject)
+  certificate.setField("issuer", entry.certificate.issuer)
+  certificate.setField("serial_number", entry.certificate.serial_number)
+  certificate.setField("start_date", entry.certificate.not_before)
+  certificate.setField("expiration_date", entry.certificate.not_after)
+  certificate.setField("key_strength", formatKeyStrength(entry.certificate.signature_algorithm))
+  certificate.fingerprint = entry.certificate.getFingerprint()
+  certificate.chain = [[chain_certificate.subject, chain_certificate.issuer, chain_certificate.getFingerprint()] for chain_certificate in entry.chain]
+  return certificate
+
+"""
+This function writes the rows of the certificates (using the static columns that are currently set) into the results file.
+"""
+def writeCertificates(certificates):
+  rows = []
+  for certificate in certificates:
+    row = createRow(certificate)
+    if row is not None:
+      rows.append(row)
+      recordChain(certificate)
+  writeRows(rows)
+  if progress is not None:
+    progress.addEntries(len(certificates))
+
+"""
+This function adds a certificate that was written to the index of the chain report (when there is a chain report).
+The certificates are indexed by the file they were found in, so each file is taken as a keystore of its own.
+"""
+def recordChain(certificate):
+  if chains is not None:
+    chains.addCertificate(current_file, certificate.alias, certificate.owner, certificate.issuer, certificate.fingerprint)
+    # The other certificates of the chain of the entry are named after their position in it, as keytool numbers them
+    for number, (owner, issuer, fingerprint) in enumerate(certificate.chain, 2):
+      chains.addCertificate(current_file, certificate.alias + "[" + str(number) + "]", owner, issuer, fingerprint)
+
+"""
+This function loads the cache of the certificates that were extracted from each file during the previous runs. An empty
+cache is returned if there is no cache yet or if the cache was created by a different version of the parsing.
+
+Parameters:
+---------------------
+path: string
+This is the path of the cache.
+
+Returns:
+---------------------
+cache: dict
+This dictionary holds the version of the cache and maps the absolute path of each file to its size, modification time,
+SHA-256 hash and certificates.
+"""
+def loadCache(path):
+  cache = {"version" : cache_version, "files" : {}}
+  if os.path.isfile(path):
+    try:
+      with open(path, 'r') as file:
+        stored_cache = json.load(file)
+      if stored_cache.get("version") == cache_version:
+        cache = stored_cache
+    except ValueError:
+      logger.warning("The cache " + path + " could not be read so every file will be parsed")
+  return cache
+
+"""
+This function saves the cache. Files that no longer exist are removed from the cache first. The cache is written to a
+temporary file that then replaces the cache so that an interrupted run never leaves a partially written cache behind.
+"""
+def saveCache(path, cache):
+  files = cache["files"]
+  for file in list(files):
+    if not os.path.isfile(file):
+      del files[file]
+  temporary_path = path + ".tmp"
+  with open(temporary_path, 'w') as file:
+    json.dump(cache, file)
+  if hasattr(os, "replace"):
+    os.replace(temporary_path, path)
+  else:
+    os.rename(temporary_path, path)
+
+"""
+This function returns the SHA-256 hash of the contents of a file.
+"""
+def hashFile(f):
+  digest = hashlib.sha256()
+  with open(f, 'rb') as file:
+    block = file.read(hash_block_size)
+    while block:
+      digest.update(block)
+      block = file.read(hash_block_size)
+  return digest.hexdigest()
+
+"""
+This function looks up the certificates of a file in the cache. A file whose size and modification time are the same as
+in the cache is not read at all. Otherwise the file is hashed, so a file that was only touched (or copied over with the
+same contents) is still not parsed again.
 
+Parameters:
+---------------------
+cache: dict
+This is the cache that was loaded with loadCache().
+
+f: string
+This is the absolute path of the file.
+
+Returns:
+---------------------
+certificates: list
+This is the list of certificates from the cache or None if the file has to be parsed.
+
+entry: dict
+This is the size, modification time and hash of the file that should be stored with its certificates once it is parsed.
+"""
+def lookupCache(cache, f):
+  status = os.stat(f)
+  entry = {"size" : status.st_size, "mtime" : status.st_mtime}
+  cached_entry = cache["files"].get(f)
+  if cached_entry is not None and cached_entry["size"] == entry["size"] and cached_entry["mtime"] == entry["mtime"]:
+    return [Certificate.fromList(values) for values in cached_entry["certificates"]], cached_entry
+
+  entry["sha256"] = hashFile(f)
+  if cached_entry is not None and cached_entry["sha256"] == entry["sha256"]:
+    # Only the modification time changed so the cache is updated to skip the hash next time
+    cached_entry.update(entry)
+    return [Certificate.fromList(values) for values in cached_entry["certificates"]], cached_entry
+  return None, entry
+
+"""
+This function parses a single file. This function assumes that the file passed in will be a regular file.
+
+Parameters:
+---------------------
+file: string
+This is the file that runs under the assumption that the file is a regular file and then runs the parsing function to
+extract all pertinent metadata.
+
+Returns:
+---------------------
+None
+"""
+def parseFile(file):
+  parse(os.path.abspath(file))
+
+"""
+This function checks whether or not a name or relative path matches any of the glob patterns.
+"""
+def matchesPattern(name, relative_path, patterns):
+  for pattern in patterns:
+    if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern):
+      return True
+  return False
+
+"""
+This function reads the first bytes of a file to determine what kind of file it is so that binary files and text files
+that are not data dumps are skipped without being parsed.
+
+Parameters:
+---------------------
+f: string
+This is the path of the file.
+
+Returns:
+---------------------
+string
+This string is "keytool" for a "keytool -list -v" data dump, "jks" for a JKS or JCEKS keystore, "pkcs12" for a PKCS12
+keystore, "der" or "pem" for a certificate file and None for any other file.
+"""
+def sniffFileType(f):
+  try:
+    with open(f, 'rb') as file:
+      start = file.read(sniff_size)
+  except (IOError, OSError):
+    return None
+  # The binary files are recognized first and the text files are only taken as PEM files when they are not data dumps
+  # (as "keytool -list -rfc" prints the certificates in PEM)
+  file_type = certificate_reader.detectFileType(start)
+  if file_type is not None and file_type != "pem":
+    return file_type
+  if b"\0" in start:
+    return None
+  for marker in keytool_markers:
+    if marker in start:
+      return "keytool"
+  return file_type
+
+"""
+This function returns the File Type column of a file: the type of keystore or certificate file that it is or, for a
+data dump (or a file that cannot be read), the JKS keystore that it is taken to be the listing of.
+"""
+def getFileType(f):
+  file_type = sniffFileType(f)
+  if file_type in decoded_file_types:
+    with open(f, 'rb') as file:
+      file_type = certificate_reader.detectContainerType(file.read(sniff_size))
+  return file_type_dict.get(file_type, default_file_type)
+
+"""
+This function digs through the filesystem and returns every regular file that it finds. The directories are walked with
+os.scandir() using a stack instead of recursion (so that deep directories cannot hit the recursion limit), which lets the
+type of each entry come from the directory listing instead of extra calls to os.path.isdir() and os.path.isfile(). The
+entries of each directory are sorted by name so that the files are always returned in the same order.
+
+The walk is controlled by the following global variables:
+* include_patterns: only files whose name or path (relative to f) matches one of these glob patterns are returned
+* exclude_patterns: files and directories whose name or relative path matches one of these glob patterns are skipped
+* max_depth: the number of directory levels under f to go into (None for no limit)
+* sniff_files: only files that look like data dumps are returned (see sniffFileType())
+
+Parameters:
+---------------------
+f: string
+This is the file that will be checked as either a regular file or a directory and will be treated accordingly.
+
+Returns:
+---------------------
+file: string
+This generator yields the path of each regular file.
+"""
+def findFiles(f):
+  if not os.path.isdir(f):
+    if os.path.isfile(os.path.abspath(f)):
+      yield f
+    return
+
+  base_path = os.path.abspath(f)
+  visited_directories = set([(os.stat(base_path).st_dev, os.stat(base_path).st_ino)])
+  # Each item is an iterator over the sorted entries of a directory, its path relative to f and its depth
+  stack = [(iter(sorted(scandir(base_path), key=lambda entry: entry.name)), "", 0)]
+  while stack:
+    entries, relative_directory, depth = stack[-1]
+    entry = next(entries, None)
+    if entry is None:
+      stack.pop()
+      continue
+
+    relative_path = relative_directory + entry.name
+    if matchesPattern(entry.name, relative_path, exclude_patterns):
+      continue
+    if entry.is_dir():
+      if max_depth is not None and depth >= max_depth:
+        continue
+      # Symbolic links could otherwise lead back to a directory that is already being walked
+      status = entry.stat()
+      if (status.st_dev, status.st_ino) in visited_directories:
+        continue
+      visited_directories.add((status.st_dev, status.st_ino))
+      stack.append((iter(sorted(scandir(entry.path), key=lambda entry: entry.name)), relative_path + "/", depth + 1))
+    elif entry.is_file() and entry.name != manifest_file_name:
+      if include_patterns and not matchesPattern(entry.name, relative_path, include_patterns):
+        continue
+      if sniff_files and sniffFileType(entry.path) is None:
+        continue
+      yield base_path + '/' + relative_path
+
+"""
+This function finds every file to parse under the file or directory that was given and pairs each file with the
+keystore/truststore text file (or directory) that it was found under and the static columns that apply to it.
+
+Parameters:
+---------------------
+f: string
+This is the file that will be checked as either a regular file or a directory and will be treated accordingly.
+
+columns: dict
+This dictionary holds the static columns that apply to every file unless a manifest says otherwise.
+
+manifests: dict
+This dictionary caches the manifest of each directory.
+
+Returns:
+---------------------
+list
+This is the list of files to parse.
+"""
+def gatherFiles(f, columns, manifests):
+  root = os.path.abspath(f)
+  if not os.path.isdir(root):
+    root = os.path.dirname(root)
+  return [(file, cert_store, applyManifests(file, root, columns, manifests)) for file in findFiles(f)]
+
+"""
+This function is run in the worker processes to parse a single file.
+
+Parameters:
+---------------------
+file: string
+This is the file to parse.
+
+Returns:
+---------------------
+list
+This is the list of certificates that were extracted from the file.
+
+FileStatistics
+These are the counters of the file (None when they are not collected).
+
+string
+This is the error that the file could not be read because of (None when it was read).
+"""
+def parseWorker(file):
+  global current_statistics
+  global current_error
+  file = os.path.abspath(file)
+  current_error = None
+  if not collect_statistics:
+    return readCertificates(file), None, current_error
+  current_statistics = createStatistics(file)
+  start = time.time()
+  certificates = readCertificates(file)
+  current_statistics.parse_seconds = time.time() - start
+  statistics = current_statistics
+  current_statistics = None
+  return certificates, statistics, current_error
+
+"""
+This function is run in the worker processes to parse a chunk of a data dump (see splitDump()).
+
+Parameters:
+---------------------
+file: string
+This is the data dump.
+
+chunk: tuple
+This is the position of the start and end of the chunk and the host name it starts under.
+
+Returns:
+---------------------
+list
+This is the list of certificates that were extracted from the chunk.
+
+FileStatistics
+These are the counters of the chunk (None when they are not collected).
+
+None
+A chunk of a data dump has no error that keeps it from being read (see parseWorker()).
+"""
+def parseChunk(file, chunk):
+  global current_statistics
+  start, end, host_name = chunk
+  file = os.path.abspath(file)
+  encoding = locale.getpreferredencoding(False)
+  if collect_statistics:
+    current_statistics = FileStatistics(file)
+  parse_start = time.time()
+  with open(file, 'rb') as data_dump:
+    data_dump.seek(start)
+    buffer = data_dump.read(end - start)
+  if engine == "mmap":
+    countBufferLines(buffer)
+    certificates = list(extractBufferCertificates(buffer, encoding, host_name=host_name))
+  else:
+    certificates = list(extractCertificates(countLines(readLines(io.StringIO(buffer.decode(encoding), newline=''))), host_name))
+  statistics = current_statistics
+  current_statistics = None
+  if statistics is not None:
+    statistics.entries = len(certificates)
+    statistics.parse_seconds = time.time() - parse_start
+  return certificates, statistics, None
+
+"""
+This function is run in the worker processes to parse a whole file or a chunk of a data dump.
+"""
+def parseTask(task):
+  file, chunk = task
+  if chunk is None:
+    return parseWorker(file)
+  return parseChunk(file, chunk)
+
+"""
+This function collects the certificates (and the counters and error) of a file out of the results of its tasks, which
+come one after another in the order of the chunks of the file.
+"""
+def collectFile(parsed_tasks, count):
+  certificates, statistics, error = next(parsed_tasks)
+  for task in range(count - 1):
+    chunk_certificates, chunk_statistics, chunk_error = next(parsed_tasks)
+    certificates.extend(chunk_certificates)
+    error = error or chunk_error
+    if statistics is not None:
+      statistics.addChunk(chunk_statistics)
+  if statistics is not None and count > 1:
+    statistics.file_type = "keytool"
+    try:
+      statistics.bytes = os.path.getsize(statistics.file)
+    except OSError:
+      pass
+  return certificates, statistics, error
+
+"""
+This function creates the counters of a file for the run report.
+"""
+def createStatistics(file):
+  statistics = FileStatistics(file)
+  try:
+    statistics.bytes = os.path.getsize(file)
+  except OSError:
+    pass
+  return statistics
+
+"""
+This function gets ready to write the rows of a file. The static columns that apply to the file are set and, when there
+is an inventory, the occurrences of certificates that were recorded for the file during the previous runs are removed so
+that the inventory only has the certificates that are still in the file (the same goes for the rows that the watch mode
+keeps for the file). The file is recorded under its absolute path unless it is an endpoint of the TLS scanner, which is
+recorded as it is (host:port).
+"""
+def startFile(file, columns, statistics=None, endpoint=False):
+  global current_file
+  global current_file_type
+  global current_statistics
+  setStaticColumns(columns)
+  current_file = file if endpoint else os.path.abspath(file)
+  current_file_type = endpoint_file_type if endpoint else getFileType(current_file)
+  if inventory_connection is not None:
+    inventory.removeOccurrences(inventory_connection, current_file)
+  if watch_rows is not None:
+    watch_rows[current_file] = []
+    watch_text.pop(current_file, None)
+  # The counters of a file that was parsed in a worker process carry on being filled in while the file is written
+  current_statistics = statistics
+  if collect_statistics:
+    if current_statistics is None:
+      current_statistics = createStatistics(current_file)
+    file_statistics.append(current_statistics)
+
+"""
+This function sets the password of the keystores (used to set it in the worker processes).
+"""
+def setStorePassword(password):
+  global store_password
+  store_password = password
+
+"""
+This function sets up a worker process with the password of the keystores, whether or not the counters of each file
+are collected, the logging and the engine, as the workers do not have the global variables of main() when they are spawned.
+"""
+def initializeWorker(password, statistics, level, certificates, engine_name):
+  global collect_statistics
+  global log_certificates
+  global engine
+  setStorePassword(password)
+  engine = engine_name
+  collect_statistics = statistics
+  configureLogging(level)
+  log_certificates = certificates
+
+"""
+This function parses all of the files that are given to it. When more than one job is requested, the files are parsed in
+a pool of worker processes and the rows are written in the same order as the files were given so that the results are
+identical to parsing the files one after another. When a cache is given, only the files that changed since the cache
+was saved are parsed and the cache is updated with their certificates.
+
+Parameters:
+---------------------
+files: list
+This is the list of files to parse (see gatherFiles()).
+
+jobs: integer
+This is the number of worker processes to parse the files with.
+
+cache: dict
+This is the cache that was loaded with loadCache() or None to parse every file.
+
+Returns:
+---------------------
+None
+"""
+def parseFiles(files, jobs, cache=None):
+  global cert_store
+  # Large data dumps are split into chunks so that a single data dump can be parsed by more than one worker process
+  split_files = {}
+  if jobs > 1:
+    for file, store, columns in files:
+      chunks = splitDump(file)
+      if chunks is not None:
+        split_files[file] = chunks
+
+  if cache is None and not split_files and (jobs == 1 or len(files) <= 1):
+    # Every file is streamed straight into the results file
+    for file, cert_store, columns in files:
+      startFile(file, columns)
+      start = time.time()
+      parseFile(file)
+      if current_statistics is not None:
+        current_statistics.parse_seconds = time.time() - start - current_statistics.write_seconds
+      finishFile(file)
+    return
+
+  cached_files = []
+  for file, store, columns in files:
+    if cache is not None:
+      cached_files.append(lookupCache(cache, os.path.abspath(file)))
+    else:
+      cached_files.append((None, None))
+  changed_files = [job[0] for job, (certificates, entry) in zip(files, cached_files) if certificates is None]
+  tasks = []
+  for file in changed_files:
+    if file in split_files:
+      tasks.extend((file, chunk) for chunk in split_files[file])
+    else:
+      tasks.append((file, None))
+
+  pool = None
+  if jobs > 1 and len(tasks) > 1:
+    pool = multiprocessing.Pool(min(jobs, len(tasks)), initializeWorker, (store_password, collect_statistics, logger.level, log_certificates, engine))
+    # imap() hands back the certificates in the order of the files (and of the chunks of each file) while the later
+    # files are still being parsed
+    parsed_tasks = pool.imap(parseTask, tasks)
+  else:
+    parsed_tasks = (parseTask(task) for task in tasks)
+
+  try:
+    for (file, cert_store, columns), (certificates, entry) in zip(files, cached_files):
+      statistics = None
+      if certificates is None:
+        certificates, statistics, error = collectFile(parsed_tasks, len(split_files.get(file, [None])))
+        # A file that could not be read (such as a keystore with a different password) is read again on the next run
+        if cache is not None and error is None:
+          entry["certificates"] = [certificate.toList() for certificate in certificates]
+          cache["files"][os.path.abspath(file)] = entry
+        elif cache is not None:
+          cache["files"].pop(os.path.abspath(file), None)
+      startFile(file, columns, statistics)
+      if current_statistics is not None and statistics is None:
+        current_statistics.cached = True
+        current_statistics.entries = len(certificates)
+      writeCertificates(certificates)
+      finishFile(file)
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+
+"""
+This function marks a file as done in the progress of the run.
+"""
+def finishFile(file):
+  if progress is not None:
+    try:
+      progress.finishFile(os.path.getsize(file))
+    except OSError:
+      progress.finishFile(0)
+
+"""
+This function reads the list of keystores of the collector mode. The list is a CSV file with a keystore column (the path
+of each keystore, relative to the directory of the list) and an optional storepass_env column (the environment variable
+that holds the password of the keystore, which defaults to the password of --storepass-env).
+
+Parameters:
+---------------------
+path: string
+This is the path of the list.
+
+Returns:
+---------------------
+list
+This is the list of the absolute path and the password (None when there is none) of each keystore in the order of the list.
+"""
+def readCollectList(path):
+  directory = os.path.dirname(os.path.abspath(path))
+  keystores = []
+  with io.open(path, 'r', newline='') as file:
+    reader = csv.DictReader(file)
+    if collect_columns[0] not in (reader.fieldnames or []):
+      raise ValueError('There is no ' + collect_columns[0] + ' column in "' + path + '"')
+    for row in reader:
+      keystore = (row.get(collect_columns[0]) or "").strip()
+      if keystore == "":
+        continue
+      variable = (row.get(collect_columns[1]) or "").strip()
+      if variable == "":
+        password = store_password
+      elif variable in os.environ:
+        password = os.environ[variable]
+      else:
+        raise ValueError('The environment variable ' + variable + ' of "' + keystore + '" is not set')
+      keystores.append((os.path.join(directory, keystore), password))
+  return keystores
+
+"""
+This function runs "keytool -list -v" on a keystore and streams its output straight into the parser, so the data dump is
+never written to a file. This is run in the threads of the collector mode (each thread waits on its own keytool process).
+
+Parameters:
+---------------------
+job: tuple
+This is the path and the password (None when there is none) of the keystore.
+
+Returns:
+---------------------
+list
+This is the list of certificates in the order keytool listed them (empty when keytool failed).
+
+FileStatistics
+These are the counters of the keystore (None when they are not collected).
+"""
+def collectKeystore(job):
+  keystore, password = job
+  statistics = None
+  if collect_statistics:
+    statistics = createStatistics(keystore)
+    statistics.file_type = "keytool"
+  start = time.time()
+  arguments = [keytool_command, "-list", "-v", "-keystore", keystore]
+  environment = None
+  if password is not None:
+    arguments += ["-storepass:env", password_variable]
+    environment = dict(os.environ)
+    environment[password_variable] = password
+
+  errors = []
+  def recordErrors(lines):
+    for line in lines:
+      if line.startswith(keytool_error_prefix):
+        errors.append(line)
+      yield line
+
+  try:
+    # keytool prints its errors to stdout, so stderr is merged into it and nothing is ever left waiting in a second pipe.
+    # The input is closed so that keytool cannot wait for a password to be typed in.
+    process = subprocess.Popen(arguments, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=environment)
+  except OSError as e:
+    errors.append(str(e))
+  else:
+    with process.stdout:
+      lines = recordErrors(readLines(io.TextIOWrapper(process.stdout, encoding=locale.getpreferredencoding(False), newline='')))
+      if statistics is not None:
+        lines = countLinesInto(lines, statistics)
+      certificates = list(extractCertificates(lines))
+    if process.wait() != 0 and not errors:
+      errors.append("keytool exited with " + str(process.returncode))
+
+  if errors:
+    logger.warning("Skipping " + keystore + ": " + errors[-1])
+    certificates = []
+    if statistics is not None:
+      statistics.error = errors[-1]
+  if statistics is not None:
+    statistics.entries = len(certificates)
+    statistics.parse_seconds = time.time() - start
+  return certificates, statistics
+
+"""
+This function runs "keytool -list -v" on every keystore that is given to it and writes the rows of their certificates.
+When more than one job is requested, that many keytool processes run at the same time (so the start up of their JVMs
+overlaps) and the rows are written in the same order as the keystores were given.
+
+Parameters:
+---------------------
+files: list
+This is the list of keystores (in the same form as gatherFiles()).
+
+passwords: list
+This is the password of each keystore (None when there is none).
+
+jobs: integer
+This is the number of keytool processes to run at the same time.
+
+Returns:
+---------------------
+None
+"""
+def collectFiles(files, passwords, jobs):
+  global cert_store
+  keystores = [(file, password) for (file, store, columns), password in zip(files, passwords)]
+  pool = None
+  if jobs > 1 and len(keystores) > 1:
+    # keytool does the work in its own processes, so threads are enough to wait on them
+    pool = ThreadPool(min(jobs, len(keystores)))
+    collected = pool.imap(collectKeystore, keystores)
+  else:
+    collected = (collectKeystore(keystore) for keystore in keystores)
+
+  try:
+    for (file, cert_store, columns), (certificates, statistics) in zip(files, collected):
+      startFile(file, columns, statistics)
+      writeCertificates(certificates)
+      finishFile(file)
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+
+"""
+This function turns the chain that an endpoint presented to the TLS scanner into certificates under the host name of the
+endpoint. The certificate of the endpoint is a key pair (the endpoint holds its private key) and the rest of the chain
+are trusted certificates. The certificates are named after their common name (or the endpoint when they have none).
+
+Parameters:
+---------------------
+result: tls_scanner.ScanResult
+This is the result of the scan of the endpoint.
+
+Returns:
+---------------------
+list
+This is the list of certificates in the order the endpoint presented them.
+"""
+def createScanCertificates(result):
+  endpoint = result.getEndpoint()
+  certificates = []
+  for position, der in enumerate(result.chain):
+    try:
+      x509_certificate = certificate_reader.parseCertificate(der)
+    except certificate_reader.KeystoreError as e:
+      logger.warning("Skipping certificate " + str(position + 1) + " of " + endpoint + ": " + str(e))
+      continue
+    entry_type = private_key_type if position == 0 else public_key_type
+    entry = certificate_reader.KeystoreEntry(x509_certificate.common_name or endpoint, entry_type, x509_certificate)
+    certificate = createDecodedCertificate(entry, result.host)
+    if checkForCompleteness(certificate):
+      certificates.append(certificate)
+  return certificates
+
+"""
+This function scans every endpoint that is given to it with the TLS scanner (see tls_scanner.py) and writes the rows of
+the chains that they presented, with the host name of each endpoint in the Host Name/IP column. The rows are written in
+the order of the endpoints while the later endpoints are still being scanned. An endpoint that cannot be scanned is
+skipped with a warning.
+
+Parameters:
+---------------------
+files: list
+This is the list of endpoints (in the same form as gatherFiles(), each endpoint being host:port).
+
+concurrency: integer
+This is the number of endpoints that are scanned at the same time.
+
+timeout: float
+This is the number of seconds that each endpoint is given.
+
+Returns:
+---------------------
+None
+"""
+def scanFiles(files, concurrency, timeout):
+  endpoints = [tls_scanner.parseEndpoint(file) for file, store, columns in files]
+  results = iter(files)
+
+  def writeScan(result):
+    global cert_store
+    file, cert_store, columns = next(results)
+    statistics = None
+    if collect_statistics:
+      statistics = FileStatistics(file)
+      statistics.file_type = "tls"
+      statistics.aliases = len(result.chain)
+      statistics.parse_seconds = result.seconds
+      statistics.error = result.error
+    if result.error is not None:
+      logger.warning("Skipping " + file + ": " + result.error)
+    certificates = createScanCertificates(result)
+    if statistics is not None:
+      statistics.entries = len(certificates)
+    startFile(file, columns, statistics, endpoint=True)
+    writeCertificates(certificates)
+    finishFile(file)
+
+  tls_scanner.scanAll(endpoints, writeScan, concurrency, timeout)
+
+"""
+This is the replacement to runSingleArgumentParsing() whereby this function recursively digs through the filesystem until it reaches
+a directory that has only files in it and only parses files. This removes the restriction of only searching 1-level deep into a
+filesystem.
+
+Parameters:
+---------------------
+f: string
+This is the file that will be checked as either a regular file or a directory and will be treated accordingly
+to recursively parse through all available files.
+
+jobs: integer
+This is the number of worker processes to parse the files with.
+
+cache: dict
+This is the cache that was loaded with loadCache() or None to parse every file.
+
+Returns:
+---------------------
+None
+"""
+def recursiveParsing(f, jobs=1, cache=None):
+  parseFiles(gatherFiles(f, getStaticColumns(), {}), jobs, cache)
+
+"""
+This function finds the file or directory of the arguments that a path is under.
+
+Parameters:
+---------------------
+path: string
+This is the absolute path of a file or directory.
+
+stores: list
+This is the list of the files and directories that were given to the program.
+
+Returns:
+---------------------
+position: integer
+This is the position of the file or directory that the path is under in the list (None when it is under none of them).
+
+parts: tuple
+This is the path relative to that file or directory, one directory at a time (empty for the file or directory itself).
+"""
+def getWatchedPath(path, stores):
+  for position, store in enumerate(stores):
+    root = os.path.abspath(store)
+    if path == root:
+      return position, ()
+    prefix = os.path.join(root, '')
+    if path.startswith(prefix):
+      return position, tuple(path[len(prefix):].split(os.sep))
+  return None, None
+
+"""
+This function checks whether or not a path (relative to a directory that was given to the program) is skipped by the
+exclude patterns, which apply to the name and relative path of every directory on the way to it as in findFiles().
+"""
+def isExcludedPath(parts):
+  for position in range(len(parts)):
+    if matchesPattern(parts[position], "/".join(parts[:position + 1]), exclude_patterns):
+      return True
+  return False
+
+"""
+This function checks whether or not the watch mode leaves a directory out, which is the case for the directories that
+findFiles() does not go into.
+"""
+def isSkippedDirectory(directory, stores):
+  position, parts = getWatchedPath(directory, stores)
+  if position is None:
+    return False
+  return isExcludedPath(parts) or (max_depth is not None and len(parts) > max_depth)
+
+"""
+This function checks whether or not a file that the watch mode was told about is one that findFiles() would have
+returned (see findFiles() for the global variables that control this).
+
+Parameters:
+---------------------
+file: string
+This is the absolute path of the file.
+
+parts: tuple
+This is the path of the file relative to the file or directory that it is under (see getWatchedPath()).
+
+Returns:
+---------------------
+boolean
+This is whether or not the file is parsed.
+"""
+def isWatchedFile(file, parts):
+  if not os.path.isfile(file):
+    return False
+  if not parts:
+    # The file was given to the program itself
+    return True
+  if parts[-1] == manifest_file_name or isExcludedPath(parts):
+    return False
+  if max_depth is not None and len(parts) - 1 > max_depth:
+    return False
+  if include_patterns and not matchesPattern(parts[-1], "/".join(parts), include_patterns):
+    return False
+  return not sniff_files or sniffFileType(file) is not None
+
+"""
+This function returns rows in the CSV format of the results file.
+"""
+def formatRows(rows):
+  text = io.StringIO()
+  csv.writer(text, lineterminator='\n').writerows(rows)
+  return text.getvalue()
+
+"""
+This function writes the results file out of the rows that the watch mode keeps for each file. The files are written in
+the order that findFiles() goes through them (by their file or directory in the arguments and then by their path, one
+directory at a time) so that the results file is the same as the one a full run would write. Only the rows of the files
+that were parsed since the last time are formatted (see watch_text); the rest are written as they were formatted then.
+The results file is written to a temporary file that then replaces it so that it is never seen partially written.
+"""
+def writeWatchedResults(stores):
+  temporary_path = "results.csv.tmp"
+  with open(temporary_path, 'w', newline='') as file:
+    file.write(formatRows([results_columns + epoch_column_names if epoch_columns else results_columns]))
+    for watched_file in sorted(watch_rows, key=lambda watched_file: getWatchedPath(watched_file, stores)):
+      text = watch_text.get(watched_file)
+      if text is None:
+        text = watch_text[watched_file] = formatRows(watch_rows[watched_file])
+      file.write(text)
+  os.replace(temporary_path, "results.csv")
+
+"""
+This function removes everything that was recorded for a file that is gone: its occurrences in the inventory (and the
+certificates that were only found in it), its rows in the results file and its certificates in the chain report.
+"""
+def forgetFile(file, watched):
+  del watched[file]
+  if inventory_connection is not None:
+    inventory.removeFile(inventory_connection, file)
+  if watch_rows is not None:
+    watch_rows.pop(file, None)
+    watch_text.pop(file, None)
+  if chains is not None:
+    chains.clearStore(file)
+
+"""
+This function brings the output up to date with the files that changed: the files that were created or changed are
+parsed again (and only those files) and the files that were removed are forgotten. A change to a manifest applies to
+every file under its directory, so those files are parsed again with the new static columns.
+
+Parameters:
+---------------------
+changed: set
+This is the set of the absolute paths of the files that were created or changed.
+
+removed: set
+This is the set of the absolute paths of the files and directories that were removed.
+
+watched: dict
+This dictionary maps the absolute path of every file that is in the output to the file or directory of the arguments
+that it was found under.
+
+stores: list
+This is the list of the files and directories that were given to the program.
+
+columns: dict
+This dictionary holds the static columns that apply to every file unless a manifest says otherwise.
+
+manifests: dict
+This dictionary caches the manifest of each directory.
+
+jobs: integer
+This is the number of worker processes to parse the files with.
+
+cache: dict
+This is the cache that was loaded with loadCache() or None when there is no cache.
+
+Returns:
+---------------------
+updated: integer
+This is the number of files that were parsed again.
+
+forgotten: integer
+This is the number of files that were removed from the output.
+"""
+def updateWatchedFiles(changed, removed, watched, stores, columns, manifests, jobs, cache):
+  changed = set(changed)
+  for path in list(changed) + list(removed):
+    if os.path.basename(path) == manifest_file_name:
+      directory = os.path.dirname(path)
+      manifests.pop(directory, None)
+      prefix = os.path.join(directory, '')
+      changed.update(file for file in watched if file.startswith(prefix))
+
+  forgotten = 0
+  for path in removed:
+    prefix = os.path.join(path, '')
+    for file in [file for file in watched if file == path or file.startswith(prefix)]:
+      if not os.path.isfile(file):
+        forgetFile(file, watched)
+        forgotten += 1
+
+  files = []
+  for file in changed:
+    position, parts = getWatchedPath(file, stores)
+    if position is None:
+      continue
+    if not isWatchedFile(file, parts):
+      if file in watched:
+        forgetFile(file, watched)
+        forgotten += 1
+      continue
+    store = stores[position]
+    root = os.path.abspath(store)
+    if not os.path.isdir(root):
+      root = os.path.dirname(root)
+    try:
+      file_columns = applyManifests(file, root, columns, manifests)
+    except ValueError as e:
+      logger.error("Skipping " + file + ": " + str(e))
+      continue
+    missing = [name for name in static_column_names if name not in file_columns]
+    if missing:
+      logger.error("Skipping " + file + ": the following static columns were not provided: " + ", ".join(missing))
+      continue
+    watched[file] = store
+    if chains is not None:
+      chains.clearStore(file)
+    files.append(((position, parts), (file, store, file_columns)))
+
+  parseFiles([job for key, job in sorted(files)], jobs, cache)
+  if inventory_connection is not None and files:
+    # The certificates that are no longer in the files that were parsed again are removed once the files were recorded
+    inventory.removeUnusedCertificates(inventory_connection)
+  return len(files), forgotten
+
+"""
+This function is the watch mode: once every file was parsed, it waits for files to be created, changed or removed under
+the files and directories that were given to the program and only parses those files again, so that the results file
+(or the inventory), the chain report and the cache stay up to date without parsing every file again. The changes come
+from inotify where it is available and from polling the directories otherwise (see file_watcher.py). The watch mode runs
+until it is stopped with Ctrl+C.
+
+Parameters:
+---------------------
+watcher: InotifyWatcher or PollingWatcher
+This is the watcher of the files and directories, which was created before the files were first parsed so that no
+change is missed in between.
+
+stores: list
+This is the list of the files and directories that were given to the program.
+
+files: list
+This is the list of the files that were first parsed (see gatherFiles()).
+
+columns: dict
+This dictionary holds the static columns that apply to every file unless a manifest says otherwise.
+
+manifests: dict
+This dictionary caches the manifest of each directory.
+
+jobs: integer
+This is the number of worker processes to parse the files with.
+
+cache: dict
+This is the cache that was loaded with loadCache() or None when there is no cache.
+
+cache_path: string
+This is the path of the cache.
+
+chain_report: string
+This is the path of the chain report (None when there is no chain report).
+
+Returns:
+---------------------
+None
+"""
+def watchFiles(watcher, stores, files, columns, manifests, jobs, cache, cache_path, chain_report):
+  global cert_store
+  watched = dict((os.path.abspath(file), store) for file, store, file_columns in files)
+  logger.info("Watching " + ", ".join(stores) + " for changes with " + watcher.method + " (Ctrl+C to stop)")
+  try:
+    while True:
+      changed, removed, rescan = watcher.waitForChanges()
+      start = time.time()
+      if rescan:
+        # Changes were lost so every file is looked at again (the cache keeps the files that did not change from being parsed)
+        manifests.clear()
+        changed = set()
+        for cert_store in stores:
+          changed.update(os.path.abspath(file) for file in findFiles(cert_store))
+        removed = set(file for file in watched if file not in changed)
+      try:
+        updated, forgotten = updateWatchedFiles(changed, removed, watched, stores, columns, manifests, jobs, cache)
+      except (IOError, OSError) as e:
+        # A file can be removed between the change and the parsing, which is caught up with at the next change
+        logger.warning("The changes could not be parsed: " + str(e))
+        continue
+      if updated == 0 and forgotten == 0:
+        continue
+      if watch_rows is not None:
+        writeWatchedResults(stores)
+      if chains is not None:
+        chains.writeReport(chain_report)
+      if cache is not None:
+        saveCache(cache_path, cache)
+      logger.info("Parsed {:,} changed files and removed {:,} files in {:.2f}s".format(updated, forgotten, time.time() - start))
+  finally:
+    watcher.close()
+
+"""
+This function reads the arguments that were passed to the program.
+"""
+def parseArguments(argv):
+  parser = argparse.ArgumentParser(description='Extracts the metadata of a "keytool -list -v" data dump into results.csv.')
+  parser.add_argument('files', nargs='*', help='The data dump file(s), keystores (JKS/JCEKS/PKCS12), certificate files (PEM/DER) or directories of them to parse')
+  parser.add_argument('-j', '--jobs', type=int, default=1, help='The number of worker processes to parse the files with (default: 1)')
+  parser.add_argument('--include', action='append', default=[], metavar='PATTERN', help='Only parses the files in directories whose name or relative path matches the glob pattern (can be repeated)')
+  parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN', help='Skips the files and directories whose name or relative path matches the glob pattern (can be repeated)')
+  parser.add_argument('--max-depth', type=int, help='The number of directory levels to go into under each directory (default: no limit)')
+  parser.add_argument('--no-sniff', dest='sniff', action='store_false', help='Parses every file in directories instead of only the files that look like data dumps')
+  parser.add_argument('--cache', action='store_true', help='Only parses the files that changed since the last run by keeping the certificates of each file in a cache')
+  parser.add_argument('--cache-file', default=cache_file_name, help='The cache to use with --cache (default: ' + cache_file_name + ')')
+  parser.add_argument('--storepass-env', metavar='VARIABLE', help='The environment variable that holds the password of the JKS/JCEKS/PKCS12 keystores')
+  parser.add_argument('--collect', metavar='LIST', help='Runs "keytool -list -v" on every keystore of the CSV list (keystore, storepass_env) and parses its output directly instead of parsing files (--jobs keytool processes at a time)')
+  parser.add_argument('--keytool', default=keytool_command, help='The keytool command to run with --collect (default: keytool)')
+  parser.add_argument('--scan', metavar='LIST', help='Scans the TLS endpoints (host:port, one on each line) of the list and parses the certificate chains that they present instead of parsing files')
+  parser.add_argument('--concurrency', type=int, default=tls_scanner.default_concurrency, help='The number of endpoints that are scanned at the same time with --scan (default: ' + str(tls_scanner.default_concurrency) + ')')
+  parser.add_argument('--timeout', type=float, default=tls_scanner.default_timeout, help='The number of seconds that each endpoint is given to connect and finish the TLS handshake with --scan (default: ' + str(int(tls_scanner.default_timeout)) + ')')
+  parser.add_argument('--watch', action='store_true', help='Keeps running after the files are parsed and only parses the files that are created or changed again (with inotify where available and polling otherwise) to keep the output up to date')
+  parser.add_argument('--interval', type=float, default=file_watcher.default_interval, help='With --watch, the number of seconds between polls or, with inotify, the number of seconds without changes to wait for before parsing (default: ' + str(int(file_watcher.default_interval)) + ')')
+  parser.add_argument('--poll', action='store_true', help='With --watch, polls the directories even where inotify is available (such as for network filesystems)')
+  parser.add_argument('--chunk-size', type=int, default=chunk_size // (1024 * 1024), metavar='MB', help='With --jobs, splits the data dumps that are larger than this into chunks of about this size so that they are parsed by more than one worker process (default: ' + str(chunk_size // (1024 * 1024)) + ')')
+  parser.add_argument('--engine', choices=['lines', 'mmap'], default='lines', help='How the data dumps are read: one line at a time (lines) or memory-mapped with only the lines that hold metadata decoded (mmap) (default: lines)')
+  parser.add_argument('--date-format', choices=['excel', 'iso'], default='excel', help='The format of the creation and expiration dates: M/DD/YYYY (excel) or ISO-8601 (iso) (default: excel)')
+  parser.add_argument('--epoch-columns', action='store_true', help='Also writes the creation and expiration dates as seconds since the epoch in two columns at the end')
+  parser.add_argument('--sqlite', metavar='DATABASE', help='Merges the certificates into a SQLite inventory (see inventory.py) instead of writing results.csv')
+  parser.add_argument('--chain-report', metavar='FILE', help='Writes whether or not the certificates of each file chain up to a root in the same file to a CSV file')
+  parser.add_argument('--run-report', metavar='FILE', help='Writes the counters and timings of the run, of each stage and of each file to a JSON file')
+  parser.add_argument('--profile', metavar='FILE', help='Profiles the parsing with cProfile and saves the statistics to the file (readable with pstats)')
+  verbosity = parser.add_mutually_exclusive_group()
+  verbosity.add_argument('-q', '--quiet', action='store_true', help='Only shows warnings and errors (no progress or summary)')
+  verbosity.add_argument('-v', '--verbose', action='store_true', help='Also shows every certificate as it is extracted')
+  parser.add_argument('--no-progress', dest='progress', action='store_false', help='Does not show the progress while the files are parsed')
+  parser.add_argument('--config', help='A config file with a [' + static_columns_section + '] section that provides the static columns')
+  parser.add_argument('--location', help='The physical location that the certificate(s) will be at')
+  parser.add_argument('--product', help='The product that will make use of the certificate(s)')
+  parser.add_argument('--product-component', help='The component corresponding to the product that will make use of the certificate(s)')
+  parser.add_argument('--received-on', help='The day (format: M/D/YYYY) that the certificate(s) was/were provided')
+  parser.add_argument('--received-from', help='The person/group who provided the certificate(s)')
+  parser.add_argument('--host-names', dest='host_names', action='store_const', const=True, help='There are host names in the files that can be used')
+  parser.add_argument('--no-host-names', dest='host_names', action='store_const', const=False, help='There are no host names in the files')
+  parser.add_argument('--batch', action='store_true', help='Never prompt for input (every static column must come from the arguments, the config file or a manifest)')
+  args = parser.parse_args(argv)
+  if args.jobs < 1:
+    parser.error("the number of jobs must be at least 1")
+  if args.max_depth is not None and args.max_depth < 0:
+    parser.error("the maximum depth cannot be negative")
+  if args.chunk_size < 1:
+    parser.error("the chunk size must be at least 1 MB")
+  if args.collect is not None and args.scan is not None:
+    parser.error("--collect and --scan cannot be used together")
+  for mode, value in (("--collect", args.collect), ("--scan", args.scan)):
+    if value is not None and len(args.files) > 0:
+      parser.error("the files to parse cannot be provided with " + mode)
+    if value is not None and args.cache:
+      parser.error("--cache cannot be used with " + mode)
+    if value is not None and args.watch:
+      parser.error("--watch cannot be used with " + mode)
+  if args.interval <= 0:
+    parser.error("the interval must be more than 0 seconds")
+  if args.concurrency < 1:
+    parser.error("the concurrency must be at least 1")
+  if args.timeout <= 0:
+    parser.error("the timeout must be more than 0 seconds")
+  if args.batch and len(args.files) == 0 and args.collect is None and args.scan is None:
+    parser.error("the file(s) to parse must be provided in batch mode")
+  if args.storepass_env is not None and args.storepass_env not in os.environ:
+    parser.error("the environment variable " + args.storepass_env + " is not set")
+  return args
+
+"""
+This function returns the static columns that were provided as arguments.
+"""
+def getArgumentColumns(args):
+  columns = {}
+  for name in static_column_names:
+    if getattr(args, name) is not None:
+      columns[name] = getattr(args, name)
+  return columns
+
+def main(argv):
+  global cert_store
+  global include_patterns
+  global exclude_patterns
+  global max_depth
+  global sniff_files
+  global date_format
+  global epoch_columns
+  global inventory_connection
+  global chains
+  global collect_statistics
+  global log_certificates
+  global progress
+  global engine
+  global chunk_size
+  global keytool_command
+  global watch_rows
+
+  started = datetime.datetime.now()
+  start = time.time()
+  args = parseArguments(argv)
+  collect_statistics = args.run_report is not None
+  if args.quiet:
+    configureLogging(logging.WARNING)
+  elif args.verbose:
+    configureLogging(logging.DEBUG)
+  else:
+    configureLogging(logging.INFO)
+  log_certificates = args.verbose
+  date_format = args.date_format
+  engine = args.engine
+  chunk_size = args.chunk_size * 1024 * 1024
+  epoch_columns = args.epoch_columns
+  include_patterns = args.include
+  exclude_patterns = args.exclude
+  max_depth = args.max_depth
+  sniff_files = args.sniff
+  keytool_command = args.keytool
+  if args.storepass_env is not None:
+    setStorePassword(os.environ[args.storepass_env])
+
+  # The arguments take precedence over the config file and the manifests take precedence over both
+  try:
+    columns = {}
+    if args.config:
+      columns = readStaticColumns(args.config)
+    columns.update(validateStaticColumns(getArgumentColumns(args), "the arguments"))
+  except ValueError as e:
+    sys.exit("\n" + str(e) + "\n")
+
+  if args.batch:
+    columns.setdefault("host_names", False)
+  else:
+    setStaticColumns(columns)
+    defineGlobalVariables("host_names" not in columns)
+    columns = getStaticColumns()
+
+  keystores = None
+  endpoints = None
+  if args.collect is not None:
+    try:
+      keystores = readCollectList(args.collect)
+    except (ValueError, IOError, OSError) as e:
+      sys.exit("\n" + str(e) + "\n")
+    stores = []
+  elif args.scan is not None:
+    try:
+      endpoints = tls_scanner.readEndpoints(args.scan)
+    except (ValueError, IOError, OSError) as e:
+      sys.exit("\n" + str(e) + "\n")
+    stores = []
   # No input parameter`
-  if len(argv) == 0:
+  elif len(args.files) == 0:
     updateFileName()
-    recursiveParsing(cert_store)
+    stores = [cert_store]
   # One or more input parameter but only the first input parameter is taken
-  elif len(argv) == 1:
-    cert_store = argv[0]
-    recursiveParsing(cert_store)
-  elif len(argv) > 1:
+  elif len(args.files) == 1:
+    stores = [args.files[0]]
+  elif len(args.files) > 1:
     # This assumes that things will only happen from the current level downward
     full_path = os.path.abspath(cert_store)
-    for file in argv:
-      cert_store = full_path + '/' + file
-      recursiveParsing(cert_store)
-  results.close()
+    stores = [full_path + '/' + file for file in args.files]
+
+  # All of the files are gathered first so that a single pool of workers can be used for all of them
+  stage_seconds = {}
+  stage_start = time.time()
+  files = []
+  manifests = {}
+  try:
+    for cert_store in stores:
+      files.extend(gatherFiles(cert_store, columns, manifests))
+    if keystores is not None:
+      # Each keystore is taken as a file of its own, with the manifests of its directory
+      files = [(keystore, keystore, applyManifests(keystore, os.path.dirname(keystore), columns, manifests)) for keystore, password in keystores]
+    if endpoints is not None:
+      # The host name of each endpoint always fills in the Host Name/IP column
+      endpoint_columns = dict(columns, host_names=True)
+      files = [(tls_scanner.formatEndpoint(host, port), tls_scanner.formatEndpoint(host, port), endpoint_columns) for host, port in endpoints]
+  except ValueError as e:
+    sys.exit("\n" + str(e) + "\n")
+  stage_seconds["gather"] = time.time() - stage_start
+
+  for file, store, file_columns in files:
+    missing = [name for name in static_column_names if name not in file_columns]
+    if missing:
+      sys.exit('\nThe following static columns were not provided for "' + file + '": ' + ', '.join(missing) + '\n')
+
+  cache = None
+  if args.cache:
+    cache = loadCache(args.cache_file)
+
+  if args.chain_report:
+    chains = chain_index.ChainIndex()
+
+  # The watcher is created before the files are parsed so that the changes made while they are parsed are not missed
+  watcher = None
+  if args.watch:
+    watcher = file_watcher.createWatcher([os.path.abspath(store) for store in stores], args.interval, \
+                                         lambda directory: isSkippedDirectory(directory, stores), args.poll)
+
+  if args.sqlite:
+    # The inventory always keeps the epoch columns as they are what the expiration index is built on
+    epoch_columns = True
+    inventory_connection = inventory.openInventory(args.sqlite)
+  elif watcher is not None:
+    # The rows of each file are kept so that the rows of a file that changes can be replaced in the results file
+    watch_rows = {}
+  else:
+    openResultsFile()
+
+  progress = ProgressReporter([file for file, store, file_columns in files], display=args.progress and not args.quiet)
+  if keystores is not None:
+    parse_call = (collectFiles, files, [password for keystore, password in keystores], args.jobs)
+  elif endpoints is not None:
+    parse_call = (scanFiles, files, args.concurrency, args.timeout)
+  else:
+    parse_call = (parseFiles, files, args.jobs, cache)
+  stage_start = time.time()
+  if args.profile:
+    # Only the parsing and writing is profiled (the worker processes are not profiled when there are jobs)
+    profiler = cProfile.Profile()
+    profiler.runcall(*parse_call)
+    profiler.dump_stats(args.profile)
+  else:
+    parse_call[0](*parse_call[1:])
+  stage_seconds["parse_and_write"] = time.time() - stage_start
+  progress.clearLine()
+  elapsed = progress.getElapsed()
+  logger.info("Extracted {:,} entries from {:,} files in {:.2f}s ({:,.0f} entries/s)".format(progress.entries, progress.files_done, elapsed, progress.entries / max(elapsed, 1e-9)))
+  progress = None
+
+  if watch_rows is not None:
+    writeWatchedResults(stores)
+  elif inventory_connection is None:
+    results.close()
+  else:
+    # Now that every file was recorded again, the certificates that are no longer in any file are removed
+    logger.info("Removed {:,} certificates that are no longer found from the inventory".format(inventory.removeUnusedCertificates(inventory_connection)))
+
+  stage_start = time.time()
+  if chains is not None:
+    chains.writeReport(args.chain_report)
+  if cache is not None:
+    saveCache(args.cache_file, cache)
+  stage_seconds["reports_and_cache"] = time.time() - stage_start
+
+  if args.run_report:
+    writeRunReport(args.run_report, started, time.time() - start, args.jobs, stage_seconds)
+
+  if watcher is not None:
+    # The run report only covers the first parsing of the files
+    collect_statistics = False
+    watchFiles(watcher, stores, files, columns, manifests, args.jobs, cache, args.cache_file, args.chain_report)
+
+  if inventory_connection is not None:
+    inventory_connection.close()
+    inventory_connection = None
+
+"""
+This function writes the run report: a JSON file with the counters and timings of the run as a whole, of each stage and
+of each file.
+
+Parameters:
+---------------------
+path: string
+This is the path of the run report.
+
+started: datetime
+This is when the run started.
+
+seconds: float
+This is how long the run took.
+
+jobs: integer
+This is the number of worker processes the files were parsed with.
+
+stage_seconds: dict
+This dictionary maps each stage of the run to how long it took.
+
+Returns:
+---------------------
+None
+"""
+def writeRunReport(path, started, seconds, jobs, stage_seconds):
+  files = [statistics.toDict() for statistics in file_statistics]
+  totals = {"files" : len(files)}
+  for name in ("bytes", "lines", "entries", "dropped", "rows", "parse_seconds", "write_seconds"):
+    totals[name] = sum(statistics[name] for statistics in files)
+  totals["cached_files"] = sum(1 for statistics in files if statistics["cached"])
+  totals["failed_files"] = sum(1 for statistics in files if statistics["error"] is not None)
+  # The parse time is the sum over the files, which is more than the time it took when the files were parsed in parallel
+  stages = dict((name, round(value, 6)) for name, value in stage_seconds.items())
+  stages["parse"] = round(totals["parse_seconds"], 6)
+  stages["write"] = round(totals["write_seconds"], 6)
+  report = {"started" : started.isoformat(), "seconds" : round(seconds, 6), "jobs" : jobs, "stages" : stages, "totals" : totals, "files" : files}
+  with open(path, 'w') as file:
+    json.dump(report, file, indent=2, sort_keys=True)
 
 if __name__ == '__main__':
   # Starting the main function
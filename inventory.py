@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+
+import sys
+import os
+import csv
+import time
+import sqlite3
+import argparse
+
+"""
+The aim of this file is to keep the certificates found by generate_results.py in a SQLite database instead of
+results.csv. Each certificate is kept once (it is identified by its issuer and serial number), so running
+generate_results.py again merges the certificates that are found into the inventory instead of creating a new file with
+duplicate rows. The columns that generate_results.py always leaves blank (such as Archived, Owner and Comments) are
+never overwritten, so they can be maintained in the database.
+
+Every place that a certificate was found in (its file, alias and host name) is also kept as an occurrence of the
+certificate, so that the keystores and hosts that hold a certificate (such as a CA that is compromised or rotated) can
+be found from its identity: its issuer and serial number or its SHA-256 fingerprint.
+
+The certificates can be looked up by alias, host name, expiration or identity with this script, which uses the indexes
+of the database instead of going through every certificate.
+"""
+
+# Name of the table that holds the certificates
+table_name = "certificates"
+
+# Maps the columns headers of results.csv (in order, with the two epoch columns at the end) to the columns of the table
+column_dict = (("Archived", "archived"), \
+               ("Location", "location"), \
+               ("Product", "product"), \
+               ("Product Component", "product_component"), \
+               ("Host Name/IP", "host_name"), \
+               ("Expiration", "expiration"), \
+               ("Connection", "connection"), \
+               ("Use", "use"), \
+               ("Alias/Common Name", "alias"), \
+               ("Issuer", "issuer"), \
+               ("Creation", "creation"), \
+               ("File Name", "file_name"), \
+               ("Key Pair Location", "key_pair_location"), \
+               ("File Type", "file_type"), \
+               ("Key Strength", "key_strength"), \
+               ("Owner/Subject/RootCA Title", "owner_subject"), \
+               ("Serial Number", "serial_number"), \
+               ("Owner", "owner"), \
+               ("Comments", "comments"), \
+               ("Received On", "received_on"), \
+               ("Received From", "received_from"), \
+               ("Inherited", "inherited"), \
+               ("Creation Epoch", "creation_epoch"), \
+               ("Expiration Epoch", "expiration_epoch"))
+column_names = [column for header, column in column_dict]
+
+# Columns that generate_results.py leaves blank, which are kept as they are when a certificate is found again
+maintained_columns = ("archived", "connection", "key_pair_location", "owner", "comments")
+
+# Columns that identify a certificate
+key_columns = ("issuer", "serial_number")
+
+# Name of the table that holds where each certificate was found and its columns. Each occurrence is identified by the
+# certificate (its issuer and serial number) and the file, alias and host name it was found under.
+occurrence_table_name = "occurrences"
+occurrence_dict = (("Fingerprint", "fingerprint"), \
+                   ("Issuer", "issuer"), \
+                   ("Serial Number", "serial_number"), \
+                   ("File", "file"), \
+                   ("Alias/Common Name", "alias"), \
+                   ("Host Name/IP", "host_name"))
+occurrence_column_names = [column for header, column in occurrence_dict]
+occurrence_key_columns = ("issuer", "serial_number", "file", "alias", "host_name")
+
+# Indexes used by the lookups (the occurrences are also found by their certificate through their primary key). The
+# certificates are looked up by alias and host name through their occurrences, since a certificate (such as a shared
+# root or intermediate) can be found under many aliases and hosts while its own row only holds the last ones.
+index_dict = {"certificates_expiration" : (table_name, "expiration_epoch"), \
+              "occurrences_alias" : (occurrence_table_name, "alias"), \
+              "occurrences_host_name" : (occurrence_table_name, "host_name"), \
+              "occurrences_fingerprint" : (occurrence_table_name, "fingerprint"), \
+              "occurrences_file" : (occurrence_table_name, "file")}
+# Indexes that older versions of the inventory created for the lookups by alias and host name
+unused_index_names = ("certificates_alias", "certificates_host_name")
+
+upsert_statement = "INSERT INTO " + table_name + " (" + ", ".join(column_names) + ") VALUES (" + ", ".join("?" * len(column_names)) + ") " + \
+                   "ON CONFLICT (" + ", ".join(key_columns) + ") DO UPDATE SET " + \
+                   ", ".join(column + " = excluded." + column for column in column_names if column not in maintained_columns + key_columns)
+occurrence_statement = "INSERT OR REPLACE INTO " + occurrence_table_name + " (" + ", ".join(occurrence_column_names) + ") VALUES (" + \
+                       ", ".join("?" * len(occurrence_column_names)) + ")"
+# Removes the certificates that have no occurrence left (the primary key of the occurrences starts with the identity of
+# the certificate, so each certificate is checked through the index)
+unused_statement = "DELETE FROM " + table_name + " WHERE NOT EXISTS (SELECT 1 FROM " + occurrence_table_name + " WHERE " + \
+                   " AND ".join(occurrence_table_name + "." + column + " = " + table_name + "." + column for column in key_columns) + ")"
+# Removes a single certificate (given by its identity) when it has no occurrence left
+unused_certificate_statement = unused_statement + " AND " + " AND ".join(column + " = ?" for column in key_columns)
+
+"""
+This function opens the inventory (creating it if needed) and makes sure that the table and its indexes exist.
+
+Parameters:
+---------------------
+path: string
+This is the path of the SQLite database.
+
+Returns:
+---------------------
+sqlite3.Connection
+This is the connection to the inventory.
+"""
+def openInventory(path):
+  connection = sqlite3.connect(path)
+  with connection:
+    connection.execute("CREATE TABLE IF NOT EXISTS " + table_name + " (" + \
+                       ", ".join(column + (" INTEGER" if column.endswith("_epoch") else " TEXT") for column in column_names) + \
+                       ", PRIMARY KEY (" + ", ".join(key_columns) + "))")
+    connection.execute("CREATE TABLE IF NOT EXISTS " + occurrence_table_name + " (" + \
+                       ", ".join(column + " TEXT" for column in occurrence_column_names) + \
+                       ", PRIMARY KEY (" + ", ".join(occurrence_key_columns) + "))")
+    for index_name, (index_table, column) in sorted(index_dict.items()):
+      connection.execute("CREATE INDEX IF NOT EXISTS " + index_name + " ON " + index_table + " (" + column + ")")
+    for index_name in unused_index_names:
+      connection.execute("DROP INDEX IF EXISTS " + index_name)
+  return connection
+
+"""
+This function inserts or updates a batch of rows (and records where each certificate was found) in a single
+transaction. When the same certificate is in the batch more than once, the last row wins.
+
+Parameters:
+---------------------
+connection: sqlite3.Connection
+This is the connection to the inventory.
+
+rows: list
+This is the list of rows in the same format as results.csv with the two epoch columns, the SHA-256 fingerprint (empty
+when it is not known) and the path of the file the certificate was found in at the end.
+
+Returns:
+---------------------
+None
+"""
+def upsertRows(connection, rows):
+  if rows:
+    issuer = column_names.index("issuer")
+    serial_number = column_names.index("serial_number")
+    alias = column_names.index("alias")
+    host_name = column_names.index("host_name")
+    with connection:
+      connection.executemany(upsert_statement, [row[:len(column_names)] for row in rows])
+      connection.executemany(occurrence_statement, [(normalizeFingerprint(row[-2]), row[issuer], row[serial_number], row[-1], row[alias], row[host_name]) \
+                                                    for row in rows])
+
+"""
+This function removes every occurrence that was recorded for a file, which is done before the file is recorded again.
+"""
+def removeOccurrences(connection, file):
+  with connection:
+    connection.execute("DELETE FROM " + occurrence_table_name + " WHERE file = ?", (file,))
+
+"""
+This function removes everything that was recorded for a file that is gone in a single transaction: its occurrences and
+the certificates that were only found in it.
+
+Parameters:
+---------------------
+connection: sqlite3.Connection
+This is the connection to the inventory.
+
+file: string
+This is the path of the file.
+
+Returns:
+---------------------
+integer
+This is the number of certificates that were removed.
+"""
+def removeFile(connection, file):
+  with connection:
+    identities = connection.execute("SELECT DISTINCT " + ", ".join(key_columns) + " FROM " + occurrence_table_name + " WHERE file = ?", (file,)).fetchall()
+    connection.execute("DELETE FROM " + occurrence_table_name + " WHERE file = ?", (file,))
+    return connection.executemany(unused_certificate_statement, identities).rowcount
+
+"""
+This function removes the certificates that are no longer found in any file (the ones that have no occurrence left),
+which is done once the files have been recorded again. Their maintained columns are removed along with them.
+
+Parameters:
+---------------------
+connection: sqlite3.Connection
+This is the connection to the inventory.
+
+Returns:
+---------------------
+integer
+This is the number of certificates that were removed.
+"""
+def removeUnusedCertificates(connection):
+  with connection:
+    return connection.execute(unused_statement).rowcount
+
+"""
+This function converts a SHA-256 fingerprint (with or without colons, in either case) into the format that keytool
+prints (upper case hex separated by colons). None is returned for an empty fingerprint.
+"""
+def normalizeFingerprint(fingerprint):
+  digits = "".join(fingerprint.replace(':', '').split()).upper()
+  if not digits:
+    return None
+  return ':'.join(digits[i:i + 2] for i in range(0, len(digits), 2))
+
+"""
+This function returns every occurrence of the certificate with the issuer and serial number given, ordered by file.
+"""
+def findOccurrences(connection, issuer, serial_number):
+  return connection.execute("SELECT " + ", ".join(occurrence_column_names) + " FROM " + occurrence_table_name + \
+                            " WHERE issuer = ? AND serial_number = ? ORDER BY file, alias, host_name", (issuer, serial_number)).fetchall()
+
+"""
+This function returns every occurrence of the certificate with the SHA-256 fingerprint given. The fingerprint is used to
+find the identity of the certificate first, so that the occurrences that were found without a fingerprint (from data
+dumps of older versions of keytool) are returned as well.
+"""
+def findOccurrencesByFingerprint(connection, fingerprint):
+  occurrences = []
+  identities = connection.execute("SELECT DISTINCT issuer, serial_number FROM " + occurrence_table_name + " WHERE fingerprint = ? ORDER BY issuer, serial_number", \
+                                  (normalizeFingerprint(fingerprint),)).fetchall()
+  for issuer, serial_number in identities:
+    occurrences.extend(findOccurrences(connection, issuer, serial_number))
+  return occurrences
+
+"""
+This function returns the rows of the certificates that were found under the alias or host name given (the column of
+the occurrences), ordered by expiration. Each row has the alias and host name that the certificate was found under
+rather than the last ones it was recorded with, so a certificate found under several of them is returned once for each.
+
+Parameters:
+---------------------
+connection: sqlite3.Connection
+This is the connection to the inventory.
+
+column: string
+This is the column of the occurrences to look up (alias or host_name).
+
+value: string
+This is the alias or host name.
+
+Returns:
+---------------------
+list
+This is the list of rows in the same format as results.csv with the two epoch columns.
+"""
+def findBy(connection, column, value):
+  columns = [(occurrence_table_name if name in ("alias", "host_name") else table_name) + "." + name for name in column_names]
+  return connection.execute("SELECT DISTINCT " + ", ".join(columns) + " FROM " + occurrence_table_name + " JOIN " + table_name + " ON " + \
+                            " AND ".join(occurrence_table_name + "." + name + " = " + table_name + "." + name for name in key_columns) + \
+                            " WHERE " + occurrence_table_name + "." + column + " = ? ORDER BY " + table_name + ".expiration_epoch, " + \
+                            occurrence_table_name + ".alias, " + occurrence_table_name + ".host_name", (value,)).fetchall()
+
+"""
+This function returns the rows of the certificates that expire between the two times given (in seconds since the epoch),
+ordered by expiration.
+"""
+def findExpiringBetween(connection, start, end):
+  return connection.execute("SELECT " + ", ".join(column_names) + " FROM " + table_name + " WHERE expiration_epoch BETWEEN ? AND ? ORDER BY expiration_epoch", \
+                            (start, end)).fetchall()
+
+"""
+This function reads the arguments that were passed to the program.
+"""
+def parseArguments(argv):
+  parser = argparse.ArgumentParser(description='Finds the certificates in the inventory created by generate_results.py --sqlite.')
+  parser.add_argument('inventory', help='The SQLite database created by generate_results.py --sqlite')
+  query = parser.add_mutually_exclusive_group(required=True)
+  query.add_argument('--alias', help='Lists the certificates with the alias')
+  query.add_argument('--host', help='Lists the certificates of the host name')
+  query.add_argument('--expiring', type=int, metavar='DAYS', help='Lists the certificates that expire within the number of days')
+  query.add_argument('--expired', action='store_true', help='Lists the certificates that have already expired')
+  query.add_argument('--fingerprint', help='Lists every file, alias and host name that the certificate with the SHA-256 fingerprint was found under')
+  query.add_argument('--issuer', help='Lists every file, alias and host name that the certificate with the issuer (and --serial) was found under')
+  parser.add_argument('--serial', help='The serial number (as keytool prints it) of the certificate to find with --issuer')
+  args = parser.parse_args(argv)
+  if args.expiring is not None and args.expiring < 0:
+    parser.error("the number of days cannot be negative")
+  if (args.issuer is None) != (args.serial is None):
+    parser.error("--issuer and --serial must be provided together")
+  return args
+
+def main(argv):
+  args = parseArguments(argv)
+  if not os.path.isfile(args.inventory):
+    sys.exit("\nThe inventory " + args.inventory + " does not exist\n")
+
+  connection = openInventory(args.inventory)
+  if args.fingerprint is not None or args.issuer is not None:
+    if args.fingerprint is not None:
+      occurrences = findOccurrencesByFingerprint(connection, args.fingerprint)
+    else:
+      occurrences = findOccurrences(connection, args.issuer, args.serial.lower())
+    connection.close()
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow([header for header, column in occurrence_dict])
+    writer.writerows(occurrences)
+    return
+
+  now = int(time.time())
+  if args.alias is not None:
+    rows = findBy(connection, "alias", args.alias)
+  elif args.host is not None:
+    rows = findBy(connection, "host_name", args.host)
+  elif args.expiring is not None:
+    rows = findExpiringBetween(connection, now, now + args.expiring * 86400)
+  else:
+    rows = findExpiringBetween(connection, -sys.maxsize, now - 1)
+  connection.close()
+
+  # The matching rows are written in the same format as results.csv so they can be used the same way
+  writer = csv.writer(sys.stdout, lineterminator='\n')
+  writer.writerow([header for header, column in column_dict])
+  writer.writerows(rows)
+
+if __name__ == '__main__':
+  # Starting the main function
+  # This try and except is meant to catch a Ctrl+C sudden stop without raising larger concerns
+  try:
+    # Takes input arguments beside the name of the script
+    main(sys.argv[1:])
+  except KeyboardInterrupt:
+    print('Suddenly exiting: Caused by Ctrl+C')
+    sys.exit(0) # Raising the SystemExit exception without classifying the exit as something caused by an error
@@ -0,0 +1,524 @@
+#!/usr/bin/env python
+
+import os
+import time
+import string
+import struct
+import base64
+import hashlib
+import hmac
+import datetime
+
+import certificate_reader
+from certificate_reader import integer_tag, bit_string_tag, octet_string_tag, null_tag, oid_tag, utf8_string_tag, \
+                               printable_string_tag, ia5_string_tag, utc_time_tag, generalized_time_tag, bmp_string_tag, sequence_tag, set_tag
+
+# The cryptography package generates the RSA keys, signs with them and encrypts the keys of PKCS12 keystores. It is only
+# imported here so that automation.py still runs keytool without it.
+try:
+  from cryptography.hazmat.primitives import hashes, serialization
+  from cryptography.hazmat.primitives.asymmetric import padding, rsa
+  from cryptography.hazmat.primitives.ciphers import Cipher, modes
+  try:
+    # TripleDES was moved out of the primitives in version 43 of cryptography
+    from cryptography.hazmat.decrepit.ciphers.algorithms import TripleDES
+  except ImportError:
+    from cryptography.hazmat.primitives.ciphers.algorithms import TripleDES
+except ImportError:
+  rsa = None
+
+"""
+The aim of this file is to create a keypair, its keystore and its CSR without keytool, which starts a JVM for each of the
+two commands that automation.py runs for every keypair. It creates the same things as "keytool -genkey -keyalg RSA
+-keysize 2048 -sigalg SHA256withRSA -validity 3650" followed by "keytool -certreq":
+* a 2048-bit RSA key with a self-signed certificate (which is the certificate chain of the keypair until the CSR is signed)
+* a JKS or PKCS12 keystore holding the key and its certificate, which keytool reads with the same password
+* a SHA256withRSA CSR (PKCS10) in the same PEM format that keytool writes
+
+It is the counterpart of certificate_reader.py, whose ASN.1 tags and PKCS12 key derivation are reused. The keys, the
+signatures and the encryption come from the cryptography package, which must be installed.
+"""
+
+# Size of the RSA keys and the public exponent (the same as keytool)
+rsa_key_size = 2048
+rsa_public_exponent = 65537
+
+# Number of days that the self-signed certificate is valid for (the same as -validity in automation.py)
+validity_days = 3650
+
+# Object identifiers of the algorithms and extensions
+sha256_with_rsa_oid = "1.2.840.113549.1.1.11"
+sha1_oid = "1.3.14.3.2.26"
+subject_key_identifier_oid = "2.5.29.14"
+# Sun's proprietary algorithm that protects the keys of JKS keystores
+jks_key_protector_oid = "1.3.6.1.4.1.42.2.17.1.1"
+pbe_sha1_3des_oid = "1.2.840.113549.1.12.1.3"
+
+# Number of iterations of the key derivations of PKCS12 keystores (the same as keytool)
+pkcs12_iterations = 10000
+
+# Maps the keywords of a distinguished name to the object identifiers of its attributes
+name_keyword_dict = dict((keyword, oid) for oid, keyword in certificate_reader.name_attribute_dict.items())
+# Attributes whose values are always an IA5String or a PrintableString, the others being a PrintableString when possible
+ia5_string_oids = ("1.2.840.113549.1.9.1", "0.9.2342.19200300.100.1.25")
+printable_string_oids = ("2.5.4.6",)
+printable_characters = frozenset(string.ascii_letters + string.digits + " '()+,-./:=?")
+
+# Label of the PEM block of a CSR as keytool writes it
+csr_label = "NEW CERTIFICATE REQUEST"
+
+"""
+This function encodes a single DER element.
+
+Parameters:
+---------------------
+tag: integer
+This is the tag of the element.
+
+content: bytes
+This is the content of the element.
+
+Returns:
+---------------------
+bytes
+This is the encoded element.
+"""
+def encodeElement(tag, content):
+  length = len(content)
+  if length < 0x80:
+    return bytes(bytearray([tag, length])) + content
+  length_bytes = length.to_bytes((length.bit_length() + 7) // 8, "big")
+  return bytes(bytearray([tag, 0x80 | len(length_bytes)])) + length_bytes + content
+
+"""
+This function encodes a SEQUENCE of elements that are already encoded.
+"""
+def encodeSequence(*elements):
+  return encodeElement(sequence_tag, b"".join(elements))
+
+"""
+This function encodes a SET OF elements that are already encoded (DER sorts the elements of a SET OF).
+"""
+def encodeSet(*elements):
+  return encodeElement(set_tag, b"".join(sorted(elements)))
+
+"""
+This function encodes a non-negative INTEGER.
+"""
+def encodeInteger(value):
+  # The extra bit keeps the most significant bit clear so that the value is not read as a negative number
+  return encodeElement(integer_tag, value.to_bytes(value.bit_length() // 8 + 1, "big"))
+
+"""
+This function encodes an OBJECT IDENTIFIER from its dotted form.
+"""
+def encodeOID(oid):
+  numbers = [int(number) for number in oid.split('.')]
+  content = bytearray()
+  for number in [numbers[0] * 40 + numbers[1]] + numbers[2:]:
+    encoded = bytearray([number & 0x7f])
+    number >>= 7
+    while number:
+      encoded.insert(0, 0x80 | (number & 0x7f))
+      number >>= 7
+    content += encoded
+  return encodeElement(oid_tag, bytes(content))
+
+"""
+This function encodes an AlgorithmIdentifier with NULL parameters.
+"""
+def encodeAlgorithm(oid):
+  return encodeSequence(encodeOID(oid), encodeElement(null_tag, b""))
+
+"""
+This function encodes a BIT STRING without unused bits.
+"""
+def encodeBitString(content):
+  return encodeElement(bit_string_tag, b"\x00" + content)
+
+"""
+This function encodes a time as a UTCTime before 2050 and as a GeneralizedTime from 2050 on (RFC 5280).
+"""
+def encodeTime(value):
+  if value.year < 2050:
+    return encodeElement(utc_time_tag, value.strftime("%y%m%d%H%M%SZ").encode("ascii"))
+  return encodeElement(generalized_time_tag, value.strftime("%Y%m%d%H%M%SZ").encode("ascii"))
+
+"""
+This function splits a distinguished name written the way keytool takes it with -dname (such as
+"CN=name, OU=unit, O=organization, C=US") into its relative names, each one being a list of (OID, value) pairs. Values
+can be quoted or have special characters escaped with a backslash.
+
+Parameters:
+---------------------
+distinguished_name: string
+This is the distinguished name.
+
+Returns:
+---------------------
+list
+This is the list of the relative names in the order they are written (the most specific one first).
+"""
+def parseDistinguishedName(distinguished_name):
+  relative_names = [[]]
+  attribute = ["", ""]
+  part = 0
+  quoted = False
+  position = 0
+  while position <= len(distinguished_name):
+    character = distinguished_name[position] if position < len(distinguished_name) else ','
+    if character == '\\' and position + 1 < len(distinguished_name):
+      attribute[part] += distinguished_name[position + 1]
+      position += 1
+    elif character == '"':
+      quoted = not quoted
+    elif quoted:
+      attribute[part] += character
+    elif character == '=' and part == 0:
+      part = 1
+    elif character in ',;+':
+      keyword = attribute[0].strip()
+      if keyword.upper().startswith("OID."):
+        oid = keyword[4:]
+      else:
+        oid = name_keyword_dict.get(keyword.upper())
+      if part == 0 or oid is None:
+        raise ValueError("The distinguished name is not valid: " + distinguished_name)
+      relative_names[-1].append((oid, attribute[1].strip()))
+      if character != '+':
+        relative_names.append([])
+      attribute = ["", ""]
+      part = 0
+    else:
+      attribute[part] += character
+    position += 1
+  if quoted:
+    raise ValueError("The distinguished name is not valid: " + distinguished_name)
+  return relative_names[:-1]
+
+"""
+This function encodes a distinguished name (see parseDistinguishedName()) as a Name, which lists the relative names the
+other way around (the least specific one first).
+"""
+def encodeName(distinguished_name):
+  relative_names = []
+  for relative_name in parseDistinguishedName(distinguished_name):
+    attributes = []
+    for oid, value in relative_name:
+      if oid in ia5_string_oids:
+        encoded_value = encodeElement(ia5_string_tag, value.encode("ascii"))
+      elif oid in printable_string_oids or all(character in printable_characters for character in value):
+        encoded_value = encodeElement(printable_string_tag, value.encode("ascii"))
+      else:
+        encoded_value = encodeElement(utf8_string_tag, value.encode("utf-8"))
+      attributes.append(encodeSequence(encodeOID(oid), encoded_value))
+    relative_names.append(encodeSet(*attributes))
+  relative_names.reverse()
+  return encodeSequence(*relative_names)
+
+"""
+This function returns whether or not the cryptography package, which the keys are created with, is installed.
+"""
+def isAvailable():
+  return rsa is not None
+
+"""
+This function creates an RSA key with the cryptography package.
+
+Parameters:
+---------------------
+bits: integer
+This is the size of the modulus in bits.
+
+Returns:
+---------------------
+RSAPrivateKey
+This is the new key.
+"""
+def generateRSAKey(bits=rsa_key_size):
+  if rsa is None:
+    raise ImportError("The cryptography package is needed to create keypairs in Python (pip install cryptography)")
+  return rsa.generate_private_key(rsa_public_exponent, bits)
+
+"""
+This function encodes the public part of a key as a SubjectPublicKeyInfo.
+"""
+def encodePublicKey(key):
+  return key.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+"""
+This function encodes the public part of a key as an RSAPublicKey (the content of the BIT STRING of the SubjectPublicKeyInfo).
+"""
+def encodeRSAPublicKey(key):
+  return key.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
+
+"""
+This function encodes a key as a PKCS8 PrivateKeyInfo, which is what keystores protect.
+"""
+def encodePrivateKey(key):
+  return key.private_bytes(serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+"""
+This function signs data with SHA256withRSA (PKCS1 v1.5).
+"""
+def sign(key, data):
+  return key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+
+"""
+This function signs a TBSCertificate or CertificationRequestInfo and wraps it up with the signature algorithm and the
+signature.
+"""
+def signStructure(key, structure):
+  return encodeSequence(structure, encodeAlgorithm(sha256_with_rsa_oid), encodeBitString(sign(key, structure)))
+
+"""
+This function creates the self-signed certificate of a key the same way keytool -genkey does (a version 3 certificate with
+the subject key identifier extension).
+
+Parameters:
+---------------------
+key: RSAPrivateKey
+This is the key of the certificate.
+
+name: bytes
+This is the encoded distinguished name (see encodeName()), which is both the subject and the issuer.
+
+not_before: datetime
+This is the start of the validity (in UTC).
+
+days: integer
+This is the number of days that the certificate is valid for.
+
+Returns:
+---------------------
+bytes
+This is the DER encoded certificate.
+"""
+def createCertificate(key, name, not_before, days=validity_days):
+  # The key identifier is the SHA1 hash of the public key (RFC 5280 section 4.2.1.2)
+  key_identifier = hashlib.sha1(encodeRSAPublicKey(key)).digest()
+  extensions = encodeSequence(encodeSequence(encodeOID(subject_key_identifier_oid), \
+                                             encodeElement(octet_string_tag, encodeElement(octet_string_tag, key_identifier))))
+  # A random positive serial number of 63 bits
+  serial_number = (int.from_bytes(os.urandom(8), "big") >> 1) or 1
+  tbs_certificate = encodeSequence(encodeElement(0xa0, encodeInteger(2)), \
+                                   encodeInteger(serial_number), \
+                                   encodeAlgorithm(sha256_with_rsa_oid), \
+                                   name, \
+                                   encodeSequence(encodeTime(not_before), encodeTime(not_before + datetime.timedelta(days=days))), \
+                                   name, \
+                                   encodePublicKey(key), \
+                                   encodeElement(0xa3, extensions))
+  return signStructure(key, tbs_certificate)
+
+"""
+This function creates the CSR (PKCS10 CertificationRequest) of a key.
+
+Parameters:
+---------------------
+key: RSAPrivateKey
+This is the key that the certificate is requested for.
+
+name: bytes
+This is the encoded distinguished name (see encodeName()) of the subject.
+
+Returns:
+---------------------
+bytes
+This is the DER encoded CSR.
+"""
+def createCSR(key, name):
+  return signStructure(key, encodeSequence(encodeInteger(0), name, encodePublicKey(key), encodeElement(0xa0, b"")))
+
+"""
+This function encodes DER data as PEM with 64 characters on each line, the same as keytool.
+"""
+def encodePEM(der, label):
+  encoded = base64.b64encode(der).decode("ascii")
+  lines = [encoded[start:start + 64] for start in range(0, len(encoded), 64)]
+  return "-----BEGIN " + label + "-----\n" + "\n".join(lines) + "\n-----END " + label + "-----\n"
+
+"""
+This function protects a PKCS8 key for a JKS keystore with Sun's key protector, which XORs the key with a stream of SHA1
+hashes of the password and a random salt and appends a SHA1 hash of the password and the key as an integrity check.
+
+Parameters:
+---------------------
+private_key: bytes
+This is the PKCS8 encoded key (see encodePrivateKey()).
+
+password: string
+This is the password of the key.
+
+Returns:
+---------------------
+bytes
+This is the EncryptedPrivateKeyInfo that is stored in the keystore.
+"""
+def protectJKSKey(private_key, password):
+  password_bytes = password.encode("utf-16-be")
+  salt = os.urandom(20)
+  stream = bytearray()
+  digest = salt
+  while len(stream) < len(private_key):
+    digest = hashlib.sha1(password_bytes + digest).digest()
+    stream += digest
+  protected = salt + bytes(bytearray(a ^ b for a, b in zip(bytearray(private_key), stream))) + hashlib.sha1(password_bytes + private_key).digest()
+  return encodeSequence(encodeAlgorithm(jks_key_protector_oid), encodeElement(octet_string_tag, protected))
+
+"""
+This function encodes a string the way Java's DataOutputStream.writeUTF() does.
+"""
+def encodeJavaString(value):
+  # Java's modified UTF-8 writes the null character as two bytes
+  encoded = value.encode("utf-8").replace(b"\x00", b"\xc0\x80")
+  return struct.pack(">H", len(encoded)) + encoded
+
+"""
+This function creates a JKS keystore that holds a single private key entry.
+
+Parameters:
+---------------------
+alias: string
+This is the alias of the entry (JKS keeps aliases in lower case, as keytool does).
+
+key: RSAPrivateKey
+This is the key of the entry.
+
+chain: list
+This is the list of DER encoded certificates of the certificate chain of the key.
+
+password: string
+This is the password of both the keystore and the key.
+
+Returns:
+---------------------
+bytes
+This is the keystore.
+"""
+def createJKS(alias, key, chain, password):
+  protected_key = protectJKSKey(encodePrivateKey(key), password)
+  data = certificate_reader.jks_magic + struct.pack(">II", 2, 1)
+  data += struct.pack(">I", 1) + encodeJavaString(alias.lower()) + struct.pack(">q", int(time.time() * 1000))
+  data += struct.pack(">I", len(protected_key)) + protected_key + struct.pack(">I", len(chain))
+  for certificate in chain:
+    data += encodeJavaString("X.509") + struct.pack(">I", len(certificate)) + certificate
+  return data + hashlib.sha1(password.encode("utf-16-be") + certificate_reader.jks_whitener + data).digest()
+
+"""
+This function encrypts data with 3DES (EDE with a 24 byte key) in CBC mode, adding the PKCS7 padding first.
+"""
+def tripleDESEncryptCBC(key, iv, data):
+  padding_length = 8 - len(data) % 8
+  encryptor = Cipher(TripleDES(bytes(key)), modes.CBC(bytes(iv))).encryptor()
+  return encryptor.update(bytes(data) + bytes([padding_length] * padding_length)) + encryptor.finalize()
+
+"""
+This function encodes the attributes of the bags of a PKCS12 keystore that tie the key to its certificate.
+"""
+def encodeBagAttributes(alias, local_key_id):
+  return encodeSet(encodeSequence(encodeOID(certificate_reader.friendly_name_oid), encodeSet(encodeElement(bmp_string_tag, alias.encode("utf-16-be")))), \
+                   encodeSequence(encodeOID(certificate_reader.local_key_id_oid), encodeSet(encodeElement(octet_string_tag, local_key_id))))
+
+"""
+This function encodes a ContentInfo of the data type.
+"""
+def encodeDataContentInfo(content):
+  return encodeSequence(encodeOID(certificate_reader.data_oid), encodeElement(0xa0, encodeElement(octet_string_tag, content)))
+
+"""
+This function creates a PKCS12 keystore that holds a single private key entry. The key is encrypted with
+pbeWithSHAAnd3-KeyTripleDES-CBC and the keystore is protected by an HMAC-SHA1 with the same password, which every
+version of keytool and OpenSSL reads. The certificates are not encrypted.
+
+Parameters:
+---------------------
+alias: string
+This is the alias of the entry.
+
+key: RSAPrivateKey
+This is the key of the entry.
+
+chain: list
+This is the list of DER encoded certificates of the certificate chain of the key.
+
+password: string
+This is the password of both the keystore and the key.
+
+Returns:
+---------------------
+bytes
+This is the keystore.
+"""
+def createPKCS12(alias, key, chain, password):
+  bmp_password = certificate_reader.encodeBMPPassword(password)
+  salt = os.urandom(20)
+  encryption_key = certificate_reader.derivePKCS12Key("sha1", bmp_password, salt, 1, pkcs12_iterations, 24)
+  iv = certificate_reader.derivePKCS12Key("sha1", bmp_password, salt, 2, pkcs12_iterations, 8)
+  encrypted_key = encodeSequence(encodeSequence(encodeOID(pbe_sha1_3des_oid), encodeSequence(encodeElement(octet_string_tag, salt), encodeInteger(pkcs12_iterations))), \
+                                 encodeElement(octet_string_tag, tripleDESEncryptCBC(encryption_key, iv, encodePrivateKey(key))))
+
+  # The local key id ties the key to the first certificate of its chain
+  local_key_id = hashlib.sha1(chain[0]).digest()
+  key_bag = encodeSequence(encodeOID(certificate_reader.shrouded_key_bag_oid), encodeElement(0xa0, encrypted_key), encodeBagAttributes(alias, local_key_id))
+  certificate_bags = []
+  for position, certificate in enumerate(chain):
+    certificate_bag = [encodeOID(certificate_reader.cert_bag_oid), \
+                       encodeElement(0xa0, encodeSequence(encodeOID(certificate_reader.x509_certificate_oid), encodeElement(0xa0, encodeElement(octet_string_tag, certificate))))]
+    if position == 0:
+      certificate_bag.append(encodeBagAttributes(alias, local_key_id))
+    certificate_bags.append(encodeSequence(*certificate_bag))
+  auth_safe = encodeSequence(encodeDataContentInfo(encodeSequence(*certificate_bags)), encodeDataContentInfo(encodeSequence(key_bag)))
+
+  mac_salt = os.urandom(20)
+  mac_key = certificate_reader.derivePKCS12Key("sha1", bmp_password, mac_salt, 3, pkcs12_iterations, 20)
+  mac_data = encodeSequence(encodeSequence(encodeAlgorithm(sha1_oid), encodeElement(octet_string_tag, hmac.new(mac_key, auth_safe, hashlib.sha1).digest())), \
+                            encodeElement(octet_string_tag, mac_salt), \
+                            encodeInteger(pkcs12_iterations))
+  return encodeSequence(encodeInteger(3), encodeDataContentInfo(auth_safe), mac_data)
+
+"""
+This function creates a keypair in a new keystore and its CSR, which is what automation.py runs "keytool -genkey" and
+"keytool -certreq" for.
+
+Parameters:
+---------------------
+keystore_path: string
+This is the path of the keystore, which must not exist yet.
+
+csr_path: string
+This is the path of the CSR.
+
+alias: string
+This is the alias of the keypair.
+
+distinguished_name: string
+This is the distinguished name of the keypair in the same format as the -dname option of keytool.
+
+password: string
+This is the password of both the keystore and the keypair.
+
+store_type: string
+This is "jks" or "pkcs12".
+
+Returns:
+---------------------
+None
+"""
+def createKeyPairFiles(keystore_path, csr_path, alias, distinguished_name, password, store_type="jks"):
+  if store_type not in ("jks", "pkcs12"):
+    raise ValueError("Unsupported keystore type: " + store_type)
+  name = encodeName(distinguished_name)
+  key = generateRSAKey()
+  certificate = createCertificate(key, name, datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0))
+  if store_type == "pkcs12":
+    keystore = createPKCS12(alias, key, [certificate], password)
+  else:
+    keystore = createJKS(alias, key, [certificate], password)
+  csr = encodePEM(createCSR(key, name), csr_label)
+
+  # The keystore is created exclusively so that an existing keystore is never written over
+  with open(keystore_path, 'xb') as file:
+    file.write(keystore)
+  with open(csr_path, 'w') as file:
+    file.write(csr)
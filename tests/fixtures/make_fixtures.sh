@@ -0,0 +1,45 @@
+#!/bin/sh
+# Creates the keystores and certificate files that the tests read, with OpenSSL and keytool rather than with the code
+# under test. The files are kept in the repository, so this only has to be run again to change them (which also means
+# changing the expected values in the tests). Run it from this directory.
+set -e
+password=changeit
+export TZ=UTC
+
+# An ECDSA root CA and an RSA server certificate that it signed
+openssl ecparam -name prime256v1 -genkey -noout -out ca.key
+openssl req -x509 -new -key ca.key -sha384 -days 7300 -set_serial 0x0a11ce -subj "/C=US/O=Example Corp/CN=Fixture Root CA" -out ca.pem
+openssl genrsa -out server.key 2048
+openssl req -new -key server.key -subj "/C=US/O=Example Corp/OU=Ops/CN=server.example.com" -out server.csr
+openssl x509 -req -in server.csr -CA ca.pem -CAkey ca.key -set_serial 0x1a2b3c4d -days 3650 -sha256 -out server.pem
+
+# Certificate files
+openssl x509 -in server.pem -outform DER -out server.der
+cat server.pem ca.pem > chain.pem
+openssl crl2pkcs7 -nocrl -certfile chain.pem -out chain.p7b
+openssl crl2pkcs7 -nocrl -certfile chain.pem -outform DER -out chain-der.p7b
+
+# PKCS12 keystores from OpenSSL: the default (AES-256 and a SHA-256 MAC), 3DES and the legacy RC2-40 and 3DES
+openssl pkcs12 -export -inkey server.key -in server.pem -certfile ca.pem -name server -passout pass:$password -out openssl.p12
+openssl pkcs12 -export -inkey server.key -in server.pem -certfile ca.pem -name server -passout pass:$password \
+  -certpbe PBE-SHA1-3DES -keypbe PBE-SHA1-3DES -macalg sha1 -out openssl-3des.p12
+openssl pkcs12 -export -legacy -inkey server.key -in server.pem -certfile ca.pem -name server -passout pass:$password -out openssl-legacy.p12
+
+# Keystores from keytool: the key pair of openssl.p12 and the root CA as a trusted certificate
+rm -f keystore.jks keystore.jceks keystore.p12
+for store_type in JKS JCEKS PKCS12; do
+  extension=$(echo $store_type | tr 'A-Z' 'a-z' | sed 's/pkcs12/p12/')
+  keytool -importkeystore -noprompt -srckeystore openssl.p12 -srcstoretype PKCS12 -srcstorepass $password \
+    -destkeystore keystore.$extension -deststoretype $store_type -deststorepass $password -destkeypass $password
+  keytool -importcert -noprompt -alias ca -file ca.pem -keystore keystore.$extension -storetype $store_type -storepass $password
+done
+# A JCEKS keystore that also holds a secret key
+rm -f keystore-secret.jceks
+cp keystore.jceks keystore-secret.jceks
+keytool -genseckey -alias secret -keyalg AES -keysize 128 -keystore keystore-secret.jceks -storetype JCEKS -storepass $password -keypass $password
+keytool -list -v -keystore keystore.jks -storepass $password > keystore.txt
+# The same keystore with the certificates in PEM, which has no Owner lines and so no certificates that can be extracted
+keytool -list -rfc -keystore keystore.jks -storepass $password > keystore-rfc.txt
+
+# The key of the server certificate is kept (it is a throwaway key) for the local TLS server of the scanner tests
+rm -f ca.key server.csr chain.pem
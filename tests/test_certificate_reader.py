@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+import os
+import binascii
+import datetime
+import unittest
+import certificate_reader
+import generate_results
+
+"""
+Tests of the reading of keystores and certificate files with certificate_reader.py. The fixtures were created with
+OpenSSL and keytool (see fixtures/make_fixtures.sh) and the expected values are the ones that OpenSSL and keytool print
+for them, so the reader is checked against them rather than against itself.
+"""
+
+fixtures_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+password = "changeit"
+
+# The two certificates of the fixtures as "openssl x509 -noout -subject -issuer -serial -dates -fingerprint -sha256"
+# prints them (in the form that keytool prints them in)
+ca_certificate = {"subject" : "CN=Fixture Root CA, O=Example Corp, C=US", \
+                  "common_name" : "Fixture Root CA", \
+                  "issuer" : "CN=Fixture Root CA, O=Example Corp, C=US", \
+                  "serial_number" : "a11ce", \
+                  "not_before" : datetime.datetime(2026, 10, 17, 22, 3, 38, tzinfo=datetime.timezone.utc), \
+                  "not_after" : datetime.datetime(2046, 10, 12, 22, 3, 38, tzinfo=datetime.timezone.utc), \
+                  "signature_algorithm" : "SHA384withECDSA", \
+                  "fingerprint" : "F3:B1:FD:39:D1:64:EA:2E:EB:1C:11:23:D0:CD:4F:0C:27:97:B4:34:5E:28:7B:78:8E:65:AC:F2:32:7C:59:A1"}
+server_certificate = {"subject" : "CN=server.example.com, OU=Ops, O=Example Corp, C=US", \
+                      "common_name" : "server.example.com", \
+                      "issuer" : "CN=Fixture Root CA, O=Example Corp, C=US", \
+                      "serial_number" : "1a2b3c4d", \
+                      "not_before" : datetime.datetime(2026, 10, 17, 22, 3, 39, tzinfo=datetime.timezone.utc), \
+                      "not_after" : datetime.datetime(2036, 10, 14, 22, 3, 39, tzinfo=datetime.timezone.utc), \
+                      "signature_algorithm" : "SHA256withECDSA", \
+                      "fingerprint" : "02:57:B8:83:3E:32:36:E6:8A:94:B3:FF:A8:C1:0A:9F:4A:BD:F8:DA:B3:31:20:67:C5:B4:F7:97:DB:CF:4E:13"}
+
+# The entries of each fixture as keytool lists them (alias, entry type and certificate), in the order of the fixture
+keytool_entries = [("ca", certificate_reader.trusted_cert_type, ca_certificate), \
+                   ("server", certificate_reader.private_key_type, server_certificate)]
+openssl_entries = [("server", certificate_reader.private_key_type, server_certificate)]
+chain_entries = [("server.example.com", certificate_reader.trusted_cert_type, server_certificate), \
+                 ("Fixture Root CA", certificate_reader.trusted_cert_type, ca_certificate)]
+fixture_dict = {"keystore.jks" : ("jks", keytool_entries), \
+                "keystore.jceks" : ("jceks", keytool_entries), \
+                "keystore.p12" : ("pkcs12", keytool_entries[::-1]), \
+                "openssl.p12" : ("pkcs12", openssl_entries), \
+                "openssl-3des.p12" : ("pkcs12", openssl_entries), \
+                "openssl-legacy.p12" : ("pkcs12", openssl_entries), \
+                "ca.pem" : ("pem", [("Fixture Root CA", certificate_reader.trusted_cert_type, ca_certificate)]), \
+                "server.pem" : ("pem", [("server.example.com", certificate_reader.trusted_cert_type, server_certificate)]), \
+                "server.der" : ("der", [("server.example.com", certificate_reader.trusted_cert_type, server_certificate)]), \
+                "chain.p7b" : ("pkcs7", chain_entries), \
+                "chain-der.p7b" : ("pkcs7", chain_entries)}
+
+def getFixture(name):
+  return os.path.join(fixtures_directory, name)
+
+"""
+Returns whether or not a fixture can be read here: the certificates of the PKCS12 keystores are encrypted, which needs
+pycryptodomex.
+"""
+def isReadable(name):
+  return certificate_reader.AES is not None or fixture_dict.get(name, ("",))[0] != "pkcs12"
+
+def unhexlify(text):
+  return binascii.unhexlify(text.replace(' ', ''))
+
+class FixtureTest(unittest.TestCase):
+  def testEntries(self):
+    for name, (container_type, expected_entries) in sorted(fixture_dict.items()):
+      if not isReadable(name):
+        continue
+      entries = certificate_reader.readEntries(getFixture(name), password)
+      self.assertEqual([(entry.alias, entry.entry_type) for entry in entries], \
+                       [(alias, entry_type) for alias, entry_type, expected in expected_entries], name)
+      for entry, (alias, entry_type, expected) in zip(entries, expected_entries):
+        certificate = entry.certificate
+        for field in ("subject", "common_name", "issuer", "serial_number", "not_before", "not_after", "signature_algorithm"):
+          self.assertEqual(getattr(certificate, field), expected[field], name + " " + alias + " " + field)
+        self.assertEqual(certificate.getFingerprint(), expected["fingerprint"], name + " " + alias)
+
+  def testChain(self):
+    # The root is the rest of the chain of the key pair, whether or not it is also an entry of its own
+    for name in filter(isReadable, ("keystore.jks", "keystore.jceks", "keystore.p12", "openssl.p12", "openssl-legacy.p12")):
+      entries = dict((entry.alias, entry) for entry in certificate_reader.readEntries(getFixture(name), password))
+      self.assertEqual([certificate.getFingerprint() for certificate in entries["server"].chain], [ca_certificate["fingerprint"]], name)
+      if "ca" in entries:
+        self.assertEqual(entries["ca"].chain, [], name)
+
+  def testContainerType(self):
+    for name, (container_type, expected_entries) in sorted(fixture_dict.items()):
+      with open(getFixture(name), 'rb') as file:
+        self.assertEqual(certificate_reader.detectContainerType(file.read(generate_results.sniff_size)), container_type, name)
+    with open(getFixture("keystore.txt"), 'rb') as file:
+      self.assertEqual(certificate_reader.detectContainerType(file.read(generate_results.sniff_size)), None)
+
+  def testWrongPassword(self):
+    for name in ("keystore.jks", "keystore.jceks", "keystore-secret.jceks", "keystore.p12", "openssl.p12", "openssl-3des.p12", "openssl-legacy.p12"):
+      self.assertRaises(certificate_reader.KeystoreError, certificate_reader.readEntries, getFixture(name), "wrong")
+
+  def testNoPassword(self):
+    # The certificates of JKS and JCEKS keystores are not encrypted, so they are read without checking the integrity
+    for name in ("keystore.jks", "keystore.jceks"):
+      self.assertEqual([entry.alias for entry in certificate_reader.readEntries(getFixture(name))], ["ca", "server"], name)
+
+  def testSecretKey(self):
+    # The secret key is skipped over (so the integrity check covers the whole keystore) and kept as an entry without a
+    # certificate, which gives no row
+    entries = certificate_reader.readEntries(getFixture("keystore-secret.jceks"), password)
+    self.assertEqual([(entry.alias, entry.entry_type) for entry in entries], \
+                     [("secret", certificate_reader.secret_key_type), ("ca", certificate_reader.trusted_cert_type), ("server", certificate_reader.private_key_type)])
+    self.assertIsNone(entries[0].certificate)
+    self.assertEqual([certificate.alias for certificate in generate_results.readDecodedCertificates(getFixture("keystore-secret.jceks"))], ["ca", "server"])
+
+  def testMissingCipherLibrary(self):
+    # Without pycryptodomex, only the PKCS12 keystores whose certificates are encrypted cannot be read
+    cipher = certificate_reader.AES
+    certificate_reader.AES = None
+    try:
+      with self.assertRaises(certificate_reader.KeystoreError) as context:
+        certificate_reader.readEntries(getFixture("keystore.p12"), password)
+      self.assertIn("pip install pycryptodomex", str(context.exception))
+      self.assertEqual(len(certificate_reader.readEntries(getFixture("keystore.jks"), password)), 2)
+    finally:
+      certificate_reader.AES = cipher
+
+  def testTruncated(self):
+    for name in filter(isReadable, ("keystore.jks", "keystore-secret.jceks", "keystore.p12", "server.der")):
+      with open(getFixture(name), 'rb') as file:
+        data = file.read()
+      truncated = getFixture(name) + ".truncated"
+      with open(truncated, 'wb') as file:
+        file.write(data[:len(data) // 2])
+      try:
+        self.assertRaises(certificate_reader.KeystoreError, certificate_reader.readEntries, truncated, password)
+      finally:
+        os.remove(truncated)
+
+  def testSameAsDataDump(self):
+    # keystore.txt is what "keytool -list -v" prints for keystore.jks, so both give the same certificates
+    generate_results.setStorePassword(password)
+    try:
+      dump_certificates = list(generate_results.extractFileCertificates(getFixture("keystore.txt")))
+      keystore_certificates = generate_results.readDecodedCertificates(getFixture("keystore.jks"))
+    finally:
+      generate_results.setStorePassword(None)
+    fields = [field for field in generate_results.Certificate.__slots__ if field != "missing"]
+    self.assertEqual(len(dump_certificates), 2)
+    self.assertEqual([[getattr(certificate, field) for field in fields] for certificate in dump_certificates], \
+                     [[getattr(certificate, field) for field in fields] for certificate in keystore_certificates])
+
+class KnownAnswerTest(unittest.TestCase):
+  """
+  Decrypts a single block in CBC mode with an IV of zeros, which is the same as decrypting it in ECB mode.
+  """
+  def decryptBlock(self, cipher, key, ciphertext, effective_bits=0):
+    ciphertext = unhexlify(ciphertext)
+    return binascii.hexlify(certificate_reader.decrypt(cipher, unhexlify(key), b"\x00" * len(ciphertext), ciphertext, effective_bits)).decode("ascii")
+
+  @unittest.skipIf(certificate_reader.AES is None, "pycryptodomex is not installed")
+  def testCiphers(self):
+    # openssl enc -des-ede3-cbc -K 0123456789abcdef23456789abcdef01456789abcdef0123 -iv 0000000000000000 -nopad
+    self.assertEqual(self.decryptBlock("3des", "0123456789abcdef23456789abcdef01456789abcdef0123", "109aeac4d79bfadd"), "0011223344556677")
+    # FIPS 197 Appendix C
+    plaintext = "00112233445566778899aabbccddeeff"
+    self.assertEqual(self.decryptBlock("aes", "000102030405060708090a0b0c0d0e0f", "69c4e0d86a7b0430d8cdb78070b4c55a"), plaintext)
+    self.assertEqual(self.decryptBlock("aes", "000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f", \
+                                       "8ea2b7ca516745bfeafc49904b496089"), plaintext)
+    # RFC 2268 section 5, with the effective key bits of the PKCS12 PBE algorithms
+    self.assertEqual(self.decryptBlock("rc2", "88bca90e90875a7f0f79c384627bafb2", "2269552ab0f85ca6", 128), "0000000000000000")
+    self.assertEqual(certificate_reader.decrypt("rc4", b"Key", None, unhexlify("bbf316e8d940af0ad3")), b"Plaintext")
+    self.assertRaises(certificate_reader.KeystoreError, certificate_reader.decrypt, "aes", unhexlify("00" * 16), b"\x00" * 16, b"\x00" * 15)
+
+  def testPKCS12KeyDerivation(self):
+    # The first vector is the usual one for the PKCS12 key derivation (password "smeg") and the others were derived with
+    # "openssl kdf ... PKCS12KDF" with the password encoded with encodeBMPPassword()
+    smeg = certificate_reader.encodeBMPPassword("smeg")
+    self.assertEqual(certificate_reader.derivePKCS12Key("sha1", smeg, unhexlify("0A58CF64530D823F"), 1, 1, 24), \
+                     unhexlify("8AAAE6297B6CB04642AB5B077851284EB7128F1A2A7FBCA3"))
+    changeit = certificate_reader.encodeBMPPassword(password)
+    self.assertEqual(certificate_reader.derivePKCS12Key("sha256", changeit, unhexlify("0102030405060708"), 3, 2048, 32), \
+                     unhexlify("3C26AFFC9EC71B39E0E2754FFDB2D8653CABB0C8C012E5962CCA38075D845B5E"))
+    self.assertEqual(certificate_reader.derivePKCS12Key("sha1", changeit, unhexlify("0102030405060708090a"), 1, 2048, 5), \
+                     unhexlify("314FE37944"))
+
+  def testPadding(self):
+    self.assertEqual(certificate_reader.removePadding(b"abcd\x04\x04\x04\x04", 8), b"abcd")
+    self.assertRaises(certificate_reader.KeystoreError, certificate_reader.removePadding, b"abcd\x04\x04\x03\x04", 8)
+    self.assertRaises(certificate_reader.KeystoreError, certificate_reader.removePadding, b"abcdefg\x00", 8)
+
+if __name__ == '__main__':
+  unittest.main()
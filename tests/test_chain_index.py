@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+import unittest
+import chain_index
+
+"""
+Tests of the linking of the certificates of a keystore into chains with chain_index.py.
+"""
+
+root = "CN=Root CA, O=Example Corp"
+old_root = "CN=Old Root CA, O=Example Corp"
+intermediate = "CN=Issuing CA, O=Example Corp"
+
+class ChainIndexTest(unittest.TestCase):
+  """
+  Returns the status and chain of each alias of the certificates given as (alias, owner, issuer).
+  """
+  def resolve(self, certificates):
+    chains = chain_index.ChainIndex()
+    for alias, owner, issuer in certificates:
+      chains.addCertificate("store", alias, owner, issuer, alias.upper())
+    return dict((row[1], (row[5], row[6])) for row in chains.resolve())
+
+  def testStatuses(self):
+    result = self.resolve([("server", "CN=server", intermediate), \
+                           ("issuing", intermediate, root), \
+                           ("root", root, root), \
+                           ("other", "CN=other", "CN=Missing CA"), \
+                           ("looped", "CN=a", "CN=b"), \
+                           ("looped back", "CN=b", "CN=a")])
+    self.assertEqual(result["server"], (chain_index.complete_status, "server -> issuing -> root"))
+    self.assertEqual(result["issuing"], (chain_index.complete_status, "issuing -> root"))
+    self.assertEqual(result["root"], (chain_index.root_status, "root"))
+    self.assertEqual(result["other"], (chain_index.orphaned_status, "other"))
+    self.assertEqual(result["looped"], (chain_index.incomplete_status, "looped -> looped back"))
+
+  def testRenewedIssuer(self):
+    # The issuing CA was renewed under the same name: only the renewed one was issued by a root that is in the keystore,
+    # whichever order the two are in
+    certificates = [("server", "CN=server", intermediate), \
+                    ("old issuing", intermediate, old_root), \
+                    ("new issuing", intermediate, root), \
+                    ("root", root, root)]
+    for ordered in (certificates, certificates[::-1]):
+      result = self.resolve(ordered)
+      self.assertEqual(result["server"], (chain_index.complete_status, "server -> new issuing -> root"))
+      self.assertEqual(result["old issuing"], (chain_index.orphaned_status, "old issuing"))
+
+  def testNoRoot(self):
+    # Without a root, the first certificate with the owner of the issuer is still linked
+    result = self.resolve([("server", "CN=server", intermediate), \
+                           ("old issuing", intermediate, old_root), \
+                           ("new issuing", intermediate, root)])
+    self.assertEqual(result["server"], (chain_index.incomplete_status, "server -> old issuing"))
+
+if __name__ == '__main__':
+  unittest.main()
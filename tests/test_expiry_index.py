@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import io
+import os
+import sys
+import csv
+import shutil
+import datetime
+import tempfile
+import unittest
+import expiry_index
+
+"""
+Tests of the expiration and validity period queries of expiry_index.py over the rows of results.csv.
+"""
+
+today = datetime.date(2020, 6, 15)
+
+def createRow(alias, creation, expiration):
+  return {"Alias/Common Name" : alias, expiry_index.creation_column : creation, expiry_index.expiration_column : expiration}
+
+# The rows in no particular order, with two that expire on the same day and one whose expiration date cannot be read
+rows = [createRow("later", "1/01/2020", "1/01/2030"), \
+        createRow("expired", "1/01/2010", "6/14/2020"), \
+        createRow("today", "2019-06-15T00:00:00+00:00", "2020-06-15T12:00:00+00:00"), \
+        createRow("boundary", "1/01/2018", "7/15/2020"), \
+        createRow("also boundary", "", "7/15/2020"), \
+        createRow("old", "1/01/2000", "12/31/2009"), \
+        createRow("unreadable", "1/01/2020", "")]
+
+def getAliases(rows):
+  return [row["Alias/Common Name"] for row in rows]
+
+class ExpiryIndexTest(unittest.TestCase):
+  def setUp(self):
+    self.index = expiry_index.ExpiryIndex()
+    self.index.addRows(rows)
+
+  def testParseDate(self):
+    self.assertEqual(expiry_index.parseDate("7/4/2020"), datetime.date(2020, 7, 4))
+    self.assertEqual(expiry_index.parseDate("7/04/2020"), datetime.date(2020, 7, 4))
+    self.assertEqual(expiry_index.parseDate("2020-07-04T23:00:00-05:00"), datetime.date(2020, 7, 4))
+    for date in ("", "2/30/2020", "July 4, 2020", "7/4"):
+      self.assertIsNone(expiry_index.parseDate(date), date)
+
+  def testExpiring(self):
+    # Both ends are included, and the rows that expire on the same day keep their order
+    self.assertEqual(getAliases(self.index.expiringWithin(30, today)), ["today", "boundary", "also boundary"])
+    self.assertEqual(getAliases(self.index.expiringWithin(29, today)), ["today"])
+    self.assertEqual(getAliases(self.index.expiringWithin(0, today)), ["today"])
+    self.assertEqual(getAliases(self.index.expired(today)), ["old", "expired"])
+    self.assertEqual(getAliases(self.index.skipped_rows), ["unreadable"])
+
+  def testValidity(self):
+    # The validity period is the difference between the years, and rows without a creation date are left out
+    self.assertEqual(getAliases(self.index.validityAtLeast(2)), ["boundary", "old", "later", "expired"])
+    self.assertEqual(getAliases(self.index.validityAtLeast(10)), ["later", "expired"])
+    self.assertEqual(getAliases(self.index.validityAtLeast(11)), [])
+
+  def testAddRow(self):
+    # Adding the rows one at a time gives the same indexes as adding them all at once
+    index = expiry_index.ExpiryIndex()
+    for row in rows:
+      index.addRow(row)
+    for name in ("expirations", "expiration_rows", "validity_periods", "validity_period_rows", "skipped_rows"):
+      self.assertEqual(getattr(index, name), getattr(self.index, name), name)
+    # Rows that are added later are merged into the indexes that are already sorted
+    index.addRows([createRow("added", "1/01/2020", "6/20/2020")])
+    self.assertEqual(getAliases(index.expiringWithin(30, today)), ["today", "added", "boundary", "also boundary"])
+
+class ProgramTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, "results.csv")
+    columns = ["Alias/Common Name", expiry_index.creation_column, expiry_index.expiration_column, "Issuer"]
+    with open(self.path, 'w', newline='') as file:
+      writer = csv.DictWriter(file, columns, lineterminator='\n')
+      writer.writeheader()
+      writer.writerows(dict(row, Issuer="CN=Example CA, O=Example Corp") for row in rows)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def testMain(self):
+    # The rows that match are written in the format of results.csv
+    output = io.StringIO()
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+      expiry_index.main([self.path, "--expiring", "30", "--today", "6/15/2020"])
+    finally:
+      sys.stdout = stdout
+    lines = list(csv.reader(io.StringIO(output.getvalue())))
+    self.assertEqual(lines[0], ["Alias/Common Name", expiry_index.creation_column, expiry_index.expiration_column, "Issuer"])
+    self.assertEqual([line[0] for line in lines[1:]], ["today", "boundary", "also boundary"])
+    self.assertEqual(lines[2], ["boundary", "1/01/2018", "7/15/2020", "CN=Example CA, O=Example Corp"])
+
+if __name__ == '__main__':
+  unittest.main()
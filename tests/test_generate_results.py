@@ -0,0 +1,590 @@
+#!/usr/bin/env python
+
+import io
+import os
+import csv
+import sys
+import json
+import inspect
+import pstats
+import datetime
+import time
+import shutil
+import tempfile
+import subprocess
+import unittest
+import certificate_reader
+import generate_results
+
+"""
+Tests of the extraction of the metadata out of "keytool -list -v" data dumps.
+"""
+
+fixtures_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+program = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generate_results.py")
+# The static columns, so that the program never prompts for them
+batch_arguments = ["--batch", "--no-progress", "--location", "Lab", "--product", "Inventory", "--product-component", "Tests", \
+                   "--received-on", "1/2/2020", "--received-from", "Ops"]
+
+def readFixture(name):
+  with open(os.path.join(fixtures_directory, name), 'r') as file:
+    return file.read()
+
+"""
+Runs generate_results.py in the directory given (where it writes results.csv) with the static columns and the arguments
+given. An AssertionError is raised when it fails.
+"""
+def runProgram(directory, arguments, environment=None):
+  process = subprocess.Popen([sys.executable, program] + batch_arguments + arguments, cwd=directory, \
+                             env=dict(os.environ, **(environment or {})), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+  output = process.communicate()[0].decode("utf-8", "replace")
+  if process.returncode != 0:
+    raise AssertionError("generate_results.py " + " ".join(arguments) + " failed:\n" + output)
+  return output
+
+"""
+Returns the rows of the results file of a directory (without the column headers).
+"""
+def readResults(directory, name="results.csv"):
+  with open(os.path.join(directory, name), 'r', newline='') as file:
+    return list(csv.reader(file))[1:]
+
+# A stand-in for keytool that lists keystore.txt for a keystore that is opened with the right password (through
+# -storepass:env) and prints the error that keytool prints otherwise
+keytool_stub = """#!/bin/sh
+while [ $# -gt 0 ]; do
+  case "$1" in
+    -keystore) keystore="$2"; shift;;
+    -storepass:env) eval password=\\"\\$$2\\"; shift;;
+  esac
+  shift
+done
+if [ "$password" = "changeit" ]; then
+  cat "%s"
+else
+  echo "keytool error: java.io.IOException: Keystore was tampered with, or password was incorrect"
+  exit 1
+fi
+"""
+
+# An entry the way keytool prints it since Java 8, with the signature algorithm after the fingerprints
+entry_lines = ["============ servername: host.example.com", \
+               "Alias name: server", \
+               "Creation date: Jan 1, 2018", \
+               "Entry type: PrivateKeyEntry", \
+               "Certificate chain length: 1", \
+               "Certificate[1]:", \
+               "Owner: CN=host.example.com, O=Example Corp, C=US", \
+               "Issuer: CN=Example CA, O=Example Corp, C=US", \
+               "Serial number: 1a2b3c", \
+               "Valid from: Mon Jan 01 00:00:00 UTC 2018 until: Wed Jan 01 00:00:00 UTC 2020", \
+               "Certificate fingerprints:", \
+               "\t MD5:  AA:BB", \
+               "\t SHA1: AA:BB", \
+               "\t SHA256: AA:BB:CC", \
+               "Signature algorithm name: SHA256withRSA", \
+               "Subject Public Key Algorithm: 2048-bit RSA key", \
+               "Version: 3", \
+               ""]
+# The same entry the way older versions of keytool print it, with the signature algorithm indented under the fingerprints
+indented_entry_lines = entry_lines[:14] + ["\t Signature algorithm name: SHA256withRSA", "\t Version: 3", ""]
+# The same entry with the CA that issued it in its chain, followed by another entry
+chain_entry_lines = entry_lines[:4] + ["Certificate chain length: 2"] + entry_lines[5:17] + \
+                    ["Certificate[2]:", \
+                     "Owner: CN=Example CA, O=Example Corp, C=US", \
+                     "Issuer: CN=Example Root CA, O=Example Corp, C=US", \
+                     "Serial number: 1", \
+                     "Valid from: Mon Jan 01 00:00:00 UTC 2018 until: Wed Jan 01 00:00:00 UTC 2020", \
+                     "Certificate fingerprints:", \
+                     "\t SHA256: DD:EE:FF", \
+                     "Signature algorithm name: SHA256withRSA", \
+                     "Version: 3", \
+                     ""] + entry_lines[1:]
+
+# The rows that keystore.txt gives with the static columns of batch_arguments, one for each entry (the File Name column is
+# the name of the file or directory that was given to the program)
+keystore_rows = [["", "Lab", "Inventory", "Tests", "", "10/12/2046", "", "Trusted Cert", "ca", "CN=Fixture Root CA, O=Example Corp, C=US", "10/17/2026", \
+                  "stores", "", ".jks", "SHA384 with ECDSA", "CN=Fixture Root CA, O=Example Corp, C=US", "a11ce", "", "", "1/2/2020", "Ops", "YES"], \
+                 ["", "Lab", "Inventory", "Tests", "", "10/14/2036", "", "Key Pair", "server", "CN=Fixture Root CA, O=Example Corp, C=US", "10/17/2026", \
+                  "stores", "", ".jks", "SHA256 with ECDSA", "CN=server.example.com, OU=Ops, O=Example Corp, C=US", "1a2b3c4d", "", "", "1/2/2020", "Ops", "YES"]]
+
+class ExtractionTest(unittest.TestCase):
+  """
+  Checks the certificate that both engines extract out of a data dump with the lines and line ending given.
+  """
+  def checkLayout(self, lines, line_ending="\n"):
+    text = line_ending.join(lines)
+    lines_engine = generate_results.extractCertificates(generate_results.readLines(io.StringIO(text, newline='')))
+    mmap_engine = generate_results.extractBufferCertificates(text.encode("ascii"), "ascii")
+    for certificates in (list(lines_engine), list(mmap_engine)):
+      self.assertEqual(len(certificates), 1)
+      certificate = certificates[0]
+      self.assertEqual(certificate.host_name, "host.example.com")
+      self.assertEqual(certificate.alias, "server")
+      self.assertEqual(certificate.cert_type, "PrivateKeyEntry")
+      self.assertEqual(certificate.serial_number, "1a2b3c")
+      self.assertEqual(certificate.key_strength, "SHA256 with RSA")
+      self.assertEqual(certificate.fingerprint, "AA:BB:CC")
+
+  def testLayout(self):
+    self.checkLayout(entry_lines)
+
+  def testIndentedLayout(self):
+    self.checkLayout(indented_entry_lines)
+
+  def testDosLineEndings(self):
+    self.checkLayout(indented_entry_lines, "\r\n")
+
+  def testStreaming(self):
+    # A certificate is handed back as soon as the next entry starts, before the rest of the data dump is read
+    def readDump():
+      for line in entry_lines + ["Alias name: next"]:
+        yield line
+      raise AssertionError("the whole data dump was read")
+    certificate = next(generate_results.extractCertificates(readDump()))
+    self.assertEqual((certificate.alias, certificate.host_name), ("server", "host.example.com"))
+
+  def testChain(self):
+    # The other certificates of the chain of an entry are kept with its certificate by both engines (a lone carriage
+    # return makes the mmap engine read the data dump line by line)
+    for line_ending in ("\n", "\r\n", "\r"):
+      text = line_ending.join(chain_entry_lines)
+      lines_engine = list(generate_results.extractCertificates(generate_results.readLines(io.StringIO(text, newline=''))))
+      mmap_engine = list(generate_results.extractBufferCertificates(text.encode("ascii"), "ascii"))
+      for certificates in (lines_engine, mmap_engine):
+        self.assertEqual([certificate.chain for certificate in certificates], \
+                         [[["CN=Example CA, O=Example Corp, C=US", "CN=Example Root CA, O=Example Corp, C=US", "DD:EE:FF"]], []], repr(line_ending))
+        self.assertEqual(certificates[0].fingerprint, "AA:BB:CC")
+      self.assertEqual([certificate.toList() for certificate in mmap_engine], [certificate.toList() for certificate in lines_engine])
+
+  def testEntriesWithoutOwner(self):
+    # "keytool -list -rfc" prints each certificate in PEM instead of its metadata, so none of its entries has an Owner line.
+    # Each entry is followed by many lines that hold no metadata (a long PEM chain here), which the mmap engine has to skip
+    # in linear time when the entry does not match its layout, and then by an entry that can be extracted.
+    rfc_lines = []
+    in_certificate = False
+    for line in readFixture("keystore-rfc.txt").split("\n"):
+      in_certificate = line.startswith("-----BEGIN") or (in_certificate and not line.startswith("-----END"))
+      rfc_lines.extend([line] * (20 if in_certificate and not line.startswith("-----") else 1))
+    text = "\n".join(rfc_lines + entry_lines)
+    lines_engine = list(generate_results.extractCertificates(generate_results.readLines(io.StringIO(text, newline=''))))
+    started = time.time()
+    mmap_engine = list(generate_results.extractBufferCertificates(text.encode("ascii"), "ascii"))
+    self.assertLess(time.time() - started, 5)
+    self.assertEqual([certificate.toList() for certificate in mmap_engine], [certificate.toList() for certificate in lines_engine])
+    self.assertEqual([certificate.alias for certificate in mmap_engine], ["server"])
+
+class CertificateTest(unittest.TestCase):
+  def testCompleteness(self):
+    certificates = list(generate_results.extractCertificates(iter(entry_lines)))
+    self.assertTrue(certificates[0].isComplete())
+    certificate = generate_results.Certificate("host.example.com")
+    for name in generate_results.Certificate.required_fields[:-1]:
+      certificate.setField(name, getattr(certificates[0], name))
+    self.assertFalse(certificate.isComplete())
+    # A value that is found again (in another certificate of the chain) or that is empty does not count as found
+    certificate.setField("alias", "other")
+    certificate.setField("key_strength", "")
+    self.assertEqual((certificate.alias, certificate.missing), ("server", 1))
+    certificate.setField("key_strength", "SHA256 with RSA")
+    self.assertTrue(certificate.isComplete())
+    # Clearing the certificate keeps the host name for the entries that follow it
+    certificate.clear()
+    self.assertEqual((certificate.host_name, certificate.alias, certificate.missing), \
+                     ("host.example.com", "", len(generate_results.Certificate.required_fields)))
+
+  def testList(self):
+    certificate = next(generate_results.extractCertificates(iter(chain_entry_lines)))
+    values = json.loads(json.dumps(certificate.toList()))
+    copy = generate_results.Certificate.fromList(values)
+    self.assertTrue(copy.isComplete())
+    self.assertEqual(copy.toList(), certificate.toList())
+    self.assertEqual((copy.expiration_date, copy.chain), (certificate.expiration_date, certificate.chain))
+    self.assertFalse(hasattr(copy, "__dict__"))
+
+class DateTest(unittest.TestCase):
+  def testParse(self):
+    parse = generate_results.parseKeytoolDate
+    utc = datetime.timezone.utc
+    self.assertEqual(parse("Mon Jan 01 00:00:00 UTC 2018"), datetime.datetime(2018, 1, 1, tzinfo=utc))
+    # The day is not always padded with a zero, and other time zones are read with their offset from UTC
+    self.assertEqual(parse("Tue Jan  2 13:04:05 CEST 2018"), datetime.datetime(2018, 1, 2, 11, 4, 5, tzinfo=utc))
+    self.assertEqual(parse("Tue Jan 2 13:04:05 GMT+05:30 2018"), datetime.datetime(2018, 1, 2, 7, 34, 5, tzinfo=utc))
+    self.assertEqual(parse("Tue Jan 2 13:04:05 NST 2018"), datetime.datetime(2018, 1, 2, 16, 34, 5, tzinfo=utc))
+    # A time zone that is missing or not known leaves the date without one
+    self.assertEqual(parse("Tue Jan 2 13:04:05 2018"), datetime.datetime(2018, 1, 2, 13, 4, 5))
+    self.assertEqual(parse("Tue Jan 2 13:04:05 XYZ 2018"), datetime.datetime(2018, 1, 2, 13, 4, 5))
+    for date in ("Tue Foo 2 13:04:05 UTC 2018", "Tue Jan 32 13:04:05 UTC 2018", "Tue Jan 2 13:04 UTC 2018", ""):
+      self.assertIsNone(parse(date), date)
+
+  def testFormat(self):
+    date = generate_results.parseKeytoolDate("Tue Jan  2 13:04:05 CEST 2018")
+    self.assertEqual(generate_results.formatDate(date), "1/02/2018")
+    self.assertEqual(generate_results.getEpoch(date), 1514891045)
+    # A date without a time zone is taken as UTC
+    self.assertEqual(generate_results.getEpoch(generate_results.parseKeytoolDate("Tue Jan 2 13:04:05 2018")), 1514898245)
+
+class FindFilesTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.settings = (generate_results.include_patterns, generate_results.exclude_patterns, generate_results.max_depth, generate_results.sniff_files)
+    # a/b/c/deep.txt is three levels down, and notes.txt and image.bin are neither data dumps nor keystores
+    for path in ("top.txt", "notes.txt", "image.bin", "a/one.txt", "a/b/two.txt", "a/b/c/deep.txt", "archive/old.txt", "a/store.jks", \
+                 "a/" + generate_results.manifest_file_name):
+      path = os.path.join(self.directory, *path.split("/"))
+      if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+      shutil.copy(os.path.join(fixtures_directory, "keystore.jks" if path.endswith(".jks") else "keystore.txt"), path)
+    with open(os.path.join(self.directory, "notes.txt"), 'w') as file:
+      file.write("Nothing to see here\n")
+    with open(os.path.join(self.directory, "image.bin"), 'wb') as file:
+      file.write(b"\x89PNG\r\n\x1a\n\0\0\0\rAlias name: ")
+
+  def tearDown(self):
+    generate_results.include_patterns, generate_results.exclude_patterns, generate_results.max_depth, generate_results.sniff_files = self.settings
+    shutil.rmtree(self.directory)
+
+  """
+  Returns the paths (relative to the directory) of the files that findFiles() finds with the settings given.
+  """
+  def findFiles(self, include=(), exclude=(), depth=None, sniff=True):
+    generate_results.include_patterns = list(include)
+    generate_results.exclude_patterns = list(exclude)
+    generate_results.max_depth = depth
+    generate_results.sniff_files = sniff
+    prefix = os.path.join(self.directory, '')
+    return [os.path.relpath(file, prefix).replace(os.sep, "/") for file in generate_results.findFiles(self.directory)]
+
+  def testWalk(self):
+    # The files come out sorted one directory at a time, without the manifest and the files that are not keystores
+    self.assertEqual(self.findFiles(), ["a/b/c/deep.txt", "a/b/two.txt", "a/one.txt", "a/store.jks", "archive/old.txt", "top.txt"])
+    self.assertEqual(self.findFiles(sniff=False), ["a/b/c/deep.txt", "a/b/two.txt", "a/one.txt", "a/store.jks", "archive/old.txt", \
+                                                   "image.bin", "notes.txt", "top.txt"])
+
+  def testFilters(self):
+    # Patterns are matched against the name and the relative path
+    self.assertEqual(self.findFiles(exclude=["archive"]), ["a/b/c/deep.txt", "a/b/two.txt", "a/one.txt", "a/store.jks", "top.txt"])
+    self.assertEqual(self.findFiles(exclude=["a/b", "*.jks"]), ["a/one.txt", "archive/old.txt", "top.txt"])
+    self.assertEqual(self.findFiles(include=["*.jks", "archive/*"]), ["a/store.jks", "archive/old.txt"])
+    self.assertEqual(self.findFiles(depth=0), ["top.txt"])
+    self.assertEqual(self.findFiles(depth=2), ["a/b/two.txt", "a/one.txt", "a/store.jks", "archive/old.txt", "top.txt"])
+
+  @unittest.skipUnless(hasattr(os, "symlink"), "symbolic links are not supported")
+  def testSymbolicLinkLoop(self):
+    try:
+      os.symlink(self.directory, os.path.join(self.directory, "a", "b", "loop"))
+    except OSError:
+      self.skipTest("symbolic links cannot be created")
+    self.assertEqual(self.findFiles(), ["a/b/c/deep.txt", "a/b/two.txt", "a/one.txt", "a/store.jks", "archive/old.txt", "top.txt"])
+
+  def testDeepDirectories(self):
+    # The walk does not take a frame per directory level, so it goes deeper than the recursion limit allows
+    path = os.path.join(self.directory, *(["d"] * 100))
+    os.makedirs(path)
+    shutil.copy(os.path.join(fixtures_directory, "keystore.txt"), path)
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack(0)) + 50)
+    try:
+      files = self.findFiles()
+    finally:
+      sys.setrecursionlimit(recursion_limit)
+    self.assertIn("/".join(["d"] * 100) + "/keystore.txt", files)
+    self.assertEqual(len(files), 7)
+
+"""
+Returns a data dump of the number of entries given under each host name given.
+"""
+def createDump(host_names, count):
+  lines = []
+  for host_name in host_names:
+    lines.append("============ servername: " + host_name)
+    for index in range(count):
+      lines += ["Alias name: " + host_name + " " + str(index)] + entry_lines[2:]
+  return "\n".join(lines)
+
+class ChunkTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.settings = (generate_results.chunk_size, generate_results.engine)
+
+  def tearDown(self):
+    generate_results.chunk_size, generate_results.engine = self.settings
+    shutil.rmtree(self.directory)
+
+  def testChunks(self):
+    text = createDump(["alpha", "beta"], 40)
+    path = os.path.join(self.directory, "keystore.txt")
+    with open(path, 'w') as file:
+      file.write(text)
+    expected = [certificate.toList() for certificate in generate_results.extractCertificates(iter(text.split("\n")))]
+    self.assertEqual(len(expected), 80)
+
+    generate_results.chunk_size = len(text) // 7
+    chunks = generate_results.splitDump(path)
+    self.assertGreaterEqual(len(chunks), 6)
+    # Every chunk after the first starts at an alias and is under the host name of the last servername line before it,
+    # including the chunk that the servername line of the second host is in
+    for start, end, host_name in chunks[1:]:
+      self.assertTrue(text.startswith("Alias name: ", start))
+      self.assertEqual(host_name, "beta" if text.rfind("servername: beta", 0, start) != -1 else "alpha")
+    self.assertIn("beta", [chunk[2] for chunk in chunks])
+    self.assertIn("alpha", [chunk[2] for chunk in chunks[1:]])
+    self.assertEqual([chunks[0][0], chunks[-1][1]], [0, len(text)])
+    self.assertEqual([chunk[0] for chunk in chunks[1:]], [chunk[1] for chunk in chunks[:-1]])
+
+    for engine in ("lines", "mmap"):
+      generate_results.engine = engine
+      certificates = []
+      for chunk in chunks:
+        certificates.extend(generate_results.parseChunk(path, chunk)[0])
+      self.assertEqual([certificate.toList() for certificate in certificates], expected, engine)
+
+  def testSmallDump(self):
+    path = os.path.join(self.directory, "keystore.txt")
+    with open(path, 'w') as file:
+      file.write(createDump(["alpha"], 2))
+    self.assertIsNone(generate_results.splitDump(path))
+    generate_results.chunk_size = 1
+    self.assertIsNone(generate_results.splitDump(os.path.join(fixtures_directory, "keystore.jks")))
+
+class WatchedResultsTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.working_directory = os.getcwd()
+    os.chdir(self.directory)
+    generate_results.watch_rows = {}
+    generate_results.watch_text.clear()
+
+  def tearDown(self):
+    generate_results.watch_rows = None
+    generate_results.watch_text.clear()
+    os.chdir(self.working_directory)
+    shutil.rmtree(self.directory)
+
+  def testWrite(self):
+    stores = [os.path.join(self.directory, "stores")]
+    first = os.path.join(stores[0], "a", "keystore.txt")
+    second = os.path.join(stores[0], "b.txt")
+    generate_results.watch_rows.update({second : [["b", "1"]], first : [["a", "1"], ["a", "2"]]})
+    generate_results.writeWatchedResults(stores)
+    # The files are in the order of findFiles() and the rows of each file are only formatted once
+    self.assertEqual(readResults(self.directory), [["a", "1"], ["a", "2"], ["b", "1"]])
+    first_text = generate_results.watch_text[first]
+    inode = os.stat("results.csv").st_ino
+
+    # The second file changes: only its rows are formatted again, and the results file is replaced rather than written over
+    generate_results.watch_rows[second] = [["b", "2"]]
+    del generate_results.watch_text[second]
+    generate_results.writeWatchedResults(stores)
+    self.assertEqual(readResults(self.directory), [["a", "1"], ["a", "2"], ["b", "2"]])
+    self.assertIs(generate_results.watch_text[first], first_text)
+    self.assertNotEqual(os.stat("results.csv").st_ino, inode)
+    self.assertEqual(sorted(os.listdir(self.directory)), ["results.csv"])
+
+class ProgramTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  """
+  Copies fixtures into a directory of files to parse (created under the temporary directory) and returns its path.
+  """
+  def copyFixtures(self, names, directory="stores"):
+    path = os.path.join(self.directory, directory)
+    if not os.path.isdir(path):
+      os.makedirs(path)
+    for name in names:
+      shutil.copy(os.path.join(fixtures_directory, name), path)
+    return path
+
+  def testSampleDump(self):
+    # The same rows come out of the data dump whatever its line endings and whichever engine reads it
+    text = readFixture("keystore.txt")
+    stores = self.copyFixtures([])
+    for line_ending in ("\n", "\r\n"):
+      with open(os.path.join(stores, "keystore.txt"), 'w', newline='') as file:
+        file.write(text.replace("\n", line_ending))
+      for engine in ("lines", "mmap"):
+        runProgram(self.directory, ["--engine", engine, stores])
+        self.assertEqual(readResults(self.directory), keystore_rows, (repr(line_ending), engine))
+
+  def testQuoting(self):
+    # Names with commas and quotes are kept as they are, in every batch of rows that is written
+    count = generate_results.write_batch_size + 1
+    owner = 'CN="Smith, John", O=Example Corp, C=US'
+    lines = []
+    for index in range(count):
+      lines += ["Alias name: server " + str(index)] + entry_lines[2:6] + ["Owner: " + owner] + entry_lines[7:]
+    stores = self.copyFixtures([])
+    with open(os.path.join(stores, "keystore.txt"), 'w') as file:
+      file.write("\n".join(lines))
+    runProgram(self.directory, [stores])
+    rows = readResults(self.directory)
+    self.assertEqual(len(rows), count)
+    self.assertEqual(set(len(row) for row in rows), set([len(keystore_rows[0])]))
+    self.assertEqual([row[8] for row in rows], ["server " + str(index) for index in range(count)])
+    self.assertEqual(set((row[9], row[15]) for row in rows), set([("CN=Example CA, O=Example Corp, C=US", owner)]))
+
+  def testDateFormat(self):
+    stores = self.copyFixtures(["keystore.txt"])
+    runProgram(self.directory, ["--date-format", "iso", "--epoch-columns", stores])
+    self.assertEqual([row[:22] for row in readResults(self.directory)], \
+                     [row[:5] + ["2046-10-12T22:03:38+00:00"] + row[6:10] + ["2026-10-17T22:03:38+00:00"] + row[11:] for row in keystore_rows[:1]] + \
+                     [row[:5] + ["2036-10-14T22:03:39+00:00"] + row[6:10] + ["2026-10-17T22:03:39+00:00"] + row[11:] for row in keystore_rows[1:]])
+    self.assertEqual([row[22:] for row in readResults(self.directory)], [["1792274618", "2422994618"], ["1792274619", "2107634619"]])
+
+  def testRunReport(self):
+    # The second entry of broken.txt has no validity dates, so it is counted as dropped
+    stores = self.copyFixtures(["keystore.txt"])
+    with open(os.path.join(stores, "broken.txt"), 'w') as file:
+      file.write("\n".join(entry_lines + ["Alias name: broken"] + entry_lines[2:9] + entry_lines[10:]))
+    runProgram(self.directory, ["--run-report", "report.json", "--profile", "parse.prof", stores])
+    with open(os.path.join(self.directory, "report.json"), 'r') as file:
+      report = json.load(file)
+    self.assertEqual([(os.path.basename(statistics["file"]), statistics["bytes"], statistics["lines"], statistics["entries"], \
+                       statistics["dropped"], statistics["rows"], statistics["error"]) for statistics in report["files"]], \
+                     [("broken.txt", os.path.getsize(os.path.join(stores, "broken.txt")), 33, 1, 1, 1, None), \
+                      ("keystore.txt", 3096, 107, 2, 0, 2, None)])
+    self.assertEqual((report["totals"]["files"], report["totals"]["entries"], report["totals"]["dropped"], report["totals"]["rows"]), (2, 3, 1, 3))
+    self.assertEqual(report["jobs"], 1)
+    self.assertGreater(pstats.Stats(os.path.join(self.directory, "parse.prof")).total_calls, 0)
+
+  def readResultsFile(self):
+    with open(os.path.join(self.directory, "results.csv"), 'rb') as file:
+      return file.read()
+
+  def testJobs(self):
+    # The worker processes give the same results file, byte for byte, as a serial run
+    stores = self.copyFixtures(["keystore.txt", "keystore.jks", "server.pem", "chain.p7b"])
+    for directory in ("b", "a"):
+      self.copyFixtures(["keystore.txt", "ca.pem"], os.path.join("stores", directory))
+    runProgram(self.directory, ["--storepass-env", "FIXTURE_STOREPASS", stores], {"FIXTURE_STOREPASS" : "changeit"})
+    serial = self.readResultsFile()
+    self.assertEqual(len(readResults(self.directory)), 13)
+    runProgram(self.directory, ["--jobs", "3", "--storepass-env", "FIXTURE_STOREPASS", stores], {"FIXTURE_STOREPASS" : "changeit"})
+    self.assertEqual(self.readResultsFile(), serial)
+
+  def testChunkedJobs(self):
+    # A data dump that is larger than the chunk size is parsed in chunks by the worker processes, with the rows in order
+    stores = self.copyFixtures([])
+    with open(os.path.join(stores, "keystore.txt"), 'w') as file:
+      file.write(createDump(["alpha", "beta"], 1500))
+    self.assertGreater(os.path.getsize(os.path.join(stores, "keystore.txt")), 1024 * 1024)
+    runProgram(self.directory, ["--host-names", stores])
+    serial = self.readResultsFile()
+    self.assertEqual([row[4] for row in readResults(self.directory)], ["alpha"] * 1500 + ["beta"] * 1500)
+    runProgram(self.directory, ["--host-names", "--jobs", "2", "--chunk-size", "1", "--run-report", "report.json", stores])
+    self.assertEqual(self.readResultsFile(), serial)
+    with open(os.path.join(self.directory, "report.json"), 'r') as file:
+      self.assertEqual(json.load(file)["totals"]["entries"], 3000)
+
+  """
+  Waits for the aliases of the results file to be the ones given while the watch mode runs. An AssertionError is raised
+  when they are still not after 20 seconds.
+  """
+  def waitForAliases(self, aliases):
+    deadline = time.time() + 20
+    found = None
+    while time.time() < deadline:
+      try:
+        found = [row[8] for row in readResults(self.directory)]
+      except (IOError, OSError):
+        found = None
+      if found == aliases:
+        return
+      time.sleep(0.1)
+    self.fail("the results file has " + repr(found) + " instead of " + repr(aliases))
+
+  def testWatch(self):
+    stores = self.copyFixtures(["keystore.txt"])
+    with open(os.path.join(self.directory, "watch.log"), 'w') as log:
+      process = subprocess.Popen([sys.executable, program] + batch_arguments + ["--watch", "--poll", "--interval", "0.2", stores], \
+                                 cwd=self.directory, stdout=log, stderr=subprocess.STDOUT)
+    try:
+      self.waitForAliases(["ca", "server"])
+      # A file is added, then the first file changes and then the file that was added is removed
+      with open(os.path.join(stores, "other.txt"), 'w') as file:
+        file.write(createDump(["beta"], 1))
+      self.waitForAliases(["ca", "server", "beta 0"])
+      with open(os.path.join(stores, "keystore.txt"), 'w') as file:
+        file.write(createDump(["alpha"], 2))
+      self.waitForAliases(["alpha 0", "alpha 1", "beta 0"])
+      os.remove(os.path.join(stores, "other.txt"))
+      self.waitForAliases(["alpha 0", "alpha 1"])
+      self.assertEqual(process.poll(), None)
+    finally:
+      process.kill()
+      process.wait()
+    self.assertEqual(sorted(os.listdir(self.directory)), ["results.csv", "stores", "watch.log"])
+
+  @unittest.skipIf(os.name != "posix", "the keytool stub is a shell script")
+  def testCollect(self):
+    # keytool is found on the PATH, and the keystore with the wrong password is skipped with the error from keytool while
+    # the others are still listed in order
+    stub_directory = os.path.join(self.directory, "bin")
+    os.makedirs(stub_directory)
+    stub = os.path.join(stub_directory, "keytool")
+    with open(stub, 'w') as file:
+      file.write(keytool_stub % os.path.join(fixtures_directory, "keystore.txt"))
+    os.chmod(stub, 0o755)
+    with open(os.path.join(self.directory, "keystores.csv"), 'w') as file:
+      file.write("keystore,storepass_env\nfirst.jks,\nwrong.jks,WRONG_STOREPASS\nlast.jks,\n")
+    output = runProgram(self.directory, ["--collect", "keystores.csv", "--jobs", "2", "--storepass-env", "FIXTURE_STOREPASS", "--run-report", "report.json"], \
+                        {"PATH" : stub_directory + os.pathsep + os.environ.get("PATH", ""), "FIXTURE_STOREPASS" : "changeit", "WRONG_STOREPASS" : "wrong"})
+    self.assertIn("Skipping " + os.path.join(self.directory, "wrong.jks") + ": keytool error: java.io.IOException", output)
+    self.assertEqual([(row[11], row[8]) for row in readResults(self.directory)], \
+                     [("first.jks", "ca"), ("first.jks", "server"), ("last.jks", "ca"), ("last.jks", "server")])
+    with open(os.path.join(self.directory, "report.json"), 'r') as file:
+      report = json.load(file)
+    self.assertEqual(report["totals"]["failed_files"], 1)
+    self.assertEqual([statistics["entries"] for statistics in report["files"]], [2, 0, 2])
+
+  def testCache(self):
+    # A file is only parsed again once it changes, and the cached rows are the same as the parsed ones
+    stores = self.copyFixtures(["keystore.txt"])
+    with open(os.path.join(stores, "other.txt"), 'w') as file:
+      file.write(createDump(["alpha"], 1))
+    arguments = ["--cache", "--run-report", "report.json", stores]
+    for cached_files in (0, 2):
+      runProgram(self.directory, arguments)
+      self.assertEqual(readResults(self.directory), keystore_rows + [keystore_rows[1][:5] + ["1/01/2020"] + keystore_rows[1][6:8] + \
+                       ["alpha 0", "CN=Example CA, O=Example Corp, C=US", "1/01/2018"] + keystore_rows[1][11:14] + \
+                       ["SHA256 with RSA", "CN=host.example.com, O=Example Corp, C=US", "1a2b3c"] + keystore_rows[1][17:]])
+      with open(os.path.join(self.directory, "report.json"), 'r') as file:
+        self.assertEqual(json.load(file)["totals"]["cached_files"], cached_files)
+    with open(os.path.join(stores, "other.txt"), 'w') as file:
+      file.write(createDump(["beta"], 2))
+    runProgram(self.directory, arguments)
+    self.assertEqual([row[8] for row in readResults(self.directory)], ["ca", "server", "beta 0", "beta 1"])
+    with open(os.path.join(self.directory, "report.json"), 'r') as file:
+      self.assertEqual([statistics["cached"] for statistics in json.load(file)["files"]], [True, False])
+
+  @unittest.skipIf(certificate_reader.AES is None, "pycryptodomex is not installed")
+  def testCacheSkipsUnreadableFiles(self):
+    # A PKCS12 keystore that is read without its password gives no rows, and has to be read again once the password is given
+    stores = self.copyFixtures(["keystore.p12"])
+    runProgram(self.directory, ["--cache", stores])
+    self.assertEqual(readResults(self.directory), [])
+    for run in range(2):
+      runProgram(self.directory, ["--cache", "--storepass-env", "FIXTURE_STOREPASS", "--run-report", "report.json", stores], \
+                 {"FIXTURE_STOREPASS" : "changeit"})
+      self.assertEqual(sorted(row[8] for row in readResults(self.directory)), ["ca", "server"])
+      with open(os.path.join(self.directory, "report.json"), 'r') as file:
+        self.assertEqual(json.load(file)["totals"]["cached_files"], run)
+
+  @unittest.skipIf(certificate_reader.AES is None, "pycryptodomex is not installed")
+  def testChainReport(self):
+    # The only entry of openssl.p12 is a key pair, whose root is only in its certificate chain
+    stores = self.copyFixtures(["openssl.p12", "keystore.txt"])
+    runProgram(self.directory, ["--storepass-env", "FIXTURE_STOREPASS", "--chain-report", "chains.csv", stores], {"FIXTURE_STOREPASS" : "changeit"})
+    with open(os.path.join(self.directory, "chains.csv"), 'r', newline='') as file:
+      report = dict(((os.path.basename(row[0]), row[1]), (row[5], row[6])) for row in list(csv.reader(file))[1:])
+    self.assertEqual(report[("openssl.p12", "server")], ("complete", "server -> server[2]"))
+    self.assertEqual(report[("openssl.p12", "server[2]")], ("root", "server[2]"))
+    # The root of keystore.txt is also an entry of its own
+    self.assertEqual(report[("keystore.txt", "server")], ("complete", "server -> ca"))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+import unittest
+import inventory
+
+"""
+Tests of the SQLite inventory of inventory.py: the merging of the rows of generate_results.py into one row per
+certificate, the occurrences of each certificate and the lookups.
+"""
+
+root_issuer = "CN=Root CA, O=Example Corp"
+root_serial = "1"
+root_fingerprint = "aa:bb:cc"
+
+"""
+Returns a row in the format that generate_results.py hands to inventory.upsertRows() (the columns of results.csv, the
+two epoch columns, the fingerprint and the file).
+"""
+def createRow(alias, host_name, issuer, serial_number, expiration_epoch, file, fingerprint="", location="Lab"):
+  values = dict((column, "") for column in inventory.column_names)
+  values.update({"location" : location, "host_name" : host_name, "alias" : alias, "issuer" : issuer, \
+                 "serial_number" : serial_number, "file_name" : file, "creation_epoch" : 0, "expiration_epoch" : expiration_epoch})
+  return [values[column] for column in inventory.column_names] + [fingerprint, file]
+
+class InventoryTest(unittest.TestCase):
+  def setUp(self):
+    self.connection = inventory.openInventory(":memory:")
+    # A root CA that is in the keystores of two hosts under different aliases, and a server certificate of each host
+    inventory.upsertRows(self.connection, [createRow("root", "alpha", root_issuer, root_serial, 300, "alpha.jks", root_fingerprint), \
+                                           createRow("server", "alpha", root_issuer, "10", 100, "alpha.jks")])
+    inventory.upsertRows(self.connection, [createRow("rootca", "beta", root_issuer, root_serial, 300, "beta.jks"), \
+                                           createRow("server", "beta", root_issuer, "20", 200, "beta.jks")])
+
+  def tearDown(self):
+    self.connection.close()
+
+  def getCertificates(self):
+    return self.connection.execute("SELECT serial_number FROM " + inventory.table_name + " ORDER BY serial_number").fetchall()
+
+  def testUpsert(self):
+    self.assertEqual(self.getCertificates(), [("1",), ("10",), ("20",)])
+    # The columns that are maintained in the inventory are kept when a certificate is found again, the others are updated
+    with self.connection:
+      self.connection.execute("UPDATE " + inventory.table_name + " SET comments = 'rotate' WHERE serial_number = '10'")
+    inventory.upsertRows(self.connection, [createRow("server", "alpha", root_issuer, "10", 150, "alpha.jks", location="Datacenter")])
+    self.assertEqual(self.connection.execute("SELECT location, comments, expiration_epoch FROM " + inventory.table_name + " WHERE serial_number = '10'").fetchall(), \
+                     [("Datacenter", "rotate", 150)])
+    self.assertEqual(len(self.getCertificates()), 3)
+
+  def testFindBy(self):
+    # The root is found under each host and alias it is in, not only under the last ones that were written
+    alias = inventory.column_names.index("alias")
+    host_name = inventory.column_names.index("host_name")
+    self.assertEqual([(row[alias], row[host_name]) for row in inventory.findBy(self.connection, "host_name", "alpha")], \
+                     [("server", "alpha"), ("root", "alpha")])
+    self.assertEqual([(row[alias], row[host_name]) for row in inventory.findBy(self.connection, "host_name", "beta")], \
+                     [("server", "beta"), ("rootca", "beta")])
+    self.assertEqual([(row[alias], row[host_name]) for row in inventory.findBy(self.connection, "alias", "root")], [("root", "alpha")])
+    self.assertEqual([(row[alias], row[host_name]) for row in inventory.findBy(self.connection, "alias", "server")], \
+                     [("server", "alpha"), ("server", "beta")])
+    self.assertEqual(inventory.findBy(self.connection, "alias", "missing"), [])
+
+  def testIndexes(self):
+    for column, index_name in (("alias", "occurrences_alias"), ("host_name", "occurrences_host_name")):
+      plan = self.connection.execute("EXPLAIN QUERY PLAN SELECT 1 FROM " + inventory.occurrence_table_name + " WHERE " + column + " = ?", ("x",)).fetchall()
+      self.assertIn(index_name, " ".join(str(step) for step in plan))
+
+  def testOccurrences(self):
+    self.assertEqual([occurrence[3:] for occurrence in inventory.findOccurrences(self.connection, root_issuer, root_serial)], \
+                     [("alpha.jks", "root", "alpha"), ("beta.jks", "rootca", "beta")])
+    # The occurrence that was found without a fingerprint is found through the identity of the certificate
+    self.assertEqual(len(inventory.findOccurrencesByFingerprint(self.connection, "AABBCC")), 2)
+
+  def testRemoveFile(self):
+    # Only the certificates that were not found in any other file are removed
+    self.assertEqual(inventory.removeFile(self.connection, "alpha.jks"), 1)
+    self.assertEqual(self.getCertificates(), [("1",), ("20",)])
+    self.assertEqual(inventory.findBy(self.connection, "host_name", "alpha"), [])
+    self.assertEqual(inventory.removeFile(self.connection, "beta.jks"), 2)
+    self.assertEqual(self.getCertificates(), [])
+
+  def testRemoveUnusedCertificates(self):
+    # A file is recorded again without the server certificate, which is only removed once every file has been recorded
+    inventory.removeOccurrences(self.connection, "beta.jks")
+    inventory.upsertRows(self.connection, [createRow("rootca", "beta", root_issuer, root_serial, 300, "beta.jks")])
+    self.assertEqual(len(self.getCertificates()), 3)
+    self.assertEqual(inventory.removeUnusedCertificates(self.connection), 1)
+    self.assertEqual(self.getCertificates(), [("1",), ("10",)])
+
+if __name__ == '__main__':
+  unittest.main()
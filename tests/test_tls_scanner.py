@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import os
+import ssl
+import sys
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+import certificate_reader
+import tls_scanner
+from tests.test_generate_results import fixtures_directory, runProgram, readResults
+
+"""
+Tests of the TLS scanner of tls_scanner.py against a TLS server on the loopback interface that presents the server
+certificate of the fixtures and the root CA that issued it (with the throwaway key of the fixtures).
+"""
+
+"""
+Returns the DER encoded certificate of a PEM fixture.
+"""
+def readCertificate(name):
+  return certificate_reader.readEntries(os.path.join(fixtures_directory, name))[0].certificate.der
+
+"""
+This class runs a TLS server in a thread of its own that finishes the handshake with every connection and closes it.
+"""
+class LocalServer(object):
+  def __init__(self, chain_path):
+    self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    self.context.load_cert_chain(chain_path, os.path.join(fixtures_directory, "server.key"))
+    self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.socket.bind(("127.0.0.1", 0))
+    self.socket.listen(5)
+    # The accept times out now and then so that the server sees when it is stopped
+    self.socket.settimeout(0.1)
+    self.port = self.socket.getsockname()[1]
+    self.stopped = False
+    self.thread = threading.Thread(target=self.serve)
+    self.thread.start()
+
+  def serve(self):
+    while not self.stopped:
+      try:
+        connection = self.socket.accept()[0]
+      except socket.timeout:
+        continue
+      connection.settimeout(5)
+      try:
+        self.context.wrap_socket(connection, server_side=True).close()
+      except (ssl.SSLError, OSError):
+        connection.close()
+
+  def close(self):
+    self.stopped = True
+    self.thread.join()
+    self.socket.close()
+
+"""
+Returns a port of the loopback interface that nothing listens on.
+"""
+def findClosedPort():
+  closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  closed.bind(("127.0.0.1", 0))
+  port = closed.getsockname()[1]
+  closed.close()
+  return port
+
+class ScannerTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    chain_path = os.path.join(self.directory, "chain.pem")
+    with open(chain_path, 'w') as chain:
+      for name in ("server.pem", "ca.pem"):
+        with open(os.path.join(fixtures_directory, name), 'r') as file:
+          chain.write(file.read())
+    self.server = LocalServer(chain_path)
+    self.chain = [readCertificate("server.pem"), readCertificate("ca.pem")]
+    # Only the certificate of the server is read before Python 3.10
+    if sys.version_info < (3, 10):
+      self.chain = self.chain[:1]
+
+  def tearDown(self):
+    self.server.close()
+    shutil.rmtree(self.directory)
+
+  def testScanAll(self):
+    closed_port = findClosedPort()
+    results = []
+    threads = []
+    def handleResult(result):
+      results.append(result)
+      threads.append(threading.current_thread())
+    tls_scanner.scanAll([("127.0.0.1", self.server.port), ("127.0.0.1", closed_port)], handleResult, 10, 5)
+    self.assertEqual([result.getEndpoint() for result in results], ["127.0.0.1:" + str(self.server.port), "127.0.0.1:" + str(closed_port)])
+    self.assertEqual(results[0].chain, self.chain)
+    self.assertIsNone(results[0].error)
+    self.assertEqual(results[1].chain, [])
+    self.assertIsNotNone(results[1].error)
+    # The results are handled in the thread that called scanAll(), not in the thread of the event loop
+    self.assertEqual(threads, [threading.current_thread()] * 2)
+
+  def testRows(self):
+    with open(os.path.join(self.directory, "endpoints.txt"), 'w') as file:
+      file.write("# The local server\n127.0.0.1:" + str(self.server.port) + "\n")
+    runProgram(self.directory, ["--scan", "endpoints.txt", "--timeout", "5"])
+    endpoint = "127.0.0.1:" + str(self.server.port)
+    rows = [("server.example.com", "Key Pair", "127.0.0.1", endpoint, "CN=Fixture Root CA, O=Example Corp, C=US", "1a2b3c4d"), \
+            ("Fixture Root CA", "Trusted Cert", "127.0.0.1", endpoint, "CN=Fixture Root CA, O=Example Corp, C=US", "a11ce")]
+    self.assertEqual([(row[8], row[7], row[4], row[11], row[9], row[16]) for row in readResults(self.directory)], rows[:len(self.chain)])
+
+class PeerChainTest(unittest.TestCase):
+  def testFallback(self):
+    # When the internals that the chain is read through are not what they are expected to be, the certificate of the other
+    # end is still read
+    certificate = readCertificate("server.pem")
+    class Internals(object):
+      def get_unverified_chain(self):
+        raise AttributeError("get_unverified_chain")
+    class SSLObject(object):
+      _sslobj = Internals()
+      def getpeercert(self, binary_form=False):
+        return certificate
+    self.assertEqual(tls_scanner.getPeerChain(SSLObject()), [certificate])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+
+import ssl
+import time
+import queue
+import asyncio
+import threading
+
+"""
+The aim of this file is to find the certificates that live TLS endpoints present, so that the certificates of a host
+can be inventoried from the host itself instead of from a "keytool -list -v" data dump with a "============ servername:"
+line added by hand. The TLS handshakes of many endpoints run at the same time with asyncio (with a limit on how many
+are open at once and a timeout for each endpoint), so thousands of endpoints can be scanned in minutes.
+
+The certificates are never verified: the point is to see every certificate that is presented, including expired and
+self-signed ones. The whole chain that the endpoint presents is read where Python allows it (Python 3.10 and up) and only
+the certificate of the endpoint otherwise.
+"""
+
+# Port of an endpoint that is listed without one
+default_port = 443
+# Number of handshakes that run at the same time and number of seconds that each endpoint is given (connecting and the
+# handshake) before it is given up on
+default_concurrency = 100
+default_timeout = 10.0
+
+"""
+This class holds the result of the scan of a single endpoint: the DER encoded certificates of the chain that it presented
+(the certificate of the endpoint first) or the reason it could not be scanned.
+"""
+class ScanResult(object):
+  __slots__ = ("host", "port", "chain", "error", "seconds")
+
+  def __init__(self, host, port):
+    self.host = host
+    self.port = port
+    self.chain = []
+    self.error = None
+    self.seconds = 0.0
+
+  """
+  Returns the endpoint in the same form as it is listed (host:port, with the brackets around an IPv6 address).
+  """
+  def getEndpoint(self):
+    return formatEndpoint(self.host, self.port)
+
+"""
+This function splits an endpoint written as host, host:port, [IPv6 address] or [IPv6 address]:port into its host and port.
+
+Parameters:
+---------------------
+endpoint: string
+This is the endpoint.
+
+Returns:
+---------------------
+host: string
+This is the host name or IP address (without the brackets of an IPv6 address).
+
+port: integer
+This is the port (default_port when there is none).
+"""
+def parseEndpoint(endpoint):
+  endpoint = endpoint.strip()
+  port = default_port
+  if endpoint.startswith('['):
+    end = endpoint.find(']')
+    if end == -1:
+      raise ValueError('The endpoint "' + endpoint + '" is not valid')
+    host = endpoint[1:end]
+    rest = endpoint[end + 1:]
+    if rest:
+      if not rest.startswith(':'):
+        raise ValueError('The endpoint "' + endpoint + '" is not valid')
+      port = rest[1:]
+  elif endpoint.count(':') == 1:
+    host, port = endpoint.split(':')
+  else:
+    # A bare IPv6 address has more than one colon and no port
+    host = endpoint
+  try:
+    port = int(port)
+  except ValueError:
+    raise ValueError('The port of the endpoint "' + endpoint + '" is not a number')
+  if host == "" or port < 1 or port > 65535:
+    raise ValueError('The endpoint "' + endpoint + '" is not valid')
+  return host, port
+
+"""
+This function writes an endpoint in the host:port form (see parseEndpoint()).
+"""
+def formatEndpoint(host, port):
+  if ':' in host:
+    return '[' + host + ']:' + str(port)
+  return host + ':' + str(port)
+
+"""
+This function reads the endpoints to scan out of a file with one endpoint (see parseEndpoint()) on each line. Blank lines
+and lines starting with # are skipped, and an endpoint that is listed more than once is only scanned once.
+
+Parameters:
+---------------------
+path: string
+This is the path of the list of endpoints.
+
+Returns:
+---------------------
+list
+This is the list of the (host, port) of each endpoint in the order of the list.
+"""
+def readEndpoints(path):
+  endpoints = []
+  seen = set()
+  with open(path, 'r') as file:
+    for line in file:
+      line = line.strip()
+      if line == "" or line.startswith('#'):
+        continue
+      endpoint = parseEndpoint(line)
+      if endpoint not in seen:
+        seen.add(endpoint)
+        endpoints.append(endpoint)
+  return endpoints
+
+"""
+This function creates the TLS context of the scans. The certificates are not verified and the oldest protocols and
+ciphers that OpenSSL still has are allowed so that the certificates of old endpoints are found as well.
+"""
+def createContext():
+  context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+  context.check_hostname = False
+  context.verify_mode = ssl.CERT_NONE
+  try:
+    context.minimum_version = ssl.TLSVersion.MINIMUM_SUPPORTED
+    context.set_ciphers("ALL:@SECLEVEL=0")
+  except (ValueError, ssl.SSLError):
+    pass
+  return context
+
+"""
+This function returns the DER encoded certificates that the other end of a TLS connection presented, in the order it sent
+them. Python 3.13 has SSLObject.get_unverified_chain(), Python 3.10 to 3.12 only have it on the internal _sslobj and older
+versions of Python only give the certificate of the other end. Since the internals can change from one version of Python
+to the next, the certificate of the other end is read with getpeercert() whenever the chain cannot be read through them.
+
+Parameters:
+---------------------
+ssl_object: ssl.SSLObject
+This is the TLS connection once the handshake is done.
+
+Returns:
+---------------------
+list
+This is the list of DER encoded certificates (the certificate of the other end first).
+"""
+def getPeerChain(ssl_object):
+  chain = None
+  try:
+    if hasattr(ssl_object, "get_unverified_chain"):
+      chain = ssl_object.get_unverified_chain()
+    elif hasattr(getattr(ssl_object, "_sslobj", None), "get_unverified_chain"):
+      chain = [certificate.public_bytes(ssl._ssl.ENCODING_DER) for certificate in ssl_object._sslobj.get_unverified_chain()]
+  except (AttributeError, TypeError, ValueError, ssl.SSLError):
+    chain = None
+  if not chain:
+    chain = [ssl_object.getpeercert(binary_form=True)]
+  return [bytes(certificate) for certificate in chain if certificate]
+
+"""
+This function runs the TLS handshake with a single endpoint and reads the chain that it presents. The host name is sent
+in the server name indication (which Python leaves out for an IP address) so that the endpoint presents the certificate
+of that host.
+
+Parameters:
+---------------------
+host: string
+This is the host name or IP address of the endpoint.
+
+port: integer
+This is the port of the endpoint.
+
+context: ssl.SSLContext
+This is the TLS context (see createContext()).
+
+semaphore: asyncio.Semaphore
+This limits the number of endpoints that are scanned at the same time.
+
+timeout: float
+This is the number of seconds that the endpoint is given to connect and finish the handshake.
+
+Returns:
+---------------------
+ScanResult
+This is the result of the scan.
+"""
+async def scanEndpoint(host, port, context, semaphore, timeout):
+  result = ScanResult(host, port)
+  async with semaphore:
+    start = time.time()
+    writer = None
+    try:
+      reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context, server_hostname=host), timeout)
+      result.chain = getPeerChain(writer.get_extra_info("ssl_object"))
+      if not result.chain:
+        result.error = "no certificate was presented"
+    except asyncio.TimeoutError:
+      result.error = "timed out after " + str(timeout) + " seconds"
+    except (OSError, ssl.SSLError, ValueError) as e:
+      result.error = str(e) or e.__class__.__name__
+    finally:
+      if writer is not None:
+        writer.close()
+        try:
+          await asyncio.wait_for(writer.wait_closed(), timeout)
+        except (asyncio.TimeoutError, OSError, ssl.SSLError):
+          pass
+    result.seconds = time.time() - start
+  return result
+
+"""
+This function scans every endpoint with at most concurrency handshakes at the same time and hands back the results in
+the order of the endpoints as soon as they are available, so the results of the first endpoints can be written while
+the others are still being scanned.
+
+Parameters:
+---------------------
+endpoints: list
+This is the list of the (host, port) of each endpoint.
+
+concurrency: integer
+This is the number of endpoints that are scanned at the same time.
+
+timeout: float
+This is the number of seconds that each endpoint is given.
+
+Returns:
+---------------------
+ScanResult
+This asynchronous generator yields the result of each endpoint in the order of the endpoints.
+"""
+async def scanEndpoints(endpoints, concurrency=default_concurrency, timeout=default_timeout):
+  context = createContext()
+  semaphore = asyncio.Semaphore(concurrency)
+  tasks = [asyncio.ensure_future(scanEndpoint(host, port, context, semaphore, timeout)) for host, port in endpoints]
+  try:
+    for task in tasks:
+      yield await task
+  finally:
+    for task in tasks:
+      task.cancel()
+
+"""
+This function scans every endpoint (see scanEndpoints()) for code that does not run asyncio itself, handing the result
+of each endpoint to handleResult in the order of the endpoints as soon as it is available. The scans run in an event
+loop of their own thread while handleResult is called in the thread that called this function, so that handling a
+result (such as writing its rows) never holds up the handshakes that are under way.
+
+Parameters:
+---------------------
+endpoints: list
+This is the list of the (host, port) of each endpoint.
+
+handleResult: function
+This function is given the ScanResult of each endpoint.
+
+concurrency: integer
+This is the number of endpoints that are scanned at the same time.
+
+timeout: float
+This is the number of seconds that each endpoint is given.
+
+Returns:
+---------------------
+None
+"""
+def scanAll(endpoints, handleResult, concurrency=default_concurrency, timeout=default_timeout):
+  results = queue.Queue()
+  errors = []
+
+  def scan():
+    try:
+      asyncio.run(queueResults(endpoints, results, concurrency, timeout))
+    except Exception as e:
+      errors.append(e)
+    finally:
+      # Marks the end of the results
+      results.put(None)
+
+  # The thread does not keep the program running when handleResult stops it (such as with Ctrl+C)
+  thread = threading.Thread(target=scan, name="tls-scanner", daemon=True)
+  thread.start()
+  result = results.get()
+  while result is not None:
+    handleResult(result)
+    result = results.get()
+  thread.join()
+  if errors:
+    raise errors[0]
+
+"""
+This function puts the result of each endpoint (see scanEndpoints()) into the queue given, in the order of the endpoints.
+"""
+async def queueResults(endpoints, results, concurrency, timeout):
+  async for result in scanEndpoints(endpoints, concurrency, timeout):
+    results.put(result)